@@ -1,62 +1,32 @@
 "Contains app's main logic"
-from telegram import Update
-from telegram.ext import (
-    Application,
-    CommandHandler,
-    MessageHandler,
-    ContextTypes,
-    filters,
-)
+# pylint: disable=import-outside-toplevel
 from app.utils.logging_config import setup_logging
-from app.config import BOT_TOKEN
-from app.telegram_bot.handlers.commands import (
-    help_command,
-    start_command,
-    score_command,
-    leaderboard_command,
-    solution_command,
-    remove_command,
-)
-
-from app.telegram_bot.handlers.messages import handle_message
-from app.telegram_bot.handlers.conversations import (
-    challenge_conversation_handler,
-    select_conversation_handler,
-)
-
-
-async def handle_error(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """
-    Handle errors
-    Args:
-        update (Update): Update object
-        context (ContextTypes.DEFAULT_TYPE): Context object
-    """
-    print(f"Update {update} caused error {context.error}")
+from app.config import BOT_PROCESSES, WEBHOOK_URL, WEBHOOK_PORT, METRICS_PORT
 
 
 if __name__ == "__main__":
     # set up logging
     setup_logging()
 
-    application = Application.builder().token(BOT_TOKEN).build()
-
-    # Commands
-    application.add_handler(CommandHandler("start", start_command))
-    application.add_handler(CommandHandler("help", help_command))
-    application.add_handler(CommandHandler("score", score_command))
-    application.add_handler(CommandHandler("leaderboard", leaderboard_command))
-    application.add_handler(CommandHandler("remove", remove_command))
+    # Only the modules of the chosen mode are imported to start faster
+    if BOT_PROCESSES > 1:
+        from app.telegram_bot.cluster import run_cluster
 
-    # Conversation handlers
-    application.add_handler(challenge_conversation_handler)
-    application.add_handler(select_conversation_handler)
+        # Receive updates here and handle them in worker processes
+        run_cluster(BOT_PROCESSES, WEBHOOK_URL, WEBHOOK_PORT)
+    else:
+        from app.telegram_bot.application import build_application
 
-    # Messages
-    application.add_handler(MessageHandler(filters.TEXT, handle_message))
+        if METRICS_PORT:
+            from app.utils.metrics_server import start_metrics_server
 
-    # Errors
-    application.add_error_handler(handle_error)
+            start_metrics_server(METRICS_PORT)
+        application = build_application()
 
-    # Run the bot
-    application.run_polling(poll_interval=3)
+        # Run the bot
+        if WEBHOOK_URL:
+            application.run_webhook(
+                listen="0.0.0.0", port=WEBHOOK_PORT, webhook_url=WEBHOOK_URL
+            )
+        else:
+            application.run_polling(poll_interval=3)
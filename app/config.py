@@ -13,3 +13,27 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 SECTION_LIST = os.getenv("SECTION_LIST")
 SUBSECTION_FILES_DIR = os.getenv("SUBSECTION_FILES_DIR")
 ELEMENT_TYPES_LIST = os.getenv("ELEMENT_TYPES_LIST")
+MAX_CONCURRENT_UPDATES = int(os.getenv("MAX_CONCURRENT_UPDATES", "8"))
+RATE_LIMIT_OVERALL = float(os.getenv("RATE_LIMIT_OVERALL", "25"))
+RATE_LIMIT_CHAT = float(os.getenv("RATE_LIMIT_CHAT", "1"))
+BOT_PROCESSES = int(os.getenv("BOT_PROCESSES", "1"))
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+PERSISTENCE_INTERVAL = float(os.getenv("PERSISTENCE_INTERVAL", "5"))
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+DB_PROFILE = os.getenv("DB_PROFILE", "wal")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", str(64 * 1024)))
+WRITE_BEHIND_INTERVAL = float(os.getenv("WRITE_BEHIND_INTERVAL", "1"))
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "200"))
+CATALOG_CHECK_INTERVAL = float(os.getenv("CATALOG_CHECK_INTERVAL", "60"))
+RELATED_TOP_K = int(os.getenv("RELATED_TOP_K", "5"))
+WARMUP_PRERENDER = int(os.getenv("WARMUP_PRERENDER", "0"))
+RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", "256"))
+RENDER_PROFILE = os.getenv("RENDER_PROFILE", "phone")
+RENDER_FAILURE_TTL = float(os.getenv("RENDER_FAILURE_TTL", "300"))
+MATHTEXT_FAST_PATH = int(os.getenv("MATHTEXT_FAST_PATH", "1"))
+RENDER_WORK_DIR = os.getenv("RENDER_WORK_DIR")
+PREFETCH_TTL = float(os.getenv("PREFETCH_TTL", "300"))
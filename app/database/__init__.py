@@ -1,2 +1,23 @@
-from app.database.models import Base, Exercise, Solution, Section, Paragraph
-from app.database.queries import *
+" Database models and queries, the submodules are imported where they are used "
+import importlib
+from typing import Any
+
+# Names this package used to import eagerly, resolved on first access so that
+# importing one query module does not load the models and all the queries
+EXPORTS = {
+    "Base": "app.database.models",
+    "Exercise": "app.database.models",
+    "Solution": "app.database.models",
+    "Section": "app.database.models",
+    "Paragraph": "app.database.models",
+    "engine": "app.database.queries.utils",
+    "Session": "app.database.queries.utils",
+    "session_scope": "app.database.queries.utils",
+    "cache_region": "app.database.queries.cache",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(EXPORTS[name]), name)
@@ -0,0 +1,80 @@
+" Versioned schema migrations of existing databases "
+import logging
+from sqlalchemy import Column, Integer, MetaData, String, Table, func, inspect, select
+from sqlalchemy.engine import Connection, Engine
+from app.database.models import Base
+from app.database.migrations.versions import MIGRATIONS
+
+logger = logging.getLogger(__name__)
+
+LATEST_VERSION = MIGRATIONS[-1].VERSION
+
+# One row per applied migration, kept apart from the models' metadata
+schema_versions = Table(
+    "schema_versions",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+)
+
+
+def current_version(connection: Connection) -> int:
+    """
+    Get the schema version of the database
+    Args:
+        connection (Connection): database connection
+    Returns:
+        int: version of the last applied migration, 0 if none was applied
+    """
+    schema_versions.create(connection, checkfirst=True)
+    return connection.execute(select(func.max(schema_versions.c.version))).scalar() or 0
+
+
+def upgrade(engine: Engine) -> int:
+    """
+    Apply the migrations missing in the database, each in its own transaction,
+    so a failing migration keeps the ones before it applied
+    Args:
+        engine (Engine): database engine
+    Returns:
+        int: schema version after the upgrade
+    """
+    with engine.begin() as connection:
+        version = current_version(connection)
+    for migration in MIGRATIONS:
+        if migration.VERSION <= version:
+            continue
+        logger.info("Applying migration %s: %s", migration.VERSION, migration.DESCRIPTION)
+        with engine.begin() as connection:
+            migration.upgrade(connection)
+            connection.execute(
+                schema_versions.insert().values(
+                    version=migration.VERSION, description=migration.DESCRIPTION
+                )
+            )
+        version = migration.VERSION
+    return version
+
+
+def stamp(engine: Engine) -> None:
+    """
+    Mark a database created from the current models as up to date
+    Args:
+        engine (Engine): database engine
+    Raises:
+        RuntimeError: if tables of the models are missing in the database
+    """
+    missing = set(Base.metadata.tables) - set(inspect(engine).get_table_names())
+    if missing:
+        raise RuntimeError(
+            f"Tables {', '.join(sorted(missing))} are missing, the database was not stamped"
+        )
+    with engine.begin() as connection:
+        version = current_version(connection)
+        rows = [
+            {"version": migration.VERSION, "description": migration.DESCRIPTION}
+            for migration in MIGRATIONS
+            if migration.VERSION > version
+        ]
+        if rows:
+            connection.execute(schema_versions.insert(), rows)
@@ -0,0 +1,8 @@
+" Upgrade the database from DB_URL to the latest schema: python -m app.database.migrations "
+import logging
+from app.database.queries.utils import engine
+from app.database.migrations import upgrade
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    logging.info("Database schema is at version %s", upgrade(engine))
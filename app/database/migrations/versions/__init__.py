@@ -0,0 +1,22 @@
+" Schema migrations in the order they are applied "
+from app.database.migrations.versions import (
+    v001_hot_lookup_indexes,
+    v002_element_search,
+    v003_reviews,
+    v004_related_elements,
+    v005_persistence,
+    v006_catalog_versions,
+    v007_review_solved_at,
+    v008_review_undo,
+)
+
+MIGRATIONS = [
+    v001_hot_lookup_indexes,
+    v002_element_search,
+    v003_reviews,
+    v004_related_elements,
+    v005_persistence,
+    v006_catalog_versions,
+    v007_review_solved_at,
+    v008_review_undo,
+]
@@ -0,0 +1,35 @@
+" Indexes on the columns looked up while handling updates "
+import logging
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+VERSION = 1
+DESCRIPTION = "indexes on the hot lookup columns"
+
+logger = logging.getLogger(__name__)
+
+# elements(subsection_id, type_id) is already covered by the index of the
+# _element_subsection_type_number_uc unique constraint, which starts with them
+INDEXES = {
+    "ix_users_telegram_id": "users (telegram_id)",
+    "ix_users_score": "users (score)",
+    "ix_solved_exercises_user_id_exercise_id": "solved_exercises (user_id, exercise_id)",
+    "ix_selected_paragraphs_user_id_paragraph_id": "selected_paragraphs (user_id, paragraph_id)",
+    "ix_exercises_paragraph_id": "exercises (paragraph_id)",
+}
+
+
+def upgrade(connection: Connection) -> None:
+    """
+    Create the indexes missing in the database, a table created later by the
+    models gets them from its model
+    Args:
+        connection (Connection): database connection inside a transaction
+    """
+    tables = set(inspect(connection).get_table_names())
+    for name, columns in INDEXES.items():
+        table = columns.split()[0]
+        if table not in tables:
+            logger.info("Skipping index %s: no table %s", name, table)
+            continue
+        connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {columns}"))
@@ -0,0 +1,22 @@
+" Full-text search index over the book elements "
+from sqlalchemy import inspect
+from sqlalchemy.engine import Connection
+from app.database.queries.search import create_search_index, rebuild_search_index
+
+VERSION = 2
+DESCRIPTION = "FTS5 search index over the elements"
+
+
+def upgrade(connection: Connection) -> None:
+    """
+    Create the search index and index the elements already in the database,
+    a database without the book tables gets it from create_database.py
+    Args:
+        connection (Connection): database connection inside a transaction
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    if not {"elements", "subsections"} <= set(inspect(connection).get_table_names()):
+        return
+    create_search_index(connection)
+    rebuild_search_index(connection)
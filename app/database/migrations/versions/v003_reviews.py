@@ -0,0 +1,56 @@
+" Spaced repetition schedule of the solved exercises "
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import DateTime, bindparam, inspect, text
+from sqlalchemy.engine import Connection
+
+VERSION = 3
+DESCRIPTION = "reviews table with the spaced repetition schedule"
+
+# Schema of the table at this version, later changes go in their own migrations
+STATEMENTS = (
+    """
+    CREATE TABLE IF NOT EXISTS reviews (
+        id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        exercise_id INTEGER NOT NULL,
+        due_at DATETIME NOT NULL,
+        interval FLOAT NOT NULL,
+        ease FLOAT NOT NULL,
+        repetitions INTEGER NOT NULL,
+        PRIMARY KEY (id),
+        CONSTRAINT _review_user_exercise_uc UNIQUE (user_id, exercise_id),
+        FOREIGN KEY(user_id) REFERENCES users (id),
+        FOREIGN KEY(exercise_id) REFERENCES exercises (id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_reviews_user_id_due_at ON reviews (user_id, due_at)",
+)
+
+# Exercises solved before the reviews get the schedule of a first solve:
+# reviewed after a day, with the initial ease and one repetition
+BACKFILL = text(
+    """
+    INSERT INTO reviews (user_id, exercise_id, due_at, interval, ease, repetitions)
+    SELECT solved.user_id, solved.exercise_id, :due_at, 1, 2.5, 1
+    FROM solved_exercises AS solved
+    WHERE NOT EXISTS (
+        SELECT 1 FROM reviews
+        WHERE reviews.user_id = solved.user_id AND reviews.exercise_id = solved.exercise_id
+    )
+    GROUP BY solved.user_id, solved.exercise_id
+    """
+).bindparams(bindparam("due_at", type_=DateTime))
+
+
+def upgrade(connection: Connection) -> None:
+    """
+    Create the reviews table with its (user_id, due_at) index and schedule a
+    review of every exercise already solved
+    Args:
+        connection (Connection): database connection inside a transaction
+    """
+    for statement in STATEMENTS:
+        connection.execute(text(statement))
+    if "solved_exercises" in inspect(connection).get_table_names():
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        connection.execute(BACKFILL, {"due_at": now + timedelta(days=1)})
@@ -0,0 +1,36 @@
+" Precomputed related elements of the exercises "
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from app import config
+from app.database.queries.related import store_related_elements
+
+VERSION = 4
+DESCRIPTION = "related_elements table with the top related elements of the exercises"
+
+# Schema of the table at this version, later changes go in their own migrations
+STATEMENT = """
+    CREATE TABLE IF NOT EXISTS related_elements (
+        id INTEGER NOT NULL,
+        element_id INTEGER NOT NULL,
+        related_element_id INTEGER NOT NULL,
+        rank INTEGER NOT NULL,
+        score FLOAT NOT NULL,
+        PRIMARY KEY (id),
+        CONSTRAINT _related_element_rank_uc UNIQUE (element_id, rank),
+        FOREIGN KEY(element_id) REFERENCES elements (id),
+        FOREIGN KEY(related_element_id) REFERENCES elements (id)
+    )
+"""
+
+
+def upgrade(connection: Connection) -> None:
+    """
+    Create the related_elements table and fill it from the elements already in
+    the database, later ingestions recompute it
+    Args:
+        connection (Connection): database connection inside a transaction
+    """
+    connection.execute(text(STATEMENT))
+    tables = set(inspect(connection).get_table_names())
+    if {"elements", "element_types", "element_links", "subsections"} <= tables:
+        store_related_elements(connection, config.RELATED_TOP_K)
@@ -0,0 +1,39 @@
+" Conversation states and user data of the bot's persistence "
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+VERSION = 5
+DESCRIPTION = "conversation_states and user_data tables of the bot's persistence"
+
+# Schema of the tables at this version, later changes go in their own migrations
+STATEMENTS = (
+    """
+    CREATE TABLE IF NOT EXISTS conversation_states (
+        id INTEGER NOT NULL,
+        name VARCHAR NOT NULL,
+        "key" VARCHAR NOT NULL,
+        state VARCHAR NOT NULL,
+        PRIMARY KEY (id),
+        CONSTRAINT _conversation_name_key_uc UNIQUE (name, "key")
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_data (
+        id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        data VARCHAR NOT NULL,
+        PRIMARY KEY (id),
+        UNIQUE (user_id)
+    )
+    """,
+)
+
+
+def upgrade(connection: Connection) -> None:
+    """
+    Create the tables the bot stores its conversations and user data in
+    Args:
+        connection (Connection): database connection inside a transaction
+    """
+    for statement in STATEMENTS:
+        connection.execute(text(statement))
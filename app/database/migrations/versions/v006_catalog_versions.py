@@ -0,0 +1,24 @@
+" Version of the exercise catalog checked by running bots "
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+VERSION = 6
+DESCRIPTION = "catalog_versions table with the version of the exercise catalog"
+
+# Schema of the table at this version, later changes go in their own migrations
+STATEMENT = """
+    CREATE TABLE IF NOT EXISTS catalog_versions (
+        id INTEGER NOT NULL,
+        version INTEGER NOT NULL,
+        PRIMARY KEY (id)
+    )
+"""
+
+
+def upgrade(connection: Connection) -> None:
+    """
+    Create the catalog_versions table, the reads do not create it
+    Args:
+        connection (Connection): database connection inside a transaction
+    """
+    connection.execute(text(STATEMENT))
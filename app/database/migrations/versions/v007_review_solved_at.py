@@ -0,0 +1,18 @@
+" Time of the last solve of a reviewed exercise "
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+VERSION = 7
+DESCRIPTION = "solved_at column of the reviews"
+
+
+def upgrade(connection: Connection) -> None:
+    """
+    Add the solved_at column to the reviews table of version 3, a table
+    created from the models already has it
+    Args:
+        connection (Connection): database connection inside a transaction
+    """
+    columns = {column["name"] for column in inspect(connection).get_columns("reviews")}
+    if "solved_at" not in columns:
+        connection.execute(text("ALTER TABLE reviews ADD COLUMN solved_at DATETIME"))
@@ -0,0 +1,30 @@
+" Previous schedule of the reviews and the lookup of the last solve "
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+VERSION = 8
+DESCRIPTION = "previous schedule of the reviews and their (user_id, solved_at) index"
+
+COLUMNS = {
+    "previous_due_at": "DATETIME",
+    "previous_interval": "FLOAT",
+}
+
+
+def upgrade(connection: Connection) -> None:
+    """
+    Add the columns /remove restores a review from and the index it finds the
+    last solve with
+    Args:
+        connection (Connection): database connection inside a transaction
+    """
+    columns = {column["name"] for column in inspect(connection).get_columns("reviews")}
+    for name, column_type in COLUMNS.items():
+        if name not in columns:
+            connection.execute(text(f"ALTER TABLE reviews ADD COLUMN {name} {column_type}"))
+    connection.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_reviews_user_id_solved_at "
+            "ON reviews (user_id, solved_at)"
+        )
+    )
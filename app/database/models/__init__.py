@@ -5,4 +5,14 @@ from app.database.models.book import (
     ElementTypes,
     Element,
     ElementLinks,
+    RelatedElement,
 )
+from app.database.models.paragraphs import Paragraph
+from app.database.models.solutions import Solution
+from app.database.models.tables import Table
+from app.database.models.exercises import Exercise
+from app.database.models.users import User
+from app.database.models.solved_exercises import SolvedExercise
+from app.database.models.selected_paragraphs import SelectedParagraph
+from app.database.models.persistence import ConversationState, UserData
+from app.database.models.reviews import Review
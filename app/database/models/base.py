@@ -1,7 +1,27 @@
 "A module that contains the Base classe to be inherited by all models."
 
+from sqlalchemy import Column, ForeignKey, Integer, String
 from sqlalchemy.orm import DeclarativeBase
 
 
 class Base(DeclarativeBase):
     pass
+
+
+class CommonAttributes(Base):
+    """
+    Columns shared by the exercises and the solutions of a paragraph
+
+    Attributes:
+        id: Unique identifier
+        paragraph_id: Paragraph id that the item belongs to
+        number: Item number in the paragraph
+        contents: Item contents
+    """
+
+    __abstract__ = True
+
+    id = Column(Integer, primary_key=True)
+    paragraph_id = Column(Integer, ForeignKey("paragraphs.id"), nullable=False)
+    number = Column(Integer, nullable=False)
+    contents = Column(String, nullable=False)
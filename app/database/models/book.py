@@ -1,7 +1,9 @@
 "Contains the Exercise class that represents an exercise from the book, stored in the database"
 
-from sqlalchemy.orm import relationship
-from sqlalchemy import Column, Integer, ForeignKey, String, UniqueConstraint
+from typing import Type, Dict, Any
+from sqlalchemy.orm import Session, relationship
+from sqlalchemy import Column, Integer, Float, ForeignKey, String, UniqueConstraint
+from sqlalchemy.exc import NoResultFound
 from app.database.models.base import Base
 
 
@@ -27,10 +29,67 @@ class Section(Base):
     subsections = relationship(
         "Subsection", back_populates="section", uselist=True, cascade="all, delete"
     )
+    # Paragraphs and tables the exercises are served from
+    paragraph = relationship("Paragraph", back_populates="section")
+    tables = relationship("Table", back_populates="section", uselist=True)
 
     def __repr__(self) -> str:
         return f"Section(number={self.number}, title={self.title})"
 
+    @classmethod
+    def section_by_number(
+        cls: Type["Section"], number: str, session: Session
+    ) -> "Section":
+        """
+        Get the section by number
+        Args:
+            number (str): section number
+            session (Session): SQLAlchemy session
+        Returns:
+            Section: Section object
+        """
+        section = session.query(cls).filter_by(number=number).one_or_none()
+        if not section:
+            raise NoResultFound(
+                f"Section with number {number} not found in the database"
+            )
+        return section
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the section to a dictionary
+        Returns:
+            Dict[str, Any]: Section dictionary
+        """
+        return {
+            "id": self.id,
+            "number": self.number,
+            "title": self.title,
+            "paragraph_count": len(self.paragraph),
+        }
+
+    @classmethod
+    def get_all_sections(
+        cls: Type["Section"], session: Session
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Get all sections
+        Args:
+            session (Session): SQLAlchemy session
+        Returns:
+            Dict[int, Dict[str, Any]]: Dictionary with section id and section dictionary
+        """
+        # Get all sections
+        sections = session.query(cls).all()
+
+        # Check if sections were found
+        if not sections:
+            raise ValueError("No sections found in the database")
+
+        # Create a list with all sections
+        sections_dict = {section.id: section.to_dict() for section in sections}
+        return sections_dict
+
 
 class Subsection(Base):
     __tablename__ = "subsections"
@@ -170,3 +229,32 @@ class ElementLinks(Base):
 
     def __repr__(self) -> str:
         return f"ElementLink(source_element_id={self.source_element_id}, target_element_id={self.target_element_id})"
+
+
+class RelatedElement(Base):
+    __tablename__ = "related_elements"
+    __table_args__ = (
+        UniqueConstraint(
+            "element_id",
+            "rank",
+            name="_related_element_rank_uc",
+        ),
+    )
+
+    # Attributes
+    id = Column(Integer, primary_key=True)
+    element_id = Column(
+        Integer,
+        ForeignKey("elements.id"),
+        nullable=False,
+    )
+    related_element_id = Column(
+        Integer,
+        ForeignKey("elements.id"),
+        nullable=False,
+    )
+    rank = Column(Integer, nullable=False)
+    score = Column(Float, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"RelatedElement(element_id={self.element_id}, related_element_id={self.related_element_id}, rank={self.rank})"
@@ -1,6 +1,6 @@
 "Contains the Exercise class that represents an exercise from the book, stored in the database"
 from sqlalchemy.orm import relationship
-from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy import Column, Integer, ForeignKey, Index
 from app.database.models.base import CommonAttributes
 
 
@@ -10,6 +10,7 @@ class Exercise(CommonAttributes):
     """
 
     __tablename__ = "exercises"
+    __table_args__ = (Index("ix_exercises_paragraph_id", "paragraph_id"),)
 
     solution_id = Column(
         Integer, ForeignKey("solutions.id"), nullable=False, unique=True
@@ -0,0 +1,36 @@
+"Contains the classes that store the bot's conversation states and user data in the database"
+
+from sqlalchemy import Column, Integer, String, UniqueConstraint
+from app.database.models.base import Base
+
+
+class ConversationState(Base):
+    __tablename__ = "conversation_states"
+    __table_args__ = (
+        UniqueConstraint(
+            "name",
+            "key",
+            name="_conversation_name_key_uc",
+        ),
+    )
+
+    # Attributes
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+    key = Column(String, nullable=False)
+    state = Column(String, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"ConversationState(name={self.name}, key={self.key}, state={self.state})"
+
+
+class UserData(Base):
+    __tablename__ = "user_data"
+
+    # Attributes
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False, unique=True)
+    data = Column(String, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"UserData(user_id={self.user_id}, data={self.data})"
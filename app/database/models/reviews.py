@@ -0,0 +1,42 @@
+"Contains the Review class that stores the spaced repetition state of a solved exercise"
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, UniqueConstraint
+from app.database.models.base import Base
+
+
+class Review(Base):
+    """
+    Represents a table with the review schedule of the exercises solved by users
+
+    Attributes:
+        id: Unique identifier
+        user_id: User who solved the exercise
+        exercise_id: Solved exercise
+        due_at: UTC time when the exercise should be reviewed
+        solved_at: UTC time when the exercise was last solved or reviewed successfully
+        interval: Days between the last two reviews
+        ease: Factor the interval grows by after a successful review
+        repetitions: Successful reviews in a row
+        previous_due_at: Due time before the last successful review, None after the first solve
+        previous_interval: Interval before the last successful review
+    """
+
+    __tablename__ = "reviews"
+    __table_args__ = (
+        UniqueConstraint("user_id", "exercise_id", name="_review_user_exercise_uc"),
+        Index("ix_reviews_user_id_due_at", "user_id", "due_at"),
+        Index("ix_reviews_user_id_solved_at", "user_id", "solved_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    exercise_id = Column(Integer, ForeignKey("exercises.id"), nullable=False)
+    due_at = Column(DateTime, nullable=False)
+    solved_at = Column(DateTime, nullable=True)
+    interval = Column(Float, nullable=False, default=0)
+    ease = Column(Float, nullable=False, default=2.5)
+    repetitions = Column(Integer, nullable=False, default=0)
+    previous_due_at = Column(DateTime, nullable=True)
+    previous_interval = Column(Float, nullable=True)
+
+    def __repr__(self) -> str:
+        return f"Review(user_id={self.user_id}, exercise_id={self.exercise_id}, due_at={self.due_at})"
@@ -1,7 +1,7 @@
 "Contains the SelectedParagraph class that represents a paragraphs selected by user in the database"
 import logging
 from typing import Dict, List, Any
-from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy import Column, Integer, ForeignKey, Index
 from sqlalchemy.orm import relationship, Session
 from app.database.models.base import Base
 
@@ -12,6 +12,9 @@ class SelectedParagraph(Base):
     """
 
     __tablename__ = "selected_paragraphs"
+    __table_args__ = (
+        Index("ix_selected_paragraphs_user_id_paragraph_id", "user_id", "paragraph_id"),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
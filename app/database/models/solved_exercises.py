@@ -1,5 +1,5 @@
 "Contains the SolvedExercise class that represents a solved exercise by a user"
-from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy import Column, Integer, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.database.models.base import Base
 
@@ -10,6 +10,9 @@ class SolvedExercise(Base):
     """
 
     __tablename__ = "solved_exercises"
+    __table_args__ = (
+        Index("ix_solved_exercises_user_id_exercise_id", "user_id", "exercise_id"),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -23,10 +23,10 @@ class User(Base):
     __tablename__ = "users"
 
     id = Column(Integer, primary_key=True)
-    telegram_id = Column(String, nullable=False)
+    telegram_id = Column(String, nullable=False, index=True)
     first_name = Column(String, nullable=True)
     username = Column(String, nullable=True)
-    score = Column(Integer, default=0)
+    score = Column(Integer, default=0, index=True)
     last_trial_id = Column(Integer, ForeignKey("exercises.id"), nullable=True)
     select_paragraphs = Column(Boolean, default=False)
 
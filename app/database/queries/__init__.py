@@ -1,3 +1,2 @@
-from app.database.queries.db_populate import *
 from app.database.queries.utils import *
 from app.database.queries.cache import cache_region
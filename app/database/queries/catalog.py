@@ -0,0 +1,261 @@
+" Read-only in-memory catalog of the exercises, their paragraphs and sections "
+import sys
+import time
+import logging
+import threading
+from array import array
+from typing import List, Tuple
+from sqlalchemy import Column, Integer, Table, select
+from sqlalchemy.engine import Connection, Engine
+from app import config
+from app.database.models import Base, Exercise, Paragraph, Section
+from app.database.queries.utils import engine
+
+logger = logging.getLogger(__name__)
+
+# Single row with a counter bumped by every ingestion of the book, created
+# with the models or by the migration of existing databases
+catalog_versions = Table(
+    "catalog_versions",
+    Base.metadata,
+    Column("id", Integer, primary_key=True),
+    Column("version", Integer, nullable=False),
+)
+
+
+def get_catalog_version(connection: Connection) -> int:
+    """
+    Get the version of the catalog in the database
+    Args:
+        connection (Connection): database connection
+    Returns:
+        int: catalog version, 0 if the book was never ingested
+    """
+    return connection.execute(select(catalog_versions.c.version)).scalar() or 0
+
+
+def bump_catalog_version(engine: Engine) -> int:
+    """
+    Mark the catalog as changed, so that running bots reload it
+    Args:
+        engine (Engine): database engine
+    Returns:
+        int: new catalog version
+    """
+    with engine.begin() as connection:
+        version = get_catalog_version(connection) + 1
+        connection.execute(catalog_versions.delete())
+        connection.execute(catalog_versions.insert().values(id=1, version=version))
+    return version
+
+
+class ExerciseCatalog:
+    """
+    Snapshot of the exercise catalog. Exercises, paragraphs and sections are
+    kept in parallel arrays: an exercise points to its paragraph by index and
+    a paragraph to its section, titles are interned. Position of an exercise
+    is looked up by id in an array, so lookups take O(1) without the database.
+
+    Args:
+        version (int): catalog version of the snapshot
+    """
+
+    __slots__ = (
+        "version",
+        "exercise_ids",
+        "_positions",
+        "_contents",
+        "_exercise_paragraphs",
+        "paragraph_ids",
+        "_paragraph_titles",
+        "_paragraph_sections",
+        "section_ids",
+        "_section_titles",
+    )
+
+    def __init__(self, version: int = 0) -> None:
+        self.version = version
+        self.exercise_ids = array("l")
+        self._positions = array("l")
+        self._contents: List[str] = []
+        self._exercise_paragraphs = array("l")
+        self.paragraph_ids = array("l")
+        self._paragraph_titles: List[str] = []
+        self._paragraph_sections = array("l")
+        self.section_ids = array("l")
+        self._section_titles: List[str] = []
+
+    @classmethod
+    def load(cls, connection: Connection, version: int) -> "ExerciseCatalog":
+        """
+        Load the catalog with a query per table
+        Args:
+            connection (Connection): database connection
+            version (int): catalog version the tables are at
+        Returns:
+            ExerciseCatalog: loaded catalog
+        """
+        catalog = cls(version)
+        sections = Section.__table__
+        paragraphs = Paragraph.__table__
+        exercises = Exercise.__table__
+
+        section_index = {}
+        for section_id, title in connection.execute(
+            select(sections.c.id, sections.c.title).order_by(sections.c.id)
+        ):
+            section_index[section_id] = len(catalog.section_ids)
+            catalog.section_ids.append(section_id)
+            catalog._section_titles.append(sys.intern(title))
+
+        paragraph_index = {}
+        for paragraph_id, title, section_id in connection.execute(
+            select(paragraphs.c.id, paragraphs.c.title, paragraphs.c.section_id).order_by(
+                paragraphs.c.id
+            )
+        ):
+            paragraph_index[paragraph_id] = len(catalog.paragraph_ids)
+            catalog.paragraph_ids.append(paragraph_id)
+            catalog._paragraph_titles.append(sys.intern(title))
+            catalog._paragraph_sections.append(section_index[section_id])
+
+        for exercise_id, contents, paragraph_id in connection.execute(
+            select(exercises.c.id, exercises.c.contents, exercises.c.paragraph_id).order_by(
+                exercises.c.id
+            )
+        ):
+            catalog.exercise_ids.append(exercise_id)
+            catalog._contents.append(contents)
+            catalog._exercise_paragraphs.append(paragraph_index[paragraph_id])
+
+        if catalog.exercise_ids:
+            catalog._positions = array("l", [-1]) * (catalog.exercise_ids[-1] + 1)
+            for position, exercise_id in enumerate(catalog.exercise_ids):
+                catalog._positions[exercise_id] = position
+        return catalog
+
+    def __len__(self) -> int:
+        return len(self.exercise_ids)
+
+    def __contains__(self, exercise_id: int) -> bool:
+        return 0 <= exercise_id < len(self._positions) and self._positions[exercise_id] >= 0
+
+    def exercise(self, exercise_id: int) -> Tuple[int, str, str, str] | None:
+        """
+        Get an exercise with the titles of its paragraph and section
+        Args:
+            exercise_id (int): exercise id
+        Returns:
+            Tuple[int, str, str, str] | None: Exercise id, contents, paragraph title,
+                section title. None if the exercise is not in the catalog
+        """
+        if exercise_id not in self:
+            return None
+        position = self._positions[exercise_id]
+        paragraph = self._exercise_paragraphs[position]
+        return (
+            exercise_id,
+            self._contents[position],
+            self._paragraph_titles[paragraph],
+            self._section_titles[self._paragraph_sections[paragraph]],
+        )
+
+
+class CatalogLoader:
+    """
+    Holds the current catalog snapshot and replaces it once the catalog
+    version in the database changes. The version is checked at most every
+    `check_interval` seconds, or right away when an unknown exercise is asked.
+    An exercise added without a version bump is read from the database.
+
+    Args:
+        engine (Engine): database engine
+        check_interval (float): seconds between catalog version checks
+    """
+
+    def __init__(self, engine: Engine, check_interval: float = 60) -> None:
+        self.engine = engine
+        self.check_interval = check_interval
+        self._catalog: ExerciseCatalog | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, force_check: bool = False) -> ExerciseCatalog:
+        """
+        Get the current catalog, loading it if the version changed
+        Args:
+            force_check (bool): check the version even if it was checked recently
+        Returns:
+            ExerciseCatalog: catalog snapshot
+        """
+        catalog = self._catalog
+        if (
+            catalog is not None
+            and not force_check
+            and time.monotonic() - self._checked_at < self.check_interval
+        ):
+            return catalog
+        with self._lock:
+            with self.engine.connect() as connection:
+                version = get_catalog_version(connection)
+                if self._catalog is None or self._catalog.version != version:
+                    self._catalog = ExerciseCatalog.load(connection, version)
+                    logger.info(
+                        "Loaded the catalog version %s with %d exercises",
+                        version,
+                        len(self._catalog),
+                    )
+                connection.commit()
+            self._checked_at = time.monotonic()
+            return self._catalog
+
+    def exercise(self, exercise_id: int) -> Tuple[int, str, str, str]:
+        """
+        Get an exercise with the titles of its paragraph and section
+        Args:
+            exercise_id (int): exercise id
+        Returns:
+            Tuple[int, str, str, str]: Exercise id, contents, paragraph title, section title
+        Raises:
+            KeyError: if the exercise is not in the catalog
+        """
+        exercise = self.get().exercise(exercise_id)
+        if exercise is None:
+            # the catalog may have changed since the last check
+            exercise = self.get(force_check=True).exercise(exercise_id)
+        if exercise is None:
+            exercise = self._query_exercise(exercise_id)
+        if exercise is None:
+            raise KeyError(f"Exercise {exercise_id} is not in the catalog")
+        return exercise
+
+    def _query_exercise(self, exercise_id: int) -> Tuple[int, str, str, str] | None:
+        """
+        Read an exercise missing in the snapshot from the database
+        Args:
+            exercise_id (int): exercise id
+        Returns:
+            Tuple[int, str, str, str] | None: Exercise id, contents, paragraph title,
+                section title. None if the exercise is not in the database
+        """
+        sections = Section.__table__
+        paragraphs = Paragraph.__table__
+        exercises = Exercise.__table__
+        with self.engine.connect() as connection:
+            row = connection.execute(
+                select(exercises.c.id, exercises.c.contents, paragraphs.c.title, sections.c.title)
+                .join(paragraphs, paragraphs.c.id == exercises.c.paragraph_id)
+                .join(sections, sections.c.id == paragraphs.c.section_id)
+                .where(exercises.c.id == exercise_id)
+            ).one_or_none()
+        if row is None:
+            return None
+        logger.warning(
+            "Exercise %s is not in the catalog version %s, was the version bumped?",
+            exercise_id,
+            self._catalog.version,
+        )
+        return tuple(row)
+
+
+exercise_catalog = CatalogLoader(engine, config.CATALOG_CHECK_INTERVAL)
@@ -6,6 +6,8 @@ from app.database.queries.utils import session_scope
 from app.database.models import Base
 from app.database.queries.utils import engine
 from app.database.queries.table_populate import add_paragraph, add_exercise
+from app.database.queries.catalog import bump_catalog_version
+from app.database.queries.related import compute_related_elements
 
 
 def initialize_database():
@@ -91,6 +93,12 @@ def populate_database(bookpath: str, solutionpath: str) -> None:
     # Process book to populate exercises table
     process_book(bookpath)
 
+    # Precompute the related theory of the exercises
+    compute_related_elements(engine, config.RELATED_TOP_K)
+
+    # Make running bots reload the exercise catalog
+    bump_catalog_version(engine)
+
 
 if __name__ == "__main__":
     initialize_database()
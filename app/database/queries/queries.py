@@ -1,6 +1,7 @@
 "A module for database queries"
 import logging
 from typing import Tuple, List, Dict, Any
+from sqlalchemy import select
 from sqlalchemy.sql.expression import func
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import NoResultFound
@@ -11,20 +12,31 @@ from app.database.models import (
     Paragraph,
     SelectedParagraph,
     SolvedExercise,
+    Solution,
 )
 from app.database.queries.utils import session_scope
 from app.database.queries.cache import cache_region
+from app.database.queries.write_behind import user_writes
+from app.database.queries.catalog import exercise_catalog
+from app.database.queries.reviews import (
+    due_review_id,
+    forget_review,
+    lapse_review,
+    last_solved_review,
+    undo_review,
+)
 
 
 def get_random_exercise(
-    first_name: str, telegram_id: str, username: str
+    first_name: str, telegram_id: str, username: str, exclude_id: int | None = None
 ) -> Tuple[int, str, str, str]:
     """
-    Retrieve a random exercise from the database.
+    Retrieve an exercise due for review, or a random unsolved exercise if none is due.
     Args:
         first_name (str): user's first name
         telegram_id (int): user's telegram_id
         username (str): user's username
+        exclude_id (int | None): exercise that must not be picked, e.g. the current one
     Returns:
         Tuple[int, str, str, str]: Exercise id, contents, paragraph title, section title
     """
@@ -32,47 +44,63 @@ def get_random_exercise(
         # get user
         user = User.user_by_telegram_id(telegram_id, session)
 
-        # Extract the IDs of solved exercises
-        solved_exercise_ids = [
-            solved_exercise.exercise_id for solved_exercise in user.solved_exercises
-        ]
-
         # Get the paragraph IDs the user has selected
-        selected_paragraph_ids = (
-            session.query(SelectedParagraph.paragraph_id)
-            .filter(SelectedParagraph.user_id == user.id)
-            .subquery()
-        )
-
-        # get a random exercise that user hasn't solved yet
+        selected_paragraph_ids = None
         if user.select_paragraphs:
-            exercise = (
-                session.query(Exercise)
-                .join(Paragraph, Exercise.paragraph_id == Paragraph.id)
-                .filter(Paragraph.id.in_(selected_paragraph_ids))
-                .filter(~Exercise.id.in_(solved_exercise_ids))
-                .order_by(func.random())
-                .first()
-            )
-        else:
-            exercise = (
-                session.query(Exercise)
-                .filter(~Exercise.id.in_(solved_exercise_ids))
-                .order_by(func.random())
-                .first()
+            selected_paragraph_ids = select(SelectedParagraph.paragraph_id).where(
+                SelectedParagraph.user_id == user.id
             )
 
-        if exercise is None:
+        # reviews that are due come before new exercises
+        exercise_id = due_review_id(
+            user.id, session, selected_paragraph_ids, exclude_id=exclude_id
+        )
+
+        # get a random exercise that user hasn't solved yet, the solved ones
+        # are looked up in the index instead of being loaded
+        if exercise_id is None:
+            solved = (
+                session.query(SolvedExercise.id)
+                .filter(
+                    SolvedExercise.user_id == user.id,
+                    SolvedExercise.exercise_id == Exercise.id,
+                )
+                .exists()
+            )
+            query = session.query(Exercise.id).filter(~solved)
+            if selected_paragraph_ids is not None:
+                query = query.filter(Exercise.paragraph_id.in_(selected_paragraph_ids))
+            if exclude_id is not None:
+                query = query.filter(Exercise.id != exclude_id)
+            exercise_id = query.order_by(func.random()).limit(1).scalar()
+
+        if exercise_id is None:
             error_message = "No unsolved exercises found for the user"
             logging.error(error_message)
             raise NoResultFound(error_message)
 
-        return (
-            exercise.id,
-            exercise.contents,
-            exercise.paragraph.title,
-            exercise.paragraph.section.title,
+    # contents and titles come from the in-memory catalog
+    return exercise_catalog.exercise(exercise_id)
+
+
+def get_last_trial_id(telegram_id: str) -> int | None:
+    """
+    Get the id of the last exercise that the user tried
+    Args:
+        telegram_id (str): Telegram's user id
+    Returns:
+        int | None: Exercise id, None if the user is not trying an exercise
+    """
+    user_writes.flush_user(telegram_id)
+    with session_scope() as session:
+        row = (
+            session.query(User.last_trial_id)
+            .filter(User.telegram_id == str(telegram_id))
+            .one_or_none()
         )
+    if row is None:
+        raise NoResultFound(f"User with telegram id {telegram_id} not found in the database")
+    return row.last_trial_id
 
 
 def get_current_exercise(telegram_id: str) -> Tuple[int, str, str, str] | None:
@@ -83,46 +111,60 @@ def get_current_exercise(telegram_id: str) -> Tuple[int, str, str, str] | None:
     Returns:
         Tuple[int, str, str, str] | None: Exercise id, contents, paragraph title, section title
     """
-    with session_scope() as session:
-        user = User.user_by_telegram_id(telegram_id, session)
-        if user.last_trial_id is None:
-            return None
-        return (
-            user.last_trial_id,
-            user.exercise.contents,
-            user.exercise.paragraph.title,
-            user.exercise.paragraph.section.title,
-        )
+    # only the id is read, contents and titles come from the in-memory catalog
+    last_trial_id = get_last_trial_id(telegram_id)
+    if last_trial_id is None:
+        return None
+    return exercise_catalog.exercise(last_trial_id)
 
 
-def remove_last_solved_exercise(telegram_id: str) -> None:
+def remove_last_solved_exercise(telegram_id: str) -> int:
     """
-    Remove the last solved exercise
+    Remove the last solved exercise, if it was a review of an exercise solved
+    before only the review is taken back and the exercise stays solved
     Args:
         telegram_id (str): Telegram's user id
+    Returns:
+        int: id of the removed exercise
     """
     with session_scope() as session:
         user = User.user_by_telegram_id(telegram_id, session)
-        solved_exercise = (
-            session.query(SolvedExercise)
-            .filter(SolvedExercise.user_id == user.id)
-            .order_by(SolvedExercise.id.desc())
-            .first()
-        )
-        if solved_exercise is None:
+        review = last_solved_review(user.id, session)
+        if review is not None and review.previous_due_at is not None:
+            solved_exercise_id = review.exercise_id
+            logging.info(
+                "Taking back the review of exercise %s for user %s", solved_exercise_id, user
+            )
+            undo_review(review)
+            session.commit()
+            return solved_exercise_id
+        solved_exercise_id = review.exercise_id if review is not None else None
+        if solved_exercise_id is None:
+            # solved before the solves were recorded with the reviews
+            solved_exercise_id = (
+                session.query(SolvedExercise.exercise_id)
+                .filter(SolvedExercise.user_id == user.id)
+                .order_by(SolvedExercise.id.desc())
+                .limit(1)
+                .scalar()
+            )
+        if solved_exercise_id is None:
             error_message = "No solved exercises found for the user"
             logging.warning(error_message)
             raise NoResultFound(error_message)
-        solved_exercise_id = solved_exercise.exercise_id
-        logging.info("Removing the last solved %s for user %s", solved_exercise, user)
-        session.delete(solved_exercise)
+        logging.info("Removing the solved exercise %s for user %s", solved_exercise_id, user)
+        session.query(SolvedExercise).filter_by(
+            user_id=user.id, exercise_id=solved_exercise_id
+        ).delete()
+        forget_review(user.id, solved_exercise_id, session)
         session.commit()
     return solved_exercise_id
 
 
 def update_users_exercise(telegram_id: str, exercise_id: int) -> None:
     """
-    Update the last exercise that the user tried
+    Update the last exercise that the user tried right away,
+    handlers defer this update with user_writes
     Args:
         telegram_id (int): Telegram's user id
         exercise_id (int): Exercise id
@@ -131,6 +173,7 @@ def update_users_exercise(telegram_id: str, exercise_id: int) -> None:
         user = User.user_by_telegram_id(telegram_id, session)
         user.last_trial_id = exercise_id
         session.commit()
+    user_writes.remember(telegram_id)
 
 
 def get_user_leaderboard(telegram_id: str) -> str:
@@ -177,17 +220,47 @@ def get_user_score(telegram_id: str) -> int:
 
 def user_exercise_soluiton(telegram_id: str) -> Tuple[str, int]:
     """
-    Get the solution of the last exercise that the user tried
+    Get the solution of the last exercise that the user tried, a due review of
+    the exercise lapses since the user could not answer it
     Args:
         telegram_id (str): Telegram's user id
     Returns:
         Tuple[str, int]: Solution text, exercise id
     """
+    user_writes.flush_user(telegram_id)
     with session_scope() as session:
-        user = User.user_by_telegram_id(telegram_id, session)
-        if user.last_trial_id is None:
-            raise NoResultFound("User has not tried any exercise yet")
-        return user.exercise.solution.contents, user.exercise.id
+        row = (
+            session.query(User.id, User.last_trial_id, Solution.contents)
+            .outerjoin(Exercise, Exercise.id == User.last_trial_id)
+            .outerjoin(Solution, Solution.id == Exercise.solution_id)
+            .filter(User.telegram_id == str(telegram_id))
+            .one_or_none()
+        )
+        if row is not None and row.last_trial_id is not None:
+            lapse_review(row.id, row.last_trial_id, session)
+    if row is None:
+        raise NoResultFound(f"User with telegram id {telegram_id} not found in the database")
+    if row.last_trial_id is None:
+        raise NoResultFound("User has not tried any exercise yet")
+    return row.contents, row.last_trial_id
+
+
+def most_solved_exercise_ids(limit: int) -> List[int]:
+    """
+    Get the exercises solved by the most users
+    Args:
+        limit (int): number of exercises
+    Returns:
+        List[int]: exercise ids, most solved first
+    """
+    with session_scope() as session:
+        return [
+            exercise_id
+            for (exercise_id,) in session.query(SolvedExercise.exercise_id)
+            .group_by(SolvedExercise.exercise_id)
+            .order_by(func.count(SolvedExercise.id).desc())
+            .limit(limit)
+        ]
 
 
 @cache_region.cache_on_arguments()
@@ -307,6 +380,23 @@ def get_selected_section_paragraphs(
         }
 
 
+def get_selected_paragraph_ids(telegram_id: str) -> List[int]:
+    """
+    Get the ids of all the paragraphs selected by the user in a single query
+    Args:
+        telegram_id (str): Telegram's user id
+    Returns:
+        List[int]: paragraph ids
+    """
+    with session_scope() as session:
+        return [
+            paragraph_id
+            for (paragraph_id,) in session.query(SelectedParagraph.paragraph_id)
+            .join(User, User.id == SelectedParagraph.user_id)
+            .filter(User.telegram_id == str(telegram_id))
+        ]
+
+
 @cache_region.cache_on_arguments()
 def count_all_exercises() -> Dict[int, Dict[str, Any]]:
     """
@@ -0,0 +1,210 @@
+" Precomputed related elements of the exercises from the element graph "
+import re
+import logging
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Set, Tuple
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from app.database.models import RelatedElement
+from app.database.queries.utils import session_scope
+from app.database.queries.write_behind import user_writes
+
+logger = logging.getLogger(__name__)
+
+# Weights of the ways an element can be related to an exercise
+REFERENCE_WEIGHT = 3.0
+SHARED_TARGET_WEIGHT = 1.0
+SAME_SUBSECTION_WEIGHT = 0.5
+
+# Textual references to other elements, e.g. "Theorem 2.1.3"
+REFERENCE_PATTERN = re.compile(r"\b([A-Z][a-z]+)\s+(\d+)\.(\d+)\.(\d+)\b")
+
+ELEMENTS_QUERY = """
+    SELECT
+        elements.id,
+        element_types.name AS type,
+        sections.number AS section_number,
+        subsections.number AS subsection_number,
+        elements.subsection_id,
+        elements.number,
+        elements.content
+    FROM elements
+    JOIN element_types ON element_types.id = elements.type_id
+    JOIN subsections ON subsections.id = elements.subsection_id
+    JOIN sections ON sections.id = subsections.section_id
+"""
+
+# Related elements of the last trial of a user: the exercise is matched to
+# its book element by section, paragraph and exercise numbers
+RELATED_QUERY = """
+    SELECT
+        element_types.name AS type,
+        sections.number AS section_number,
+        subsections.number AS subsection_number,
+        elements.number,
+        elements.content
+    FROM related_elements
+    JOIN elements ON elements.id = related_elements.related_element_id
+    JOIN element_types ON element_types.id = elements.type_id
+    JOIN subsections ON subsections.id = elements.subsection_id
+    JOIN sections ON sections.id = subsections.section_id
+    WHERE related_elements.element_id = (
+        SELECT exercise_elements.id
+        FROM users
+        JOIN exercises ON exercises.id = users.last_trial_id
+        JOIN paragraphs ON paragraphs.id = exercises.paragraph_id
+        JOIN subsections AS exercise_subsections
+            ON exercise_subsections.section_id = paragraphs.section_id
+            AND exercise_subsections.number = paragraphs.number
+        JOIN element_types AS exercise_types ON exercise_types.name = 'exercise'
+        JOIN elements AS exercise_elements
+            ON exercise_elements.subsection_id = exercise_subsections.id
+            AND exercise_elements.type_id = exercise_types.id
+            AND exercise_elements.number = exercises.number
+        WHERE users.telegram_id = :telegram_id
+    )
+    ORDER BY related_elements.rank
+"""
+
+
+def _references(
+    elements: List[Dict[str, Any]], links: List[Tuple[int, int]]
+) -> Dict[int, Set[int]]:
+    """
+    Find the elements every element refers to, by links and by textual references
+    Args:
+        elements (List[Dict[str, Any]]): all the elements
+        links (List[Tuple[int, int]]): source and target element ids of the links
+    Returns:
+        Dict[int, Set[int]]: referred element ids by element id
+    """
+    by_label = {
+        (
+            element["type"],
+            element["section_number"],
+            element["subsection_number"],
+            element["number"],
+        ): element["id"]
+        for element in elements
+    }
+    references = defaultdict(set)
+    for source, target in links:
+        references[source].add(target)
+    for element in elements:
+        for match in REFERENCE_PATTERN.finditer(element["content"]):
+            label = (match.group(1).lower(), *map(int, match.group(2, 3, 4)))
+            target = by_label.get(label)
+            if target is not None and target != element["id"]:
+                references[element["id"]].add(target)
+    return references
+
+
+def rank_related_elements(
+    elements: List[Dict[str, Any]], links: List[Tuple[int, int]], top_k: int
+) -> Dict[int, List[Tuple[int, float]]]:
+    """
+    Score the elements related to every exercise and keep the best ones
+    Args:
+        elements (List[Dict[str, Any]]): all the elements
+        links (List[Tuple[int, int]]): source and target element ids of the links
+        top_k (int): related elements kept per exercise
+    Returns:
+        Dict[int, List[Tuple[int, float]]]: related element ids and scores by exercise element id
+    """
+    types = {element["id"]: element["type"] for element in elements}
+    references = _references(elements, links)
+    referrers = defaultdict(set)
+    for source, targets in references.items():
+        for target in targets:
+            referrers[target].add(source)
+    exercises_by_subsection = defaultdict(list)
+    for element in elements:
+        if element["type"] == "exercise":
+            exercises_by_subsection[element["subsection_id"]].append(element["id"])
+
+    related = {}
+    for element in elements:
+        if element["type"] != "exercise":
+            continue
+        exercise_id = element["id"]
+        scores = Counter()
+        for target in references[exercise_id]:
+            scores[target] += REFERENCE_WEIGHT
+            for referrer in referrers[target]:
+                scores[referrer] += SHARED_TARGET_WEIGHT
+        for other in exercises_by_subsection[element["subsection_id"]]:
+            scores[other] += SAME_SUBSECTION_WEIGHT
+        scores.pop(exercise_id, None)
+        ranked = sorted(
+            (
+                (related_id, score)
+                for related_id, score in scores.items()
+                if types.get(related_id) not in (None, "solution")
+            ),
+            key=lambda item: (-item[1], item[0]),
+        )
+        if ranked:
+            related[exercise_id] = ranked[:top_k]
+    return related
+
+
+def store_related_elements(connection: Connection, top_k: int = 5) -> int:
+    """
+    Recompute the related elements table from the element graph
+    Args:
+        connection (Connection): database connection inside a transaction
+        top_k (int): related elements kept per exercise
+    Returns:
+        int: number of stored related elements
+    """
+    elements = [dict(row) for row in connection.execute(text(ELEMENTS_QUERY)).mappings()]
+    links = [
+        tuple(row)
+        for row in connection.execute(
+            text("SELECT source_element_id, target_element_id FROM element_links")
+        )
+    ]
+    related = rank_related_elements(elements, links, top_k)
+    rows = [
+        {
+            "element_id": element_id,
+            "related_element_id": related_id,
+            "rank": rank,
+            "score": score,
+        }
+        for element_id, ranked in related.items()
+        for rank, (related_id, score) in enumerate(ranked)
+    ]
+    table = RelatedElement.__table__
+    connection.execute(table.delete())
+    if rows:
+        connection.execute(table.insert(), rows)
+    logger.info("Stored %d related elements of %d exercises", len(rows), len(related))
+    return len(rows)
+
+
+def compute_related_elements(engine: Engine, top_k: int = 5) -> int:
+    """
+    Recompute the related elements table in its own transaction
+    Args:
+        engine (Engine): database engine
+        top_k (int): related elements kept per exercise
+    Returns:
+        int: number of stored related elements
+    """
+    with engine.begin() as connection:
+        return store_related_elements(connection, top_k)
+
+
+def get_related_theory(telegram_id: str) -> List[Dict[str, Any]]:
+    """
+    Get the precomputed related elements of the exercise the user is trying
+    Args:
+        telegram_id (str): Telegram's user id
+    Returns:
+        List[Dict[str, Any]]: related elements with their type, numbers and content, best first
+    """
+    user_writes.flush_user(telegram_id)
+    with session_scope() as session:
+        rows = session.execute(text(RELATED_QUERY), {"telegram_id": str(telegram_id)})
+        return [dict(row) for row in rows.mappings()]
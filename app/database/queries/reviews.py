@@ -0,0 +1,198 @@
+" Spaced repetition schedule of the solved exercises, a variant of SM-2 "
+from datetime import datetime, timedelta, timezone
+from typing import Tuple
+from sqlalchemy import Select
+from sqlalchemy.orm import Session
+from app.database.models import Exercise, Review
+
+# Days until the first and the second review of a solved exercise
+FIRST_INTERVAL = 1
+SECOND_INTERVAL = 6
+MIN_EASE = 1.3
+
+# Quality of an answer on the SM-2 scale from 0 to 5, below 3 is a lapse.
+# A solve is a good answer, asking for the solution of a due review a lapse
+GOOD = 4
+AGAIN = 1
+
+
+def utcnow() -> datetime:
+    """
+    Get the current UTC time as stored in the database
+    Returns:
+        datetime: naive UTC time
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def next_schedule(
+    repetitions: int, interval: float, ease: float, quality: int
+) -> Tuple[int, float, float]:
+    """
+    Compute the schedule after a review
+    Args:
+        repetitions (int): successful reviews in a row
+        interval (float): days between the last two reviews
+        ease (float): factor the interval grows by
+        quality (int): quality of the answer from 0 to 5
+    Returns:
+        Tuple[int, float, float]: new repetitions, interval in days and ease
+    """
+    if quality < 3:
+        repetitions, interval = 0, FIRST_INTERVAL
+    else:
+        if repetitions == 0:
+            interval = FIRST_INTERVAL
+        elif repetitions == 1:
+            interval = SECOND_INTERVAL
+        else:
+            interval = round(interval * ease)
+        repetitions += 1
+    ease = max(MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    return repetitions, interval, ease
+
+
+def record_review(
+    user_id: int,
+    exercise_id: int,
+    session: Session,
+    quality: int = GOOD,
+    now: datetime | None = None,
+) -> Review:
+    """
+    Schedule the next review of an exercise the user has just solved
+    Args:
+        user_id (int): user id
+        exercise_id (int): exercise id
+        session (Session): SQLAlchemy session
+        quality (int): quality of the answer from 0 to 5
+        now (datetime | None): UTC time of the review
+    Returns:
+        Review: updated review state
+    """
+    now = now or utcnow()
+    review = get_review(user_id, exercise_id, session)
+    if review is None:
+        review = Review(user_id=user_id, exercise_id=exercise_id, interval=0, ease=2.5, repetitions=0)
+        session.add(review)
+    elif quality >= 3:
+        # kept so that /remove can take the review back
+        review.previous_due_at, review.previous_interval = review.due_at, review.interval
+    review.repetitions, review.interval, review.ease = next_schedule(
+        review.repetitions, review.interval, review.ease, quality
+    )
+    review.due_at = now + timedelta(days=review.interval)
+    if quality >= 3:
+        review.solved_at = now
+    return review
+
+
+def get_review(user_id: int, exercise_id: int, session: Session) -> Review | None:
+    """
+    Get the review state of an exercise
+    Args:
+        user_id (int): user id
+        exercise_id (int): exercise id
+        session (Session): SQLAlchemy session
+    Returns:
+        Review | None: review state, None if the user never solved the exercise
+    """
+    return (
+        session.query(Review).filter_by(user_id=user_id, exercise_id=exercise_id).one_or_none()
+    )
+
+
+def lapse_review(
+    user_id: int, exercise_id: int, session: Session, now: datetime | None = None
+) -> bool:
+    """
+    Reschedule a due review the user could not answer, it comes back the next day
+    Args:
+        user_id (int): user id
+        exercise_id (int): exercise id
+        session (Session): SQLAlchemy session
+        now (datetime | None): UTC time of the review
+    Returns:
+        bool: whether the exercise was due for review
+    """
+    now = now or utcnow()
+    review = get_review(user_id, exercise_id, session)
+    if review is None or review.due_at > now:
+        return False
+    record_review(user_id, exercise_id, session, quality=AGAIN, now=now)
+    return True
+
+
+def last_solved_review(user_id: int, session: Session) -> Review | None:
+    """
+    Get the review state of the exercise the user solved or reviewed last,
+    found with the (user_id, solved_at) index
+    Args:
+        user_id (int): user id
+        session (Session): SQLAlchemy session
+    Returns:
+        Review | None: review state, None if no solve was recorded with a review
+    """
+    return (
+        session.query(Review)
+        .filter(Review.user_id == user_id, Review.solved_at.is_not(None))
+        .order_by(Review.solved_at.desc())
+        .first()
+    )
+
+
+def undo_review(review: Review) -> None:
+    """
+    Take back the last successful review of an exercise, it is due again as it
+    was before the review. A good answer keeps the ease, so only the
+    repetitions, the interval and the due time change back. The exercise no
+    longer counts as solved last.
+    Args:
+        review (Review): review state with a previous schedule
+    """
+    review.repetitions = max(review.repetitions - 1, 0)
+    review.interval = review.previous_interval
+    review.due_at = review.previous_due_at
+    review.solved_at = None
+    review.previous_due_at = review.previous_interval = None
+
+
+def due_review_id(
+    user_id: int,
+    session: Session,
+    paragraph_ids: Select | None = None,
+    exclude_id: int | None = None,
+    now: datetime | None = None,
+) -> int | None:
+    """
+    Get the exercise that is overdue for review the longest, found with the (user_id, due_at) index
+    Args:
+        user_id (int): user id
+        session (Session): SQLAlchemy session
+        paragraph_ids (Select | None): select of the paragraphs to review, all if None
+        exclude_id (int | None): exercise that must not be picked
+        now (datetime | None): current UTC time
+    Returns:
+        int | None: exercise id, None if no review is due
+    """
+    query = session.query(Review.exercise_id).filter(
+        Review.user_id == user_id, Review.due_at <= (now or utcnow())
+    )
+    if paragraph_ids is not None:
+        query = query.join(Exercise, Exercise.id == Review.exercise_id).filter(
+            Exercise.paragraph_id.in_(paragraph_ids)
+        )
+    if exclude_id is not None:
+        query = query.filter(Review.exercise_id != exclude_id)
+    return query.order_by(Review.due_at).limit(1).scalar()
+
+
+def forget_review(user_id: int, exercise_id: int, session: Session) -> None:
+    """
+    Remove the review schedule of an exercise that is no longer solved
+    Args:
+        user_id (int): user id
+        exercise_id (int): exercise id
+        session (Session): SQLAlchemy session
+    """
+    session.query(Review).filter_by(user_id=user_id, exercise_id=exercise_id).delete()
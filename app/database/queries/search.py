@@ -0,0 +1,134 @@
+" Full-text search over the book elements with an SQLite FTS5 index "
+import re
+from typing import Any, Dict, List, Tuple
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from app.database.queries.utils import session_scope
+
+# Element contents and subsection titles, the rowid is the element id
+SEARCH_TABLE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS element_search "
+    "USING fts5(content, title, tokenize = 'porter unicode61')"
+)
+
+# Triggers keeping the index in sync with elements and subsections
+SEARCH_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS elements_search_insert AFTER INSERT ON elements BEGIN
+        INSERT INTO element_search (rowid, content, title)
+        SELECT new.id, new.content, title FROM subsections WHERE id = new.subsection_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS elements_search_delete AFTER DELETE ON elements BEGIN
+        DELETE FROM element_search WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS elements_search_update
+    AFTER UPDATE OF content, subsection_id ON elements BEGIN
+        DELETE FROM element_search WHERE rowid = old.id;
+        INSERT INTO element_search (rowid, content, title)
+        SELECT new.id, new.content, title FROM subsections WHERE id = new.subsection_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS subsections_search_update
+    AFTER UPDATE OF title ON subsections BEGIN
+        UPDATE element_search SET title = new.title
+        WHERE rowid IN (SELECT id FROM elements WHERE subsection_id = new.id);
+    END
+    """,
+]
+
+# A match in a subsection title weighs more than a match in the content
+SEARCH_QUERY = """
+    SELECT
+        elements.id,
+        element_types.name AS type,
+        sections.number AS section_number,
+        subsections.number AS subsection_number,
+        elements.number,
+        subsections.title,
+        snippet(element_search, 0, '«', '»', '…', 12) AS snippet
+    FROM element_search
+    JOIN elements ON elements.id = element_search.rowid
+    JOIN element_types ON element_types.id = elements.type_id
+    JOIN subsections ON subsections.id = elements.subsection_id
+    JOIN sections ON sections.id = subsections.section_id
+    WHERE element_search MATCH :query AND element_types.name != 'solution'
+    ORDER BY bm25(element_search, 1.0, 2.0)
+    LIMIT :limit OFFSET :offset
+"""
+
+PAGE_SIZE = 5
+
+
+def create_search_index(connection: Connection) -> None:
+    """
+    Create the search index and its triggers if they do not exist
+    Args:
+        connection (Connection): connection to an SQLite database
+    """
+    connection.execute(text(SEARCH_TABLE))
+    for trigger in SEARCH_TRIGGERS:
+        connection.execute(text(trigger))
+
+
+def rebuild_search_index(connection: Connection) -> None:
+    """
+    Index all the elements again
+    Args:
+        connection (Connection): connection to an SQLite database
+    """
+    connection.execute(text("DELETE FROM element_search"))
+    connection.execute(
+        text(
+            "INSERT INTO element_search (rowid, content, title) "
+            "SELECT elements.id, elements.content, subsections.title FROM elements "
+            "JOIN subsections ON subsections.id = elements.subsection_id"
+        )
+    )
+
+
+def optimize_search_index(connection: Connection) -> None:
+    """
+    Merge the index segments written by an ingestion
+    Args:
+        connection (Connection): connection to an SQLite database
+    """
+    connection.execute(text("INSERT INTO element_search (element_search) VALUES ('optimize')"))
+
+
+def match_query(terms: str) -> str | None:
+    """
+    Build an FTS5 query matching all the words of the terms, the last one as a prefix
+    Args:
+        terms (str): words typed by the user
+    Returns:
+        str | None: FTS5 query, None if there are no words in the terms
+    """
+    words = re.findall(r"\w+", terms)
+    if not words:
+        return None
+    return " ".join(f'"{word}"' for word in words) + "*"
+
+
+def search_elements(terms: str, page: int = 0) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Find the book elements matching the terms, best matches first
+    Args:
+        terms (str): words typed by the user
+        page (int): page number starting from 0
+    Returns:
+        Tuple[List[Dict[str, Any]], bool]: elements of the page and whether there is a next page
+    """
+    query = match_query(terms)
+    if query is None:
+        return [], False
+    with session_scope() as session:
+        rows = session.execute(
+            text(SEARCH_QUERY),
+            {"query": query, "limit": PAGE_SIZE + 1, "offset": page * PAGE_SIZE},
+        ).mappings().all()
+    return [dict(row) for row in rows[:PAGE_SIZE]], len(rows) > PAGE_SIZE
@@ -12,6 +12,8 @@ from app.database.models import (
 )
 from app.database.queries.utils import session_scope
 from app.database.queries.queries import update_user_score
+from app.database.queries.write_behind import user_writes
+from app.database.queries.reviews import get_review, record_review, utcnow
 
 
 def add_user(first_name: str, telegram_id: str, username: str) -> User:
@@ -50,6 +52,7 @@ def add_user(first_name: str, telegram_id: str, username: str) -> User:
             )
             session.add(user)
         session.commit()
+    user_writes.remember(telegram_id)
 
 
 def add_paragraph(
@@ -123,17 +126,33 @@ def add_solved_exercise(telegram_id: str):
     Args:
         user_id (int): user id
     """
+    # the last trial may still be pending
+    user_writes.flush_user(telegram_id)
     with session_scope() as session:
         # get user by telegram id
         user = User.user_by_telegram_id(telegram_id, session)
 
-        # create solved exercise object
-        solved_exercise = SolvedExercise(
-            user_id=user.id, exercise_id=user.last_trial_id
+        # an exercise solved before is a review, it is not scored again
+        solved_before = (
+            session.query(SolvedExercise.id)
+            .filter_by(user_id=user.id, exercise_id=user.last_trial_id)
+            .first()
         )
-        session.add(solved_exercise)
-
-        logging.info("%s solved the exercise %s", user, user.last_trial_id)
+        review = get_review(user.id, user.last_trial_id, session)
+        if solved_before is None:
+            # create solved exercise object
+            solved_exercise = SolvedExercise(
+                user_id=user.id, exercise_id=user.last_trial_id
+            )
+            session.add(solved_exercise)
+            logging.info("%s solved the exercise %s", user, user.last_trial_id)
+            record_review(user.id, user.last_trial_id, session)
+        elif review is None or review.due_at <= utcnow():
+            logging.info("%s reviewed the exercise %s", user, user.last_trial_id)
+            record_review(user.id, user.last_trial_id, session)
+        else:
+            # the review lapsed when the user asked for the solution, keep it soon
+            logging.info("%s solved the exercise %s after its solution", user, user.last_trial_id)
 
         # set the last trial to None
         user.last_trial_id = None
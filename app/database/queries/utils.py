@@ -1,14 +1,123 @@
 from sqlalchemy.orm import sessionmaker
 from contextlib import contextmanager
 import logging
+import time
 from app import config
-from sqlalchemy import create_engine
+from app.utils.metrics import record_statement
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 import os
 
 logger = logging.getLogger(__name__)
 
+
+def sqlite_pragmas(profile: str) -> dict:
+    """
+    Get the PRAGMAs set on every new SQLite connection
+    Args:
+        profile (str): "default" keeps SQLite's defaults, "wal" tunes it for a
+            bot process with concurrent readers and writers
+    Returns:
+        dict: PRAGMA values by name
+    """
+    if profile == "default":
+        return {}
+    return {
+        # readers don't block the writer and the writer doesn't block readers
+        "journal_mode": "WAL",
+        # with WAL, commits survive application crashes, only not power loss
+        "synchronous": "NORMAL",
+        # wait for the write lock instead of failing with "database is locked"
+        "busy_timeout": config.SQLITE_BUSY_TIMEOUT,
+        "mmap_size": config.SQLITE_MMAP_SIZE,
+        # negative values are in KiB
+        "cache_size": -config.SQLITE_CACHE_SIZE,
+    }
+
+
+def create_app_engine(url: str, profile: str = config.DB_PROFILE) -> Engine:
+    """
+    Create the engine, SQLite connections are set up with the profile's PRAGMAs
+    Args:
+        url (str): database URL
+        profile (str): SQLite profile, "default" or "wal"
+    Returns:
+        Engine: SQLAlchemy engine
+    """
+    database_url = make_url(url)
+    pragmas = sqlite_pragmas(profile)
+    if database_url.get_backend_name() != "sqlite" or not pragmas:
+        return create_engine(url)
+
+    if database_url.database in (None, "", ":memory:"):
+        # in-memory databases have a single connection per thread
+        pragmas.pop("journal_mode")
+        new_engine = create_engine(url)
+    else:
+        # keep a connection open for each thread handling an update
+        new_engine = create_engine(
+            url, pool_size=config.DB_POOL_SIZE, max_overflow=config.DB_POOL_SIZE
+        )
+
+    @event.listens_for(new_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+    return new_engine
+
+
 # Create the engine
-engine = create_engine(config.DATABASE_URL)
+engine = create_app_engine(config.DATABASE_URL)
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("statement_start", []).append(time.perf_counter())
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _end_statement(conn, cursor, statement, parameters, context, executemany):
+    record_statement(time.perf_counter() - conn.info["statement_start"].pop())
+
+
+@event.listens_for(engine, "handle_error")
+def _fail_statement(exception_context):
+    # a statement that raises never reaches after_cursor_execute
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("statement_start"):
+        record_statement(time.perf_counter() - conn.info["statement_start"].pop())
+
+
+# Indexes read while handling updates and the tables they belong to
+HOT_INDEXES = {
+    "ix_users_telegram_id": "users",
+    "ix_users_score": "users",
+    "ix_solved_exercises_user_id_exercise_id": "solved_exercises",
+    "ix_selected_paragraphs_user_id_paragraph_id": "selected_paragraphs",
+    "ix_exercises_paragraph_id": "exercises",
+    "ix_reviews_user_id_due_at": "reviews",
+}
+
+
+def warm_indexes(engine: Engine) -> None:
+    """
+    Read the hot indexes of an SQLite database once, so that their pages are
+    in the page cache and the memory map before the first update
+    Args:
+        engine (Engine): database engine
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.connect() as connection:
+        for index, table in HOT_INDEXES.items():
+            try:
+                connection.exec_driver_sql(f"SELECT count(*) FROM {table} INDEXED BY {index}")
+            except Exception:  # pylint: disable=broad-except
+                logger.warning("Could not warm up the index %s", index)
+
 
 # Create a configured "Session" class
 Session = sessionmaker(bind=engine)
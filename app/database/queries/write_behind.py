@@ -0,0 +1,190 @@
+" Write-behind buffer for user updates where the last write wins "
+import time
+import logging
+import threading
+from typing import Any, Dict, Set
+from sqlalchemy import bindparam, select, update
+from app import config
+from app.database.models import User
+from app.database.queries.utils import session_scope
+
+logger = logging.getLogger(__name__)
+
+
+class UserWriteBehind:
+    """
+    Keeps updates of user columns in memory and saves them in batches, either
+    `flush_interval` seconds after the first pending update or once
+    `batch_size` users have pending updates. A newer update of a column
+    replaces the pending one, so a user clicking "Next trial" many times
+    costs a single write.
+
+    Only idempotent updates belong here. Queries reading the columns of a
+    user have to call `flush_user` first, and writes that must not be lost,
+    such as solves, stay synchronous. Updates are queued for the users known
+    to exist, the ones in the database at warm-up and the ones created since,
+    other users take the synchronous path that creates them.
+
+    Args:
+        flush_interval (float): seconds an update can stay in memory
+        batch_size (int): number of users with pending updates that are saved right away
+    """
+
+    def __init__(self, flush_interval: float = 1, batch_size: int = 200) -> None:
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._known_users: Set[str] = set()
+        self._in_flight: Set[str] = set()
+        self._lock = threading.Lock()
+        # held while a batch is written, so that flush_user waits for it
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def load_known_users(self) -> int:
+        """
+        Mark the users already in the database as existing, so that a fresh
+        process defers their updates from the first one
+        Returns:
+            int: number of known users
+        """
+        users = User.__table__
+        with session_scope() as session:
+            telegram_ids = session.execute(select(users.c.telegram_id)).scalars().all()
+        with self._lock:
+            self._known_users.update(telegram_ids)
+            return len(self._known_users)
+
+    def remember(self, telegram_id: str) -> None:
+        """
+        Mark the user as existing in the database
+        Args:
+            telegram_id (str): Telegram's user id
+        """
+        with self._lock:
+            self._known_users.add(str(telegram_id))
+
+    def update(self, telegram_id: str, **values: Any) -> bool:
+        """
+        Update columns of an existing user later
+        Args:
+            telegram_id (str): Telegram's user id
+            values (Any): new column values
+        Returns:
+            bool: False if the user is not known to exist and nothing is queued
+        """
+        telegram_id = str(telegram_id)
+        with self._lock:
+            if telegram_id not in self._known_users:
+                return False
+            self._pending.setdefault(telegram_id, {}).update(values)
+            if len(self._pending) >= self.batch_size:
+                self._wake.set()
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="user-write-behind", daemon=True
+                )
+                self._thread.start()
+        return True
+
+    def _run(self) -> None:
+        """
+        Flush the pending updates periodically or when a batch is full
+        """
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if not self.flush():
+                # back off while the database is failing
+                time.sleep(self.flush_interval)
+
+    def flush(self) -> bool:
+        """
+        Save all the pending updates in a single transaction
+        Returns:
+            bool: False if the write failed and the updates are pending again
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._in_flight = set(pending)
+            try:
+                return self._save(pending)
+            finally:
+                with self._lock:
+                    self._in_flight = set()
+
+    def flush_user(self, telegram_id: str) -> None:
+        """
+        Save the pending updates of a user before its columns are read
+        Args:
+            telegram_id (str): Telegram's user id
+        Raises:
+            RuntimeError: if the updates could not be saved
+        """
+        telegram_id = str(telegram_id)
+        with self._lock:
+            if telegram_id not in self._pending and telegram_id not in self._in_flight:
+                return
+        # wait for the batch being written, a failed batch puts the updates of
+        # the user back to the pending ones, so they are taken afterwards
+        with self._flush_lock:
+            with self._lock:
+                values = self._pending.pop(telegram_id, None)
+            if values and not self._save({telegram_id: values}):
+                raise RuntimeError(f"The pending updates of user {telegram_id} were not saved")
+
+    def _save(self, pending: Dict[str, Dict[str, Any]]) -> bool:
+        """
+        Write the updates, put them back to pending ones if the write fails so
+        that the next flush retries them instead of failing the caller's update
+        Args:
+            pending (Dict[str, Dict[str, Any]]): column values by telegram id
+        Returns:
+            bool: whether the updates were written
+        """
+        try:
+            self._write(pending)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Failed to save the pending updates of %d users", len(pending))
+            # keep the updates unless newer ones arrived meanwhile
+            with self._lock:
+                for telegram_id, values in pending.items():
+                    self._pending[telegram_id] = {
+                        **values,
+                        **self._pending.get(telegram_id, {}),
+                    }
+            return False
+        return True
+
+    @staticmethod
+    def _write(pending: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Update the users with one executemany per set of updated columns
+        Args:
+            pending (Dict[str, Dict[str, Any]]): column values by telegram id
+        """
+        if not pending:
+            return
+        groups: Dict[tuple, list] = {}
+        for telegram_id, values in pending.items():
+            groups.setdefault(tuple(sorted(values)), []).append(
+                {
+                    "user_telegram_id": telegram_id,
+                    **{f"new_{column}": value for column, value in values.items()},
+                }
+            )
+        users = User.__table__
+        with session_scope() as session:
+            for columns, rows in groups.items():
+                statement = (
+                    update(users)
+                    .where(users.c.telegram_id == bindparam("user_telegram_id"))
+                    .values({column: bindparam(f"new_{column}") for column in columns})
+                )
+                session.execute(statement, rows)
+        logger.debug("Saved pending updates of %d users", len(pending))
+
+
+user_writes = UserWriteBehind(config.WRITE_BEHIND_INTERVAL, config.WRITE_BEHIND_BATCH_SIZE)
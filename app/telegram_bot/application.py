@@ -0,0 +1,134 @@
+" Registration of all the bot handlers on the telegram application "
+import asyncio
+import logging
+from telegram import Update
+from telegram.ext import (
+    Application,
+    CommandHandler,
+    CallbackQueryHandler,
+    MessageHandler,
+    TypeHandler,
+    ContextTypes,
+    filters,
+)
+from app.telegram_bot.handlers.commands import (
+    help_command,
+    start_command,
+    score_command,
+    leaderboard_command,
+    remove_command,
+    search_command,
+)
+from app.telegram_bot.handlers.callbacks import search_callback
+from app.telegram_bot.handlers.messages import handle_message
+from app.telegram_bot.handlers.conversations import (
+    challenge_conversation_handler,
+    select_conversation_handler,
+)
+from app.telegram_bot.update_processor import PerUserUpdateProcessor
+from app.telegram_bot.rate_limiter import TokenBucketRateLimiter
+from app.telegram_bot.persistence import DatabasePersistence
+from app.telegram_bot.instrumentation import instrument_handlers
+from app.telegram_bot.warmup import warm_up_application
+from app.database.queries.write_behind import user_writes
+from app.config import (
+    BOT_TOKEN,
+    MAX_CONCURRENT_UPDATES,
+    RATE_LIMIT_OVERALL,
+    RATE_LIMIT_CHAT,
+    PERSISTENCE_INTERVAL,
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def handle_error(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handle errors
+    Args:
+        update (Update): Update object
+        context (ContextTypes.DEFAULT_TYPE): Context object
+    """
+    logger.error("Update %s caused an error", update, exc_info=context.error)
+
+
+async def persist_changes(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Hand the conversation states and user data changed by the update over to
+    the persistence, instead of waiting for the next persistence interval
+    Args:
+        update (Update): Update object
+        context (ContextTypes.DEFAULT_TYPE): Context object
+    """
+    await context.application.update_persistence()
+
+
+def add_handlers(application: Application) -> Application:
+    """
+    Register all the bot handlers on the application
+    Args:
+        application (Application): Telegram application
+    Returns:
+        Application: the same application
+    """
+    # Commands
+    application.add_handler(CommandHandler("start", start_command))
+    application.add_handler(CommandHandler("help", help_command))
+    application.add_handler(CommandHandler("score", score_command))
+    application.add_handler(CommandHandler("leaderboard", leaderboard_command))
+    application.add_handler(CommandHandler("remove", remove_command))
+    application.add_handler(CommandHandler("search", search_command))
+
+    # Search pages, before the /select conversation that takes every callback query
+    application.add_handler(CallbackQueryHandler(search_callback, pattern=r"^SEARCH:\d+$"))
+
+    # Conversation handlers
+    application.add_handler(challenge_conversation_handler)
+    application.add_handler(select_conversation_handler)
+
+    # Messages
+    application.add_handler(MessageHandler(filters.TEXT, handle_message))
+
+    # Persistence, in a later group so it runs after the handlers of the update
+    if application.persistence is not None:
+        application.add_handler(TypeHandler(Update, persist_changes), group=1)
+
+    # Errors
+    application.add_error_handler(handle_error)
+    return instrument_handlers(application)
+
+
+async def flush_user_writes(application: Application) -> None:
+    """
+    Save the pending user updates when the application shuts down
+    Args:
+        application (Application): Telegram application
+    """
+    await asyncio.to_thread(user_writes.flush)
+
+
+def build_application(processes: int = 1, polling: bool = True) -> Application:
+    """
+    Build the telegram application with all the handlers
+    Args:
+        processes (int): number of bot processes sharing the Bot API rate limit
+        polling (bool): whether the application gets updates itself
+    Returns:
+        Application: Telegram application
+    """
+    builder = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .concurrent_updates(PerUserUpdateProcessor(MAX_CONCURRENT_UPDATES))
+        .rate_limiter(
+            TokenBucketRateLimiter(
+                overall_rate=RATE_LIMIT_OVERALL / processes, chat_rate=RATE_LIMIT_CHAT
+            )
+        )
+        .persistence(DatabasePersistence(update_interval=PERSISTENCE_INTERVAL))
+        .post_init(warm_up_application)
+        .post_shutdown(flush_user_writes)
+    )
+    if not polling:
+        builder = builder.updater(None)
+    return add_handlers(builder.build())
@@ -0,0 +1,156 @@
+" Multi-process mode: a front process receives updates and worker processes handle them "
+import asyncio
+import logging
+import multiprocessing
+from multiprocessing.context import SpawnProcess
+from multiprocessing.queues import Queue
+from typing import List
+from telegram import Bot, Update
+from telegram.ext import Updater
+from app.config import BOT_TOKEN, METRICS_PORT
+from app.utils.logging_config import setup_logging
+from app.utils.metrics_server import start_metrics_server
+from app.telegram_bot.application import build_application
+
+logger = logging.getLogger(__name__)
+
+_context = multiprocessing.get_context("spawn")
+
+
+def shard(update: Update, workers: int) -> int:
+    """
+    Get the worker that handles the update. All updates of a user go to the
+    same worker, so their order and conversation state are kept.
+    Args:
+        update (Update): Telegram update
+        workers (int): number of workers
+    Returns:
+        int: worker index
+    """
+    owner = update.effective_user or update.effective_chat
+    return owner.id % workers if owner else 0
+
+
+def _work(index: int, queue: Queue, workers: int) -> None:
+    """
+    Worker process entry point
+    Args:
+        index (int): worker index
+        queue (Queue): queue with the updates of the worker
+        workers (int): number of workers
+    """
+    setup_logging()
+    logger.info("Starting bot worker %s", index)
+    # every worker serves its own metrics on the ports after METRICS_PORT
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT + 1 + index)
+    asyncio.run(_serve(queue, workers))
+
+
+async def _serve(queue: Queue, workers: int) -> None:
+    """
+    Handle the updates from the queue until None is received
+    Args:
+        queue (Queue): queue with updates as dictionaries
+        workers (int): number of workers
+    """
+    application = build_application(processes=workers, polling=False)
+    async with application:
+        # the hooks are only run by run_polling and run_webhook
+        await application.post_init(application)
+        await application.start()
+        while (data := await asyncio.to_thread(queue.get)) is not None:
+            await application.update_queue.put(Update.de_json(data, application.bot))
+        await application.stop()
+        await application.post_shutdown(application)
+
+
+class Cluster:
+    """
+    Worker processes with a queue of updates each
+
+    Args:
+        workers (int): number of worker processes
+    """
+
+    def __init__(self, workers: int) -> None:
+        self.queues: List[Queue] = [_context.Queue() for _ in range(workers)]
+        self.processes: List[SpawnProcess | None] = [None] * workers
+
+    def _start(self, index: int) -> None:
+        process = _context.Process(
+            target=_work,
+            args=(index, self.queues[index], len(self.queues)),
+            name=f"bot-worker-{index}",
+        )
+        process.start()
+        self.processes[index] = process
+
+    def start(self) -> None:
+        """
+        Start all the workers
+        """
+        for index in range(len(self.queues)):
+            self._start(index)
+
+    def dispatch(self, update: Update) -> None:
+        """
+        Pass the update to its worker, restarting the worker if it died
+        Args:
+            update (Update): Telegram update
+        """
+        index = shard(update, len(self.queues))
+        if not self.processes[index].is_alive():
+            logger.error("Bot worker %s died, restarting it", index)
+            self._start(index)
+        self.queues[index].put(update.to_dict())
+
+    def stop(self) -> None:
+        """
+        Let the workers finish the queued updates and wait for them
+        """
+        for queue in self.queues:
+            queue.put(None)
+        for process in self.processes:
+            process.join()
+
+
+async def _receive(cluster: Cluster, webhook_url: str | None, webhook_port: int) -> None:
+    """
+    Receive updates by polling or webhook and dispatch them to the workers
+    Args:
+        cluster (Cluster): running workers
+        webhook_url (str | None): webhook URL, polling is used if it is not set
+        webhook_port (int): port the webhook listens on
+    """
+    update_queue: asyncio.Queue = asyncio.Queue()
+    async with Updater(Bot(BOT_TOKEN), update_queue) as updater:
+        if webhook_url:
+            await updater.start_webhook(
+                listen="0.0.0.0", port=webhook_port, webhook_url=webhook_url
+            )
+        else:
+            await updater.start_polling(poll_interval=3)
+        try:
+            while True:
+                cluster.dispatch(await update_queue.get())
+        finally:
+            await updater.stop()
+
+
+def run_cluster(workers: int, webhook_url: str | None = None, webhook_port: int = 8443):
+    """
+    Run the bot in a front process and `workers` worker processes
+    Args:
+        workers (int): number of worker processes
+        webhook_url (str | None): webhook URL, polling is used if it is not set
+        webhook_port (int): port the webhook listens on
+    """
+    cluster = Cluster(workers)
+    cluster.start()
+    try:
+        asyncio.run(_receive(cluster, webhook_url, webhook_port))
+    except KeyboardInterrupt:
+        logger.info("Stopping the bot")
+    finally:
+        cluster.stop()
@@ -2,3 +2,4 @@ from app.telegram_bot.handlers.callbacks.select import (
     section_callback,
     paragraph_callback,
 )
+from app.telegram_bot.handlers.callbacks.search import search_callback
@@ -0,0 +1,29 @@
+" This module contains the callback function for the search results pages. "
+import asyncio
+from telegram import Update, InlineKeyboardMarkup
+from telegram.ext import ContextTypes
+from app.database.queries.search import search_elements, PAGE_SIZE
+from app.telegram_bot.handlers.utils import format_search_results, get_search_keyboard
+
+
+async def search_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Callback function for the search results page buttons
+    Args:
+        update (Update): Telegram update object
+        context (ContextTypes.DEFAULT_TYPE): Telegram context object
+    """
+    query = update.callback_query
+    await query.answer()
+
+    terms = context.user_data.get("search_terms")
+    if terms is None:
+        await query.edit_message_text("This search has faded away, start a new one with /search")
+        return
+
+    page = int(query.data.split(":")[1])
+    results, has_next = await asyncio.to_thread(search_elements, terms, page)
+    await query.edit_message_text(
+        format_search_results(terms, results, page, PAGE_SIZE),
+        reply_markup=InlineKeyboardMarkup(get_search_keyboard(page, has_next)),
+    )
@@ -1,16 +1,17 @@
 " This module contains the callback function for the section selection. "
+import asyncio
 from string import Template
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, CallbackQuery
+from telegram import Update, InlineKeyboardMarkup, CallbackQuery
 from telegram.ext import ContextTypes, ConversationHandler
 from app.database.queries.table_populate import (
     add_selected_paragraph,
 )
 from app.database.queries.queries import (
     select_all_section_paragraphs,
-    get_selected_sections,
-    get_selected_section_paragraphs,
+    get_selected_paragraph_ids,
 )
-from app.telegram_bot.handlers.utils import get_paragraph_keyboard, get_section_keyboard
+from app.telegram_bot.handlers.keyboards import keyboards, DONE_ROW, BACK_DONE_ROW
+from app.telegram_bot.prefetch import prefetcher
 
 MESSAGE = Template("Here is a list of $value\. Choose carefully\.")
 
@@ -28,6 +29,24 @@ async def _done_callback(query: CallbackQuery) -> int:
     return ConversationHandler.END
 
 
+async def _edit_menu(query: CallbackQuery, text: str, reply_markup: InlineKeyboardMarkup) -> None:
+    """
+    Show the menu in the message of the query unless the message already shows
+    it, Telegram answers such edits with "message is not modified"
+    Args:
+        query (CallbackQuery): Telegram callback query object
+        text (str): MarkdownV2 text of the menu
+        reply_markup (InlineKeyboardMarkup): keyboard of the menu
+    """
+    message = query.message
+    if (
+        getattr(message, "reply_markup", None) == reply_markup
+        and getattr(message, "text", None) == text.replace("\\", "")
+    ):
+        return
+    await query.edit_message_text(text, parse_mode="MarkdownV2", reply_markup=reply_markup)
+
+
 async def section_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
     """
     Callback function for the section selection
@@ -55,6 +74,46 @@ async def section_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         return ValueError("Invalid callback data")
 
 
+def _section_menu(user_id: str, section_id: str | None) -> InlineKeyboardMarkup:
+    """
+    Select or unselect all the paragraphs of a section and build the sections
+    menu, runs in a thread as it queries the database
+    Args:
+        user_id (str): Telegram user id
+        section_id (str | None): section to select or unselect, None to only build the menu
+    Returns:
+        InlineKeyboardMarkup: keyboard with sections
+    """
+    # Get user's selected paragraphs
+    mask = keyboards.mask(get_selected_paragraph_ids(user_id))
+
+    if section_id is not None:
+        section_mask = keyboards.section_mask(int(section_id))
+        select = not mask & section_mask
+        select_all_section_paragraphs(user_id, section_id, select)
+        mask = mask | section_mask if select else mask & ~section_mask
+    return keyboards.section_keyboard(mask, DONE_ROW)
+
+
+def _paragraph_menu(user_id: str, paragraph_id: int, section_id: str) -> InlineKeyboardMarkup:
+    """
+    Select or unselect a paragraph and build the paragraphs menu of its
+    section, runs in a thread as it queries the database
+    Args:
+        user_id (str): Telegram user id
+        paragraph_id (int): paragraph to select or unselect, not positive to only build the menu
+        section_id (str): section id
+    Returns:
+        InlineKeyboardMarkup: keyboard with paragraphs
+    """
+    if paragraph_id > 0:
+        add_selected_paragraph(user_id, paragraph_id)
+
+    # Get user's selected paragraphs
+    mask = keyboards.mask(get_selected_paragraph_ids(user_id))
+    return keyboards.paragraph_keyboard(int(section_id), mask, BACK_DONE_ROW)
+
+
 async def _select_section(query: CallbackQuery, user_id: str) -> str:
     """
     Callback function for the section selection
@@ -64,37 +123,14 @@ async def _select_section(query: CallbackQuery, user_id: str) -> str:
     Returns:
         str: Conversation state
     """
-    # Notify user that you are generating an answer
-    await query.message.reply_chat_action("typing")
-
-    # Get user's selected section
-    selected_sections = get_selected_sections(user_id)
-
     # Check if the last query was for sections and select/unselect all paragraphs
-    if query.data.isnumeric():
-        section_id = int(query.data)
-        select = selected_sections[section_id]["selected_count"] == 0
-        select_all_section_paragraphs(user_id, query.data, select)
-        selected_sections[section_id]["selected_count"] = (
-            selected_sections[section_id]["paragraph_count"] if select else 0
-        )
-
-    # Create a keyboard
-    keyboard = get_section_keyboard(selected_sections)
-
-    # Add a cancel button
-    keyboard.append(
-        [
-            InlineKeyboardButton("Done", callback_data="DONE"),
-        ]
-    )
+    section_id = query.data if query.data.isnumeric() else None
+    reply_markup = await asyncio.to_thread(_section_menu, user_id, section_id)
+    if section_id is not None:
+        prefetcher.invalidate(user_id)
 
     # Send the sections to the user
-    await query.edit_message_text(
-        MESSAGE.substitute(value="sections"),
-        parse_mode="MarkdownV2",
-        reply_markup=InlineKeyboardMarkup(keyboard),
-    )
+    await _edit_menu(query, MESSAGE.substitute(value="sections"), reply_markup)
     return "SECTION"
 
 
@@ -109,27 +145,13 @@ async def _select_paragraphs(
     Returns:
         str: Conversation state
     """
-    if int(query.data) > 0:
-        add_selected_paragraph(user_id, int(query.data))
-
-    # Get user's selected paragraphs for the section
-    selected_paragraphs = get_selected_section_paragraphs(user_id, section_id)
-
-    # Create a keyboard with paragraphs
-    keyboard = get_paragraph_keyboard(selected_paragraphs)
-    keyboard.append(
-        [
-            InlineKeyboardButton("Back", callback_data="BACK"),
-            InlineKeyboardButton("Done", callback_data="DONE"),
-        ]
-    )
+    paragraph_id = int(query.data)
+    reply_markup = await asyncio.to_thread(_paragraph_menu, user_id, paragraph_id, section_id)
+    if paragraph_id > 0:
+        prefetcher.invalidate(user_id)
 
     # Send the message to the user
-    await query.edit_message_text(
-        MESSAGE.substitute(value="paragraphs"),
-        parse_mode="MarkdownV2",
-        reply_markup=InlineKeyboardMarkup(keyboard),
-    )
+    await _edit_menu(query, MESSAGE.substitute(value="paragraphs"), reply_markup)
     return "PARAGRAPH"
 
 
@@ -1,16 +1,19 @@
 " Command handlers for the /challendge command "
-import os
+import asyncio
 import logging
-import tempfile
 from telegram import Update, ReplyKeyboardMarkup
 from telegram.ext import ContextTypes
-from telegram.constants import ParseMode
+from telegram.constants import ParseMode, ChatAction
 from app.database.queries.queries import (
     get_random_exercise,
     update_users_exercise,
     get_current_exercise,
+    get_last_trial_id,
 )
-from app.utils import latex_to_png
+from app.database.queries.write_behind import user_writes
+from app.utils.render_cache import renderer
+from app.telegram_bot.handlers.reply import Reply
+from app.telegram_bot.prefetch import prefetcher
 
 
 CHALLENGE_MESSAGE = "Here comes the trial\!⚡"
@@ -25,8 +28,8 @@ async def challenge_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     Returns:
         str: The state identifier ("TRIAL") used to guide the conversation flow
     """
-    # Get current user's exercise
-    exercise_info = get_current_exercise(update.effective_user.id)
+    # Get current user's exercise without blocking the other updates
+    exercise_info = await asyncio.to_thread(get_current_exercise, update.effective_user.id)
 
     if exercise_info:
         exercise_id, exercise_text, paragraph_title, section_title = exercise_info
@@ -46,19 +49,30 @@ async def next_trial(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
     Returns:
         str: The state identifier ("TRIAL") used to guide the conversation flow
     """
-    exercise_id, exercise_text, paragraph_title, section_title = get_random_exercise(
-        first_name=update.effective_user.first_name,
-        telegram_id=update.effective_user.id,
-        username=update.effective_user.username,
-    )
+    # Take the exercise prefetched while the user worked on the previous one
+    prefetched = await prefetcher.take(update.effective_user.id)
+    if prefetched:
+        exercise_info, image = prefetched
+    else:
+        # the user asked for another trial, so it must not be the current one
+        last_trial_id = await asyncio.to_thread(get_last_trial_id, update.effective_user.id)
+        exercise_info = await asyncio.to_thread(
+            get_random_exercise,
+            first_name=update.effective_user.first_name,
+            telegram_id=update.effective_user.id,
+            username=update.effective_user.username,
+            exclude_id=last_trial_id,
+        )
+        image = None
+    exercise_id, exercise_text, paragraph_title, section_title = exercise_info
     await send_exercise(
-        update, exercise_id, exercise_text, paragraph_title, section_title
+        update, exercise_id, exercise_text, paragraph_title, section_title, image
     )
     return "TRIAL"
 
 
 async def send_exercise(
-    update, exercise_id, exercise_text, paragraph_title, section_title
+    update, exercise_id, exercise_text, paragraph_title, section_title, image=None
 ) -> None:
     """
     Send the exercise to the user
@@ -67,25 +81,26 @@ async def send_exercise(
         exercise_id (int): The ID of the exercise
         exercise_text (str): The text of the exercise
         paragraph_title (str): The title of the paragraph
+        section_title (str): The title of the section
+        image (bytes | None): The already rendered exercise image
     """
-    # Notify user that you are generating an answer
-    await update.message.reply_chat_action("typing")
-
-    # Update user's current exercise
-    update_users_exercise(update.effective_user.id, exercise_id)
-
-    # Render exercise image
-    logging.info("Rendering LaTeX to PNG for exercise: %s", exercise_text)
-    image_path = tempfile.mktemp(suffix=".png")
-    latex_to_png(exercise_text, image_path)
+    # Update user's current exercise in the background and render exercise
+    # image while the user sees that the photo is being uploaded
+    if not user_writes.update(update.effective_user.id, last_trial_id=exercise_id):
+        await asyncio.to_thread(update_users_exercise, update.effective_user.id, exercise_id)
+    reply = Reply(update.message).chat_action(ChatAction.UPLOAD_PHOTO)
+    if image is None:
+        logging.info("Rendering LaTeX to PNG for exercise: %s", exercise_text)
+        (image,) = await reply.run(renderer.render(exercise_text))
 
     # Send the exercise to the user
     reply_keyboard = [
         ["Next trial", "Give me the answer!"],
-        ["Give me some rest"],
+        ["Show related theory", "Give me some rest"],
     ]
-
-    await update.message.reply_text(
+    section_title = section_title.replace("-", "\-")
+    paragraph_title = paragraph_title.replace("-", "\-")
+    reply.text(
         CHALLENGE_MESSAGE,
         parse_mode=ParseMode.MARKDOWN_V2,
         reply_markup=ReplyKeyboardMarkup(
@@ -94,14 +109,12 @@ async def send_exercise(
             resize_keyboard=True,
         ),
     )
-    await update.message.reply_chat_action("upload_photo")
-    section_title = section_title.replace("-", "\-")
-    paragraph_title = paragraph_title.replace("-", "\-")
-    await update.message.reply_photo(
-        photo=image_path,
+    reply.photo(
+        photo=image,
         caption=f"\#trial{exercise_id}\n🔴 *{section_title}*\n🟡 _{paragraph_title}_",
         parse_mode=ParseMode.MARKDOWN_V2,
     )
+    await reply.send()
 
-    # Remove the image
-    os.remove(image_path)
+    # Prepare the next exercise while the user works on this one
+    prefetcher.start(update.effective_user, exclude_id=exercise_id)
@@ -11,6 +11,7 @@ Here are the things you can ask of me during your challenges:
 /challenge — I will present you with a trial of probability\. 🎲
 /solution — I will reveal the secrets of the universe\. 📖
 /solution — Choose trials that fit your skills\. 🎯
+/search — I will look through the book for you\. 🔎
 /remove — I will take back the last trial you have overcome\. 🔄
 /score — I will show you the path you have walked\. 📈
 /leaderboard — I will show you the path others have walked\. 🏆
@@ -24,5 +25,4 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         update (Update): Telegram update object
         context (ContextTypes.DEFAULT_TYPE): Telegram context object
     """
-    await update.message.reply_chat_action("typing")
     await update.message.reply_text(HELP_MESSAGE, parse_mode=ParseMode.MARKDOWN_V2)
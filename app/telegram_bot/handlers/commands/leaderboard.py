@@ -1,8 +1,10 @@
 " Command handler for the /leaderboard command "
+import asyncio
 from telegram import Update
 from telegram.ext import ContextTypes
-from telegram.constants import ParseMode
+from telegram.constants import ParseMode, ChatAction
 from app.database.queries.queries import get_user_leaderboard
+from app.telegram_bot.handlers.reply import Reply
 
 
 async def leaderboard_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -13,8 +15,9 @@ async def leaderboard_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         context (ContextTypes.DEFAULT_TYPE): Telegram context object
     """
     # Notify user that you are generating an answer
-    await update.message.reply_chat_action("typing")
-
-    leaderboard = get_user_leaderboard(update.effective_user.id)
-    await update.message.reply_chat_action("typing")
-    await update.message.reply_text(leaderboard, parse_mode=ParseMode.MARKDOWN_V2)
+    reply = Reply(update.message).chat_action(ChatAction.TYPING)
+    (leaderboard,) = await reply.run(
+        asyncio.to_thread(get_user_leaderboard, update.effective_user.id)
+    )
+    reply.text(leaderboard, parse_mode=ParseMode.MARKDOWN_V2)
+    await reply.send()
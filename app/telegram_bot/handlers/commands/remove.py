@@ -1,9 +1,11 @@
 " Command to remove the last solved exercise. "
+import asyncio
 import logging
 from telegram import Update, ReplyKeyboardMarkup
 from telegram.ext import ContextTypes
 from sqlalchemy.exc import NoResultFound
 from app.database.queries.queries import remove_last_solved_exercise
+from app.telegram_bot.prefetch import prefetcher
 
 
 async def remove_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
@@ -18,7 +20,10 @@ async def remove_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         "User %s requested to remove the current challenge", update.effective_user.id
     )
     try:
-        exercise_id = remove_last_solved_exercise(update.effective_user.id)
+        exercise_id = await asyncio.to_thread(
+            remove_last_solved_exercise, update.effective_user.id
+        )
+        prefetcher.invalidate(update.effective_user.id)
         message = f"You think that was just a luck? Okay, try again! I take back the casuality for #trial{exercise_id}"
         reply_keyboard = [["Next trial", "Give me some rest"]]
         await update.message.reply_text(
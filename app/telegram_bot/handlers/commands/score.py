@@ -1,9 +1,11 @@
 " Command handler for the /score command "
+import asyncio
 from string import Template
 from telegram import Update
 from telegram.ext import ContextTypes
-from telegram.constants import ParseMode
+from telegram.constants import ParseMode, ChatAction
 from app.database.queries.queries import get_user_score, count_solved_exercises
+from app.telegram_bot.handlers.reply import Reply
 
 SCORE_MESSAGE = Template(
     "Let me see\.\. Hmm\.\. Through you challenges you have gained *$value points* of casuality\! 🌀🔢\n\n __*Number of solved trials by category:*__\n$table"
@@ -17,14 +19,13 @@ async def score_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         update (Update): Telegram update object
         context (ContextTypes.DEFAULT_TYPE): Telegram context object
     """
-    # Notify user that you are generating an answer
-    await update.message.reply_chat_action("typing")
-
-    # get user's score
-    score = get_user_score(update.effective_user.id)
-
-    # get number of solved exercises
-    solved_exercises_by_section = count_solved_exercises(update.effective_user.id)
+    # Notify user that you are generating an answer while
+    # getting user's score and number of solved exercises
+    reply = Reply(update.message).chat_action(ChatAction.TYPING)
+    score, solved_exercises_by_section = await reply.run(
+        asyncio.to_thread(get_user_score, update.effective_user.id),
+        asyncio.to_thread(count_solved_exercises, update.effective_user.id),
+    )
 
     # Create a message
     table_list = [
@@ -33,4 +34,5 @@ async def score_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     ]
     table_string = "\n".join(table_list)
     formated_message = SCORE_MESSAGE.substitute(value=score, table=table_string)
-    await update.message.reply_text(formated_message, parse_mode=ParseMode.MARKDOWN_V2)
+    reply.text(formated_message, parse_mode=ParseMode.MARKDOWN_V2)
+    await reply.send()
@@ -0,0 +1,33 @@
+" Command handler for the /search command "
+import asyncio
+from telegram import Update, InlineKeyboardMarkup
+from telegram.ext import ContextTypes
+from telegram.constants import ChatAction
+from app.database.queries.search import search_elements, PAGE_SIZE
+from app.telegram_bot.handlers.reply import Reply
+from app.telegram_bot.handlers.utils import format_search_results, get_search_keyboard
+
+USAGE_MESSAGE = "Tell me what to look for, e.g. /search conditional probability 🔎"
+
+
+async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Search command handler
+    Args:
+        update (Update): Telegram update object
+        context (ContextTypes.DEFAULT_TYPE): Telegram context object
+    """
+    terms = " ".join(context.args)
+    if not terms:
+        await update.message.reply_text(USAGE_MESSAGE)
+        return
+
+    # Remember the terms for the page buttons, callback data is too short for them
+    context.user_data["search_terms"] = terms
+    reply = Reply(update.message).chat_action(ChatAction.TYPING)
+    ((results, has_next),) = await reply.run(asyncio.to_thread(search_elements, terms))
+    reply.text(
+        format_search_results(terms, results, 0, PAGE_SIZE),
+        reply_markup=InlineKeyboardMarkup(get_search_keyboard(0, has_next)),
+    )
+    await reply.send()
@@ -1,12 +1,25 @@
 " Select command handler "
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+import asyncio
+from telegram import Update, InlineKeyboardMarkup
 from telegram.ext import CallbackContext
-from app.database.queries.queries import get_selected_sections
-from app.telegram_bot.handlers.utils import get_section_keyboard
+from app.database.queries.queries import get_selected_paragraph_ids
+from app.telegram_bot.handlers.keyboards import keyboards, CANCEL_ROW
 
 SELECT_MESSAGE = "So, you want to choose trials you are more confident in\. Fine, here is a rough categories of my trials\. Make your choice\!"
 
 
+def _section_menu(user_id: str) -> InlineKeyboardMarkup:
+    """
+    Build the sections menu of the user, runs in a thread as it queries the database
+    Args:
+        user_id (str): Telegram user id
+    Returns:
+        InlineKeyboardMarkup: keyboard with sections and a cancel button
+    """
+    mask = keyboards.mask(get_selected_paragraph_ids(user_id))
+    return keyboards.section_keyboard(mask, CANCEL_ROW)
+
+
 async def select_command(update: Update, context: CallbackContext) -> str:
     """
     Select command handler
@@ -19,17 +32,10 @@ async def select_command(update: Update, context: CallbackContext) -> str:
     # Notify user that you are generating an answer
     await update.message.reply_chat_action("typing")
 
-    # Get user's selected section
-    selected_sections = get_selected_sections(update.effective_user.id)
-
-    # Create a keyboard with sections
-    keyboard = get_section_keyboard(selected_sections)
-
-    # Add a cancel button
-    keyboard.append([InlineKeyboardButton("Cancel", callback_data="CANCEL")])
+    # Create a keyboard with sections and a cancel button from the user's selected paragraphs
+    reply_markup = await asyncio.to_thread(_section_menu, update.effective_user.id)
 
     # Send the message to the user
-    reply_markup = InlineKeyboardMarkup(keyboard)
     await update.message.reply_text(
         SELECT_MESSAGE,
         parse_mode="MarkdownV2",
@@ -1,13 +1,14 @@
 " Command handlers for the /soluition command "
-import os
+import asyncio
 import logging
-import tempfile
 from telegram import Update, ReplyKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler
-from telegram.constants import ParseMode
+from telegram.constants import ParseMode, ChatAction
 from sqlalchemy.exc import NoResultFound
 from app.database.queries.queries import user_exercise_soluiton
-from app.utils import latex_to_png
+from app.utils.render_cache import renderer
+from app.telegram_bot.handlers.reply import Reply
+from app.telegram_bot.prefetch import prefetcher
 
 
 SOLUTION_MESSAGE = "You want to grasp the mystery of the universe? Fine\.\. 🌌"
@@ -22,12 +23,11 @@ async def solution_command(
         update (Update): Telegram update object
         context (ContextTypes.DEFAULT_TYPE): Telegram context object
     """
-    # Notify user that you are generating an answer
-    await update.message.reply_chat_action("typing")
-
     # Get the solution of the last exercise that the user tried
     try:
-        solution_text, exercise_id = user_exercise_soluiton(update.effective_user.id)
+        solution_text, exercise_id = await asyncio.to_thread(
+            user_exercise_soluiton, update.effective_user.id
+        )
         return await send_solution(update, solution_text, exercise_id)
     except NoResultFound as e:
         logging.error("Error while getting the solution of the last exercise: %s", e)
@@ -67,17 +67,15 @@ async def send_solution(update, solution_text, exercise_id) -> str:
     Returns:
         str: The state identifier ("SOLUTION") used to guide the conversation flow
     """
-    solution_text, exercise_id = user_exercise_soluiton(update.effective_user.id)
-
-    # Render exercise image
+    # Render solution image while the user sees that the photo is being uploaded
     logging.info("Rendering LaTeX to PNG for solution: %s", solution_text)
-    image_path = tempfile.mktemp(suffix=".png")
-    latex_to_png(solution_text, image_path)
+    reply = Reply(update.message).chat_action(ChatAction.UPLOAD_PHOTO)
+    (image,) = await reply.run(renderer.render(solution_text))
 
     # Send the exercise to the user
     reply_keyboard = [["Next trial", "Solved it!"], ["Give me some rest"]]
 
-    await update.message.reply_text(
+    reply.text(
         SOLUTION_MESSAGE,
         parse_mode=ParseMode.MARKDOWN_V2,
         reply_markup=(
@@ -88,11 +86,13 @@ async def send_solution(update, solution_text, exercise_id) -> str:
             )
         ),
     )
-    await update.message.reply_chat_action("upload_photo")
-    await update.message.reply_photo(
-        photo=image_path, caption=f"#solution #trial{exercise_id}"
+    reply.photo(
+        photo=image,
+        caption=f"\\#solution \\#trial{exercise_id}",
+        parse_mode=ParseMode.MARKDOWN_V2,
     )
+    await reply.send()
 
-    # Remove the image
-    os.remove(image_path)
+    # Prepare the next exercise while the user reads the solution
+    prefetcher.start(update.effective_user, exclude_id=exercise_id)
     return "SOLUTION"
@@ -1,8 +1,11 @@
 " Command handler for the /start command "
+import asyncio
 from telegram import Update
 from telegram.ext import ContextTypes
-from telegram.constants import ParseMode
+from telegram.constants import ParseMode, ChatAction
 from app.database.queries.table_populate import add_user
+from app.database.queries.write_behind import user_writes
+from app.telegram_bot.handlers.reply import Reply
 
 
 START_MESSAGE = r"""
@@ -23,13 +26,19 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         update (Update): Telegram update object
         context (ContextTypes.DEFAULT_TYPE): Telegram context object
     """
-    # Notify user that you are generating an answer
-    await update.message.reply_chat_action("typing")
-
-    # create user in the database
-    add_user(
-        first_name=update.effective_user.first_name,
-        telegram_id=update.effective_user.id,
-        username=update.effective_user.username,
-    )
-    await update.message.reply_text(START_MESSAGE, parse_mode=ParseMode.MARKDOWN_V2)
+    # Known users get their names refreshed later, new users are created
+    # while the user sees that the bot is typing
+    user = update.effective_user
+    reply = Reply(update.message)
+    if not user_writes.update(user.id, first_name=user.first_name, username=user.username):
+        reply.chat_action(ChatAction.TYPING)
+        await reply.run(
+            asyncio.to_thread(
+                add_user,
+                first_name=user.first_name,
+                telegram_id=user.id,
+                username=user.username,
+            )
+        )
+    reply.text(START_MESSAGE, parse_mode=ParseMode.MARKDOWN_V2)
+    await reply.send()
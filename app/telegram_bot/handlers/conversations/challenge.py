@@ -14,7 +14,12 @@ from app.telegram_bot.handlers.commands import (
     solution_command,
     remove_command,
 )
-from app.telegram_bot.handlers.messages import handle_message, give_rest, solved
+from app.telegram_bot.handlers.messages import (
+    handle_message,
+    give_rest,
+    solved,
+    related_theory,
+)
 
 challenge_conversation_handler = ConversationHandler(
     entry_points=[
@@ -31,6 +36,10 @@ challenge_conversation_handler = ConversationHandler(
                 filters.Regex("^(Give me the answer!)$"),
                 solution_command,
             ),
+            MessageHandler(
+                filters.Regex("^(Show related theory)$"),
+                related_theory,
+            ),
             MessageHandler(
                 filters.Regex("^(Give me some rest)$"),
                 give_rest,
@@ -72,4 +81,6 @@ challenge_conversation_handler = ConversationHandler(
         CommandHandler("solution", solution_command),
         MessageHandler(filters.TEXT, handle_message),
     ],
+    name="challenge",
+    persistent=True,
 )
@@ -27,4 +27,6 @@ select_conversation_handler = ConversationHandler(
         CommandHandler("leaderboard", leaderboard_command),
         MessageHandler(filters.TEXT, handle_message),
     ],
+    name="select",
+    persistent=True,
 )
@@ -0,0 +1,175 @@
+" Prebuilt inline keyboards of the /select menus "
+import threading
+from typing import Dict, Iterable, List, Tuple
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from app.database.queries.cache import cache_region
+from app.database.queries.catalog import exercise_catalog
+from app.database.queries.queries import get_sections, get_section_paragraphs
+
+Row = Tuple[InlineKeyboardButton, ...]
+
+# Last rows of the menus
+CANCEL_ROW: Row = (InlineKeyboardButton("Cancel", callback_data="CANCEL"),)
+DONE_ROW: Row = (InlineKeyboardButton("Done", callback_data="DONE"),)
+BACK_DONE_ROW: Row = (
+    InlineKeyboardButton("Back", callback_data="BACK"),
+    InlineKeyboardButton("Done", callback_data="DONE"),
+)
+
+
+def _format_paragraph_title(title: str, selected: bool) -> str:
+    """
+    Get the status of the section
+    Args:
+        title (str): Item's title
+        select (bool): Is the item selected
+    Returns:
+        str: Status of the section
+    """
+    return f"{'✅' if selected else '❌'} {title}"
+
+
+def _format_paragraph_number(selected_count: int, paragraph_count: int) -> str:
+    return f"{selected_count}/{paragraph_count} {'✅' if selected_count > 0 else '❌'}"
+
+
+class KeyboardTemplates:
+    """
+    Buttons of the /select menus built once per catalog version, as the titles
+    and the structure of the book only change with an ingestion, which bumps
+    the version. The selection of a user is a bitmask with a bit per
+    paragraph, only the ✅/❌ marks and the counts are picked from it.
+    Callback data are strings, as Telegram returns them, so that a keyboard
+    can be compared with the one of a received message.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # catalog version the buttons were built for
+        self._version: int | None = None
+        # bit of every paragraph id
+        self._bits: Dict[int, int] = {}
+        # by section id: mask of its paragraphs, title button, count buttons by count
+        self._sections: Dict[int, Tuple[int, InlineKeyboardButton, Row]] = {}
+        # by section id: bit, unselected and selected button of every paragraph
+        self._paragraphs: Dict[
+            int, List[Tuple[int, InlineKeyboardButton, InlineKeyboardButton]]
+        ] = {}
+
+    def load(self) -> None:
+        """
+        Build the buttons of all the sections and paragraphs unless they are
+        built for the current catalog version
+        """
+        version = exercise_catalog.get().version
+        with self._lock:
+            if self._version == version:
+                return
+            if self._version is not None:
+                # the cached sections and paragraphs are the ones of the old catalog
+                cache_region.invalidate()
+            bits: Dict[int, int] = {}
+            sections: Dict[int, Tuple[int, InlineKeyboardButton, Row]] = {}
+            section_paragraphs: Dict[
+                int, List[Tuple[int, InlineKeyboardButton, InlineKeyboardButton]]
+            ] = {}
+            for section_id, section in get_sections().items():
+                section_mask = 0
+                paragraphs = []
+                for paragraph_id, paragraph in get_section_paragraphs(section_id).items():
+                    bit = len(bits)
+                    bits[paragraph_id] = bit
+                    section_mask |= 1 << bit
+                    paragraphs.append(
+                        (
+                            bit,
+                            *(
+                                InlineKeyboardButton(
+                                    text=_format_paragraph_title(paragraph["title"], selected),
+                                    callback_data=str(paragraph_id),
+                                )
+                                for selected in (False, True)
+                            ),
+                        )
+                    )
+                section_paragraphs[section_id] = paragraphs
+                sections[section_id] = (
+                    section_mask,
+                    InlineKeyboardButton(text=section["title"], callback_data=str(section_id)),
+                    tuple(
+                        InlineKeyboardButton(
+                            text=_format_paragraph_number(count, len(paragraphs)),
+                            callback_data=str(-section_id),
+                        )
+                        for count in range(len(paragraphs) + 1)
+                    ),
+                )
+            self._bits, self._sections, self._paragraphs = bits, sections, section_paragraphs
+            self._version = version
+
+    def mask(self, paragraph_ids: Iterable[int]) -> int:
+        """
+        Get the selection bitmask of the paragraphs
+        Args:
+            paragraph_ids (Iterable[int]): selected paragraph ids
+        Returns:
+            int: bitmask
+        """
+        self.load()
+        mask = 0
+        for paragraph_id in paragraph_ids:
+            bit = self._bits.get(paragraph_id)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def section_mask(self, section_id: int) -> int:
+        """
+        Get the bitmask of all the paragraphs of a section
+        Args:
+            section_id (int): section id
+        Returns:
+            int: bitmask
+        """
+        self.load()
+        return self._sections[section_id][0]
+
+    def section_keyboard(self, mask: int, last_row: Row) -> InlineKeyboardMarkup:
+        """
+        Get the keyboard with sections and the number of selected paragraphs in each
+        Args:
+            mask (int): selection bitmask of the user
+            last_row (Row): buttons below the sections
+        Returns:
+            InlineKeyboardMarkup: keyboard with sections
+        """
+        self.load()
+        rows = [
+            (title_button, count_buttons[(mask & section_mask).bit_count()])
+            for section_mask, title_button, count_buttons in self._sections.values()
+        ]
+        rows.append(last_row)
+        return InlineKeyboardMarkup(rows)
+
+    def paragraph_keyboard(
+        self, section_id: int, mask: int, last_row: Row
+    ) -> InlineKeyboardMarkup:
+        """
+        Get the keyboard with the paragraphs of a section
+        Args:
+            section_id (int): section id
+            mask (int): selection bitmask of the user
+            last_row (Row): buttons below the paragraphs
+        Returns:
+            InlineKeyboardMarkup: keyboard with paragraphs
+        """
+        self.load()
+        rows = [
+            (selected if mask >> bit & 1 else unselected,)
+            for bit, unselected, selected in self._paragraphs[section_id]
+        ]
+        rows.append(last_row)
+        return InlineKeyboardMarkup(rows)
+
+
+keyboards = KeyboardTemplates()
@@ -1,2 +1,2 @@
 from app.telegram_bot.handlers.messages.default import handle_message
-from app.telegram_bot.handlers.messages.challenge import solved, give_rest
\ No newline at end of file
+from app.telegram_bot.handlers.messages.challenge import solved, give_rest, related_theory
@@ -1,9 +1,14 @@
 " Handlers for the messages sent by the user. "
+import asyncio
 import logging
 from telegram import Update, ReplyKeyboardMarkup, ReplyKeyboardRemove
 from telegram.ext import ContextTypes, ConversationHandler
-from telegram.constants import ParseMode
+from telegram.constants import ParseMode, ChatAction
 from app.database.queries.table_populate import add_solved_exercise
+from app.database.queries.related import get_related_theory
+from app.utils.render_cache import renderer
+from app.telegram_bot.handlers.reply import Reply
+from app.telegram_bot.prefetch import prefetcher
 
 
 async def solved(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -17,16 +22,21 @@ async def solved(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     # Add the solved exercise to the database
     logging.info("User %s solved the exercise", update.effective_user.id)
-    add_solved_exercise(update.effective_user.id)
+    reply = Reply(update.message).chat_action(ChatAction.TYPING)
+    await reply.run(asyncio.to_thread(add_solved_exercise, update.effective_user.id))
+
+    # The prefetched exercise may be the solved one, prepare another
+    prefetcher.invalidate(update.effective_user.id)
+    prefetcher.start(update.effective_user)
 
     # Send the response to the user
     reply_keyboard = [["Next trial", "Give me some rest", "Remove last"]]
 
-    await update.message.reply_chat_action("typing")
-    await update.message.reply_text("Not half bad! You receive 1 casuality point🎲")
-
-    await update.message.reply_chat_action("typing")
-    await update.message.reply_text(
+    reply.text(
+        "Not half bad\\! You receive 1 casuality point🎲",
+        parse_mode=ParseMode.MARKDOWN_V2,
+    )
+    reply.text(
         "Another trial awaits you🌀",
         parse_mode=ParseMode.MARKDOWN_V2,
         reply_markup=ReplyKeyboardMarkup(
@@ -35,9 +45,45 @@ async def solved(update: Update, context: ContextTypes.DEFAULT_TYPE):
             resize_keyboard=True,
         ),
     )
+    await reply.send()
     return "SOLVED"
 
 
+async def related_theory(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Handles the user's request for the theory related to the current trial by sending
+    the precomputed related elements of the book rendered as an image.
+
+    Parameters:
+        update (Update): The incoming update containing user and message details.
+        context (ContextTypes.DEFAULT_TYPE): The context containing additional data and methods for the current update.
+    Returns:
+        str: A state identifier ("TRIAL") used to guide the conversation flow.
+    """
+    logging.info("User %s requested the related theory", update.effective_user.id)
+    reply = Reply(update.message).chat_action(ChatAction.TYPING)
+    (elements,) = await reply.run(
+        asyncio.to_thread(get_related_theory, update.effective_user.id)
+    )
+    if not elements:
+        await update.message.reply_text(
+            "The book is silent about this trial. Rely on your own wits🌀"
+        )
+        return "TRIAL"
+
+    # Render the elements in a single image
+    theory = "\n\n".join(
+        f"\\textbf{{{element['type'].capitalize()} {element['section_number']}."
+        f"{element['subsection_number']}.{element['number']}}} {element['content']}"
+        for element in elements
+    )
+    reply.chat_action(ChatAction.UPLOAD_PHOTO)
+    (image,) = await reply.run(renderer.render(theory))
+    reply.photo(photo=image, caption="\\#theory", parse_mode=ParseMode.MARKDOWN_V2)
+    await reply.send()
+    return "TRIAL"
+
+
 async def give_rest(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Handles the user's request to finish the current challenge and restore their energy.
@@ -52,6 +98,5 @@ async def give_rest(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     logging.info("User %s requested to finish challendge", update.effective_user.id)
     response = "Hmm.. Seems like you need to restore your energy. Fine...🌌"
-    await update.message.reply_chat_action("typing")
     await update.message.reply_text(response, reply_markup=ReplyKeyboardRemove())
     return ConversationHandler.END
@@ -13,5 +13,4 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
                                               helper methods for handling the update.
     """
     response = "Enough of your chit-chat... Return to the trial!🌀"
-    await update.message.reply_chat_action("typing")
     await update.message.reply_text(response)
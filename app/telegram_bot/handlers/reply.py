@@ -0,0 +1,193 @@
+" Composition of handler replies into as few Bot API calls as possible "
+import asyncio
+from typing import Any, Awaitable, List
+from telegram import (
+    Message,
+    InlineKeyboardMarkup,
+    ReplyKeyboardMarkup,
+    ReplyKeyboardRemove,
+    ForceReply,
+)
+
+ReplyMarkup = InlineKeyboardMarkup | ReplyKeyboardMarkup | ReplyKeyboardRemove | ForceReply
+
+# Telegram limits for message texts and photo captions
+MAX_TEXT_LENGTH = 4096
+MAX_CAPTION_LENGTH = 1024
+
+
+class _Part:
+    """
+    A single message of a reply: a text or a photo with a caption
+    """
+
+    __slots__ = ("text", "photo", "parse_mode", "reply_markup")
+
+    def __init__(
+        self,
+        text: str | None,
+        photo: Any = None,
+        parse_mode: str | None = None,
+        reply_markup: ReplyMarkup | None = None,
+    ) -> None:
+        self.text = text
+        self.photo = photo
+        self.parse_mode = parse_mode
+        self.reply_markup = reply_markup
+
+    def absorb(self, previous: "_Part") -> bool:
+        """
+        Prepend the previous text message to this message if Telegram allows it
+        Args:
+            previous (_Part): text message sent right before this one
+        Returns:
+            bool: True if the previous message was merged into this one
+        """
+        if previous.photo is not None:
+            return False
+        if previous.reply_markup is not None and self.reply_markup is not None:
+            return False
+        if self.text and previous.parse_mode != self.parse_mode:
+            return False
+
+        separator = "\n\n" if self.photo is None else "\n"
+        text = previous.text + separator + self.text if self.text else previous.text
+        limit = MAX_TEXT_LENGTH if self.photo is None else MAX_CAPTION_LENGTH
+        if len(text) > limit:
+            return False
+
+        self.text = text
+        self.parse_mode = previous.parse_mode
+        self.reply_markup = self.reply_markup or previous.reply_markup
+        return True
+
+    async def send(self, message: Message) -> Message:
+        """
+        Send the part as a reply to the message
+        Args:
+            message (Message): message to reply to
+        Returns:
+            Message: sent message
+        """
+        if self.photo is not None:
+            return await message.reply_photo(
+                photo=self.photo,
+                caption=self.text,
+                parse_mode=self.parse_mode,
+                reply_markup=self.reply_markup,
+            )
+        return await message.reply_text(
+            self.text, parse_mode=self.parse_mode, reply_markup=self.reply_markup
+        )
+
+
+class Reply:
+    """
+    Collects the replies of a handler and sends them with as few Bot API calls
+    as possible: consecutive texts are merged into one message, a text followed
+    by a photo becomes the photo's caption and the keyboard is attached to the
+    resulting message. Chat actions are deduplicated and only sent while there
+    is some work to wait for.
+
+    Args:
+        message (Message): message to reply to
+    """
+
+    __slots__ = ("_message", "_action", "_sent_action", "_parts")
+
+    def __init__(self, message: Message) -> None:
+        self._message = message
+        self._action: str | None = None
+        self._sent_action: str | None = None
+        self._parts: List[_Part] = []
+
+    def chat_action(self, action: str) -> "Reply":
+        """
+        Set the chat action shown while the reply is prepared
+        Args:
+            action (str): chat action, e.g. "typing" or "upload_photo"
+        Returns:
+            Reply: the reply itself
+        """
+        self._action = action
+        return self
+
+    def text(
+        self,
+        text: str,
+        parse_mode: str | None = None,
+        reply_markup: ReplyMarkup | None = None,
+    ) -> "Reply":
+        """
+        Add a text message to the reply
+        Args:
+            text (str): message text
+            parse_mode (str | None): message parse mode
+            reply_markup (ReplyMarkup | None): message keyboard
+        Returns:
+            Reply: the reply itself
+        """
+        self._parts.append(_Part(text, None, parse_mode, reply_markup))
+        return self
+
+    def photo(
+        self,
+        photo: Any,
+        caption: str | None = None,
+        parse_mode: str | None = None,
+        reply_markup: ReplyMarkup | None = None,
+    ) -> "Reply":
+        """
+        Add a photo to the reply
+        Args:
+            photo (Any): photo to send, anything accepted by `Message.reply_photo`
+            caption (str | None): photo caption
+            parse_mode (str | None): caption parse mode
+            reply_markup (ReplyMarkup | None): message keyboard
+        Returns:
+            Reply: the reply itself
+        """
+        self._parts.append(_Part(caption, photo, parse_mode, reply_markup))
+        return self
+
+    async def run(self, *work: Awaitable[Any]) -> List[Any]:
+        """
+        Await the work while showing the chat action to the user
+        Args:
+            *work (Awaitable[Any]): independent awaitables, e.g. DB queries or rendering
+        Returns:
+            List[Any]: results of the work in the same order
+        """
+        calls = list(work)
+        if self._action is not None and self._action != self._sent_action:
+            calls.insert(0, self._message.reply_chat_action(self._action))
+            self._sent_action = self._action
+            results = await asyncio.gather(*calls)
+            return results[1:]
+        return await asyncio.gather(*calls)
+
+    def _compose(self) -> List[_Part]:
+        """
+        Merge the collected parts into the messages to send
+        Returns:
+            List[_Part]: messages to send
+        """
+        messages: List[_Part] = []
+        for part in self._parts:
+            if messages and part.absorb(messages[-1]):
+                messages[-1] = part
+            else:
+                messages.append(part)
+        return messages
+
+    async def send(self) -> List[Message]:
+        """
+        Send the collected messages
+        Returns:
+            List[Message]: sent messages
+        """
+        # messages go out right away, a pending chat action would be redundant
+        self._action = None
+        sent = [await part.send(self._message) for part in self._compose()]
+        self._parts = []
+        return sent
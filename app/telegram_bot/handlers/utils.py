@@ -3,65 +3,43 @@ from typing import List, Dict, Any, Callable
 from telegram import InlineKeyboardButton
 
 
-def _format_paragraph_title(title: str, selected: bool) -> str:
+def format_search_results(
+    terms: str, results: List[Dict[str, Any]], page: int, page_size: int
+) -> str:
     """
-    Get the status of the section
+    Get the text of a search results page
     Args:
-        title (str): Item's title
-        select (bool): Is the item selected
+        terms (str): Searched words
+        results (List[Dict[str, Any]]): Found elements of the page
+        page (int): Page number starting from 0
+        page_size (int): Number of elements on a page
     Returns:
-        str: Status of the section
+        str: Text with the found elements
     """
-    return f"{'✅' if selected else '❌'} {title}"
-
-
-def _format_paragraph_number(section: List[Dict[int, Any]]) -> str:
-    return f"{section['selected_count']}/{section['paragraph_count']} {'✅' if section['selected_count'] > 0 else '❌'}"
-
-
-def get_paragraph_keyboard(
-    paragraphs: List[Dict[int, Any]]
-) -> List[List[InlineKeyboardButton]]:
-    """
-    Get the keyboard with sections
-    Args:
-        paragraphs (List[Dict[int, str]]): Dictionary with paragraphs
-    Returns:
-        List[List[InlineKeyboardButton]]: Keyboard with paragraphs
-    """
-    keyboard = [
-        [
-            InlineKeyboardButton(
-                text=_format_paragraph_title(paragraph["title"], paragraph["selected"]),
-                callback_data=paragraph_id,
-            )
-        ]
-        for paragraph_id, paragraph in paragraphs.items()
-    ]
-    return keyboard
-
-
-def get_section_keyboard(
-    sections: List[Dict[int, Any]]
-) -> List[List[InlineKeyboardButton]]:
+    if not results:
+        return f"The book keeps silence about «{terms}»🌫"
+    lines = [f"Here is what the book says about «{terms}», page {page + 1}:"]
+    for position, result in enumerate(results, start=page * page_size + 1):
+        lines.append(
+            f"\n{position}. {result['type'].capitalize()} "
+            f"{result['section_number']}.{result['subsection_number']}.{result['number']}"
+            f" — {result['title']}\n{result['snippet']}"
+        )
+    return "\n".join(lines)
+
+
+def get_search_keyboard(page: int, has_next: bool) -> List[List[InlineKeyboardButton]]:
     """
-    Get the keyboard with sections
+    Get the keyboard to switch the search results pages
     Args:
-        sections (List[Dict[int, str]]): Dictionary with sections
+        page (int): Page number starting from 0
+        has_next (bool): Is there a next page
     Returns:
-        List[List[InlineKeyboardButton]]: Keyboard with sections
+        List[List[InlineKeyboardButton]]: Keyboard with the previous and next page buttons
     """
-    keyboard = [
-        [
-            InlineKeyboardButton(
-                text=section["title"],
-                callback_data=section_id,
-            ),
-            InlineKeyboardButton(
-                text=_format_paragraph_number(section),
-                callback_data=-section["id"],
-            ),
-        ]
-        for section_id, section in sections.items()
-    ]
-    return keyboard
+    buttons = []
+    if page > 0:
+        buttons.append(InlineKeyboardButton("◀️ Previous", callback_data=f"SEARCH:{page - 1}"))
+    if has_next:
+        buttons.append(InlineKeyboardButton("Next ▶️", callback_data=f"SEARCH:{page + 1}"))
+    return [buttons] if buttons else []
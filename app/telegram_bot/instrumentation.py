@@ -0,0 +1,78 @@
+" Timing and SQL statement metrics of the bot handlers "
+import time
+import functools
+from typing import Any, Callable, Coroutine
+from telegram.ext import Application, BaseHandler, ConversationHandler
+from app.utils.metrics import (
+    HANDLER_SECONDS,
+    HANDLER_ERRORS,
+    HANDLER_STATEMENTS,
+    HANDLER_SQL_SECONDS,
+    QueryStats,
+    query_stats,
+)
+
+HandlerCallback = Callable[..., Coroutine[Any, Any, Any]]
+
+
+def timed(callback: HandlerCallback) -> HandlerCallback:
+    """
+    Wrap a handler callback to record its time, errors and SQL statements
+    Args:
+        callback (HandlerCallback): handler callback
+    Returns:
+        HandlerCallback: wrapped callback
+    """
+    if getattr(callback, "_instrumented", False):
+        return callback
+    name = callback.__name__
+
+    @functools.wraps(callback)
+    async def wrapper(*args, **kwargs):
+        stats = QueryStats()
+        token = query_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            return await callback(*args, **kwargs)
+        except Exception:
+            HANDLER_ERRORS.inc(handler=name)
+            raise
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - start, handler=name)
+            HANDLER_STATEMENTS.observe(stats.statements, handler=name)
+            HANDLER_SQL_SECONDS.observe(stats.seconds, handler=name)
+            query_stats.reset(token)
+
+    wrapper._instrumented = True
+    return wrapper
+
+
+def _instrument(handler: BaseHandler) -> None:
+    """
+    Wrap the callback of the handler, or of every handler of a conversation
+    Args:
+        handler (BaseHandler): registered handler
+    """
+    if isinstance(handler, ConversationHandler):
+        for child in (
+            *handler.entry_points,
+            *(child for children in handler.states.values() for child in children),
+            *handler.fallbacks,
+        ):
+            _instrument(child)
+    else:
+        handler.callback = timed(handler.callback)
+
+
+def instrument_handlers(application: Application) -> Application:
+    """
+    Record metrics of all the handlers registered on the application
+    Args:
+        application (Application): Telegram application
+    Returns:
+        Application: the same application
+    """
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            _instrument(handler)
+    return application
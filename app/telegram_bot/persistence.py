@@ -0,0 +1,279 @@
+" Persistence of conversation states and user data in the app database "
+import json
+import asyncio
+import logging
+from typing import Any, Dict, Tuple
+from sqlalchemy.orm import Session
+from telegram.ext import BasePersistence, PersistenceInput
+from app.database.models import ConversationState, UserData
+from app.database.queries.utils import session_scope
+
+logger = logging.getLogger(__name__)
+
+ConversationKey = Tuple[int | str, ...]
+ConversationDict = Dict[ConversationKey, object]
+
+
+def _encode_key(key: ConversationKey) -> str:
+    return json.dumps(list(key))
+
+
+def _decode_key(key: str) -> ConversationKey:
+    return tuple(json.loads(key))
+
+
+class DatabasePersistence(BasePersistence[Dict[Any, Any], Dict[Any, Any], Dict[Any, Any]]):
+    """
+    Stores conversation states and user data in the app database, so that
+    conversations survive restarts and can be resumed by any bot process.
+    Chat data, bot data and callback data are not stored.
+
+    Writes are buffered in memory and saved in a single transaction once
+    `batch_size` changes are pending or `flush_delay` seconds after the first
+    pending change, so handling an update never waits for a database write.
+    A newer change of the same conversation or user replaces the pending one.
+
+    The application hands the changes over every `update_interval` seconds,
+    add_handlers makes it hand them over after every update as well, so a
+    process that dies loses at most `flush_delay` seconds of changes. The
+    tables are created by the migrations.
+
+    Args:
+        update_interval (float): seconds between the application's persistence updates
+        flush_delay (float): seconds a change can stay in memory
+        batch_size (int): number of pending changes that are saved right away
+    """
+
+    def __init__(
+        self, update_interval: float = 60, flush_delay: float = 1, batch_size: int = 500
+    ) -> None:
+        super().__init__(
+            store_data=PersistenceInput(
+                user_data=True, chat_data=False, bot_data=False, callback_data=False
+            ),
+            update_interval=update_interval,
+        )
+        self._flush_delay = flush_delay
+        self._batch_size = batch_size
+        self._conversations: Dict[Tuple[str, ConversationKey], object] = {}
+        self._users: Dict[int, str | None] = {}
+        self._flush_task: asyncio.Task | None = None
+        self._batch_full = asyncio.Event()
+        self._lock = asyncio.Lock()
+
+    async def get_user_data(self) -> Dict[int, Dict[Any, Any]]:
+        """
+        Load the data of all users
+        Returns:
+            Dict[int, Dict[Any, Any]]: user data by telegram id
+        """
+
+        def load() -> Dict[int, Dict[Any, Any]]:
+            with session_scope() as session:
+                return {
+                    row.user_id: json.loads(row.data)
+                    for row in session.query(UserData).all()
+                }
+
+        return await asyncio.to_thread(load)
+
+    async def get_conversations(self, name: str) -> ConversationDict:
+        """
+        Load the states of all conversations of the handler
+        Args:
+            name (str): conversation handler name
+        Returns:
+            ConversationDict: conversation states by conversation key
+        """
+
+        def load() -> ConversationDict:
+            with session_scope() as session:
+                rows = session.query(ConversationState).filter_by(name=name).all()
+                return {_decode_key(row.key): json.loads(row.state) for row in rows}
+
+        return await asyncio.to_thread(load)
+
+    async def update_conversation(
+        self, name: str, key: ConversationKey, new_state: object | None
+    ) -> None:
+        """
+        Save the new state of a conversation
+        Args:
+            name (str): conversation handler name
+            key (ConversationKey): conversation key
+            new_state (object | None): new state, None if the conversation ended
+        """
+        self._conversations[(name, key)] = new_state
+        self._schedule_flush()
+
+    async def update_user_data(self, user_id: int, data: Dict[Any, Any]) -> None:
+        """
+        Save the data of a user
+        Args:
+            user_id (int): telegram id
+            data (Dict[Any, Any]): user data
+        """
+        self._users[user_id] = json.dumps(data)
+        self._schedule_flush()
+
+    async def drop_user_data(self, user_id: int) -> None:
+        """
+        Delete the data of a user
+        Args:
+            user_id (int): telegram id
+        """
+        self._users[user_id] = None
+        self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        """
+        Save the pending changes now if there are enough of them, later otherwise
+        """
+        if len(self._conversations) + len(self._users) >= self._batch_size:
+            self._batch_full.set()
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self) -> None:
+        """
+        Save the pending changes after the flush delay or once the batch is full
+        """
+        try:
+            await asyncio.wait_for(self._batch_full.wait(), self._flush_delay)
+        except asyncio.TimeoutError:
+            pass
+        self._batch_full.clear()
+        await self._write_pending()
+
+        # changes made while writing wait for the next flush
+        if self._conversations or self._users:
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _write_pending(self) -> None:
+        """
+        Save all the pending changes in a single transaction
+        """
+        async with self._lock:
+            conversations, self._conversations = self._conversations, {}
+            users, self._users = self._users, {}
+            if not conversations and not users:
+                return
+            try:
+                await asyncio.to_thread(self._write, conversations, users)
+            except Exception:
+                logger.exception("Failed to save conversations and user data")
+                # keep the changes unless newer ones arrived meanwhile
+                self._conversations = {**conversations, **self._conversations}
+                self._users = {**users, **self._users}
+
+    @classmethod
+    def _write(
+        cls,
+        conversations: Dict[Tuple[str, ConversationKey], object],
+        users: Dict[int, str | None],
+    ) -> None:
+        """
+        Save conversation states and user data in a single transaction
+        Args:
+            conversations (Dict[Tuple[str, ConversationKey], object]): new states
+            users (Dict[int, str | None]): new JSON encoded user data
+        """
+        with session_scope() as session:
+            cls._write_conversations(session, conversations)
+            cls._write_user_data(session, users)
+
+    @staticmethod
+    def _write_conversations(
+        session: Session, states: Dict[Tuple[str, ConversationKey], object]
+    ) -> None:
+        """
+        Save conversation states
+        Args:
+            session (Session): database session
+            states (Dict[Tuple[str, ConversationKey], object]): new states by handler
+                name and conversation key, None for ended conversations
+        """
+        keys = {(name, _encode_key(key)): state for (name, key), state in states.items()}
+        rows = {
+            (row.name, row.key): row
+            for row in session.query(ConversationState).filter(
+                ConversationState.name.in_({name for name, _ in keys}),
+                ConversationState.key.in_({key for _, key in keys}),
+            )
+        }
+        for (name, key), state in keys.items():
+            row = rows.get((name, key))
+            if state is None:
+                if row is not None:
+                    session.delete(row)
+            elif row is None:
+                session.add(ConversationState(name=name, key=key, state=json.dumps(state)))
+            else:
+                row.state = json.dumps(state)
+
+    @staticmethod
+    def _write_user_data(session: Session, users: Dict[int, str | None]) -> None:
+        """
+        Save the data of users
+        Args:
+            session (Session): database session
+            users (Dict[int, str | None]): JSON encoded user data by telegram id,
+                None for the users whose data is dropped
+        """
+        rows = {
+            row.user_id: row
+            for row in session.query(UserData).filter(UserData.user_id.in_(users))
+        }
+        for user_id, data in users.items():
+            row = rows.get(user_id)
+            if data is None:
+                if row is not None:
+                    session.delete(row)
+            elif row is None:
+                session.add(UserData(user_id=user_id, data=data))
+            else:
+                row.data = data
+
+    async def flush(self) -> None:
+        """
+        Save all the pending changes, called when the application stops
+        """
+        if self._flush_task is not None and not self._flush_task.done():
+            self._batch_full.set()
+            await self._flush_task
+        await self._write_pending()
+
+    # Chat data, bot data and callback data are not stored
+
+    async def get_chat_data(self) -> Dict[int, Dict[Any, Any]]:
+        return {}
+
+    async def get_bot_data(self) -> Dict[Any, Any]:
+        return {}
+
+    async def get_callback_data(self) -> None:
+        return None
+
+    async def update_chat_data(self, chat_id: int, data: Dict[Any, Any]) -> None:
+        pass
+
+    async def update_bot_data(self, data: Dict[Any, Any]) -> None:
+        pass
+
+    async def update_callback_data(self, data: Any) -> None:
+        pass
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        pass
+
+    # Updates of a user are always handled by the same process,
+    # so the data in memory is never older than the stored one
+
+    async def refresh_user_data(self, user_id: int, user_data: Dict[Any, Any]) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Dict[Any, Any]) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: Dict[Any, Any]) -> None:
+        pass
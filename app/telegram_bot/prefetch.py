@@ -0,0 +1,124 @@
+" Prefetch of the next exercise of a user while they work on the current one "
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Tuple
+from telegram import User
+from app.config import PREFETCH_TTL
+from app.database.queries.queries import get_random_exercise
+from app.utils.render_cache import renderer
+
+logger = logging.getLogger(__name__)
+
+# Exercise id, contents, paragraph title, section title
+ExerciseInfo = Tuple[int, str, str, str]
+
+# Users with a prefetched exercise kept at most, the oldest slots are dropped
+MAX_SLOTS = 1000
+
+
+class ExercisePrefetcher:
+    """
+    Keeps a slot per user with the next exercise picked and rendered in the
+    background, so that "Next trial" is answered without waiting for the
+    database and pdflatex. A slot has to be invalidated whenever the set of
+    exercises the user can get changes: paragraph selection, solves, removes.
+    A slot older than `ttl` seconds is discarded, since the exercise may have
+    been solved elsewhere or a review may have become due meanwhile.
+
+    Args:
+        max_slots (int): users with a prefetched exercise kept at most
+        ttl (float): seconds a prefetched exercise can be served after it was started
+    """
+
+    def __init__(self, max_slots: int = MAX_SLOTS, ttl: float = PREFETCH_TTL) -> None:
+        self.max_slots = max_slots
+        self.ttl = ttl
+        # task and monotonic time it was started at by user id
+        self._slots: OrderedDict[int, Tuple[asyncio.Task, float]] = OrderedDict()
+
+    def start(self, user: User, exclude_id: int | None = None) -> None:
+        """
+        Start picking and rendering the next exercise of the user unless it is already done
+        Args:
+            user (User): Telegram user
+            exclude_id (int | None): exercise the user is working on
+        """
+        slot = self._slots.get(user.id)
+        if slot is not None:
+            if not self._expired(slot):
+                return
+            self.invalidate(user.id)
+        self._slots[user.id] = (
+            asyncio.create_task(self._prefetch(user, exclude_id)),
+            time.monotonic(),
+        )
+        while len(self._slots) > self.max_slots:
+            _, (task, _) = self._slots.popitem(last=False)
+            task.cancel()
+
+    def _expired(self, slot: Tuple[asyncio.Task, float]) -> bool:
+        """
+        Check whether a slot is too old to be served
+        Args:
+            slot (Tuple[asyncio.Task, float]): task and the time it was started at
+        Returns:
+            bool: True if the slot is older than the ttl
+        """
+        return time.monotonic() - slot[1] > self.ttl
+
+    @staticmethod
+    async def _prefetch(user: User, exclude_id: int | None) -> Tuple[ExerciseInfo, bytes]:
+        """
+        Pick the next exercise and render it
+        Args:
+            user (User): Telegram user
+            exclude_id (int | None): exercise the user is working on
+        Returns:
+            Tuple[ExerciseInfo, bytes]: exercise and its image
+        """
+        exercise_info = await asyncio.to_thread(
+            get_random_exercise,
+            first_name=user.first_name,
+            telegram_id=user.id,
+            username=user.username,
+            exclude_id=exclude_id,
+        )
+        return exercise_info, await renderer.render(exercise_info[1])
+
+    async def take(self, user_id: int) -> Tuple[ExerciseInfo, bytes] | None:
+        """
+        Take the prefetched exercise of the user, waiting for it if it is still being prepared
+        Args:
+            user_id (int): Telegram's user id
+        Returns:
+            Tuple[ExerciseInfo, bytes] | None: exercise and its image, None if
+                there is no prefetched exercise, it expired or the prefetch failed
+        """
+        slot = self._slots.pop(user_id, None)
+        if slot is None:
+            return None
+        task, _ = slot
+        if self._expired(slot):
+            task.cancel()
+            return None
+        try:
+            return await task
+        except Exception:  # pylint: disable=broad-except
+            logger.warning("Prefetching the next exercise of %s failed", user_id, exc_info=True)
+            return None
+
+    def invalidate(self, user_id: int) -> None:
+        """
+        Drop the prefetched exercise of the user
+        Args:
+            user_id (int): Telegram's user id
+        """
+        slot = self._slots.pop(user_id, None)
+        if slot is not None:
+            # the render itself goes on for the other users waiting for it
+            slot[0].cancel()
+
+
+prefetcher = ExercisePrefetcher()
@@ -0,0 +1,323 @@
+" Token bucket scheduler for the outbound Bot API calls "
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+from datetime import timedelta
+from typing import Any, Callable, Coroutine, Dict, List, Tuple
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+from app.utils.metrics import (
+    BOT_API_SECONDS,
+    BOT_API_QUEUED,
+    BOT_API_WAIT_SECONDS,
+    BOT_API_FLOOD_ERRORS,
+    BOT_API_RETRIES,
+    BOT_API_CHAT_BUCKETS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Request priorities, lower values are sent first
+INTERACTIVE = 0
+BROADCAST = 1
+PRIORITIES = {"interactive": INTERACTIVE, "broadcast": BROADCAST}
+PRIORITY_NAMES = {value: name for name, value in PRIORITIES.items()}
+
+# Number of chat buckets kept before the idle ones are dropped
+MAX_CHAT_BUCKETS = 10_000
+
+
+class TokenBucket:
+    """
+    Token bucket that refills `rate` tokens per second up to `capacity`
+
+    Args:
+        rate (float): tokens added per second
+        capacity (float): maximum number of tokens
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated", "paused_until")
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def delay(self, now: float) -> float:
+        """
+        Get the time until a token is available
+        Args:
+            now (float): current monotonic time
+        Returns:
+            float: seconds to wait, 0 if a token is available
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        return max(wait, self.paused_until - now)
+
+    def take(self) -> None:
+        """
+        Take a token from the bucket
+        """
+        self.tokens -= 1
+
+    def pause(self, seconds: float) -> None:
+        """
+        Stop giving out tokens for some time
+        Args:
+            seconds (float): length of the pause
+        """
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class TokenBucketRateLimiter(BaseRateLimiter[Dict[str, Any]]):
+    """
+    Throttles all outbound Bot API calls with a global token bucket and a
+    token bucket per chat. Waiting calls are sent in priority order, replies
+    to users (the default) go before calls made with
+    `rate_limit_args={"priority": "broadcast"}`. Calls failed with a flood
+    error (429) are retried after the `retry_after` returned by Telegram.
+    The queue, the waiting times and the flood errors are published on /metrics.
+
+    Args:
+        overall_rate (float): calls per second for the whole bot
+        overall_burst (float): calls that can be made at once by the whole bot
+        chat_rate (float): calls per second for a private chat
+        chat_burst (float): calls that can be made to a private chat at once
+        group_rate (float): calls per second for a group chat
+        max_retries (int): maximum number of retries of a call after a flood error
+    """
+
+    def __init__(
+        self,
+        overall_rate: float = 25,
+        overall_burst: float = 5,
+        chat_rate: float = 1,
+        chat_burst: float = 3,
+        group_rate: float = 20 / 60,
+        max_retries: int = 3,
+    ) -> None:
+        self._overall = TokenBucket(overall_rate, overall_burst)
+        self._chat_rate = chat_rate
+        self._chat_burst = chat_burst
+        self._group_rate = group_rate
+        self._max_retries = max_retries
+        self._chats: Dict[int | str, TokenBucket] = {}
+        self._queue: List[Tuple[int, int, int | str | None, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._dispatcher: asyncio.Task | None = None
+        self._sent = 0
+        self._retries = 0
+        self._flood_errors = 0
+        self._total_wait = 0.0
+        for name, priority in PRIORITIES.items():
+            BOT_API_QUEUED.set_function(
+                lambda priority=priority: self._queued(priority), priority=name
+            )
+        BOT_API_CHAT_BUCKETS.set_function(lambda: len(self._chats))
+
+    async def initialize(self) -> None:
+        """
+        Start dispatching the queued calls
+        """
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def shutdown(self) -> None:
+        """
+        Stop dispatching and cancel the queued calls
+        """
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+        for *_, future in self._queue:
+            future.cancel()
+        self._queue = []
+
+    def _chat_bucket(self, chat_id: int | str) -> TokenBucket:
+        """
+        Get the token bucket of the chat
+        Args:
+            chat_id (int | str): chat id or @username of a channel
+        Returns:
+            TokenBucket: chat's token bucket
+        """
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= MAX_CHAT_BUCKETS:
+                self._prune_chat_buckets()
+            private = isinstance(chat_id, int) and chat_id > 0
+            rate = self._chat_rate if private else self._group_rate
+            burst = self._chat_burst if private else 1
+            bucket = self._chats[chat_id] = TokenBucket(rate, burst)
+        return bucket
+
+    def _prune_chat_buckets(self) -> None:
+        """
+        Forget the chats whose buckets are full again, they behave like new ones
+        """
+        now = time.monotonic()
+        for chat_id, bucket in list(self._chats.items()):
+            if bucket.delay(now) == 0 and bucket.tokens >= bucket.capacity:
+                del self._chats[chat_id]
+
+    async def _dispatch(self) -> None:
+        """
+        Give permits to the queued calls in priority order as tokens become available
+        """
+        while True:
+            timeout = None
+            if self._queue:
+                timeout = self._grant()
+                if timeout == 0:
+                    continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _grant(self) -> float | None:
+        """
+        Give a permit to the first queued call whose chat has a token available
+        Returns:
+            float | None: 0 if a permit was given, otherwise seconds until one
+                can be given or None if there is nothing to wait for
+        """
+        now = time.monotonic()
+        delay = self._overall.delay(now)
+        if delay > 0:
+            return delay
+
+        skipped = []
+        delay = float("inf")
+        try:
+            while self._queue:
+                item = heapq.heappop(self._queue)
+                chat_id, future = item[2], item[3]
+                if future.done():
+                    continue
+                chat_delay = 0 if chat_id is None else self._chat_bucket(chat_id).delay(now)
+                if chat_delay > 0:
+                    skipped.append(item)
+                    delay = min(delay, chat_delay)
+                    continue
+                self._overall.take()
+                if chat_id is not None:
+                    self._chats[chat_id].take()
+                future.set_result(None)
+                return 0
+        finally:
+            for item in skipped:
+                heapq.heappush(self._queue, item)
+        return delay if skipped else None
+
+    def _queued(self, priority: int) -> int:
+        """
+        Get the number of calls waiting for a permit
+        Args:
+            priority (int): call priority
+        Returns:
+            int: calls of the priority that are neither granted nor cancelled
+        """
+        return sum(
+            1 for item in list(self._queue) if item[0] == priority and not item[3].done()
+        )
+
+    async def _acquire(self, chat_id: int | str | None, priority: int) -> None:
+        """
+        Wait for a permit to make a call
+        Args:
+            chat_id (int | str | None): chat the call is made to
+            priority (int): call priority
+        """
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._sequence), chat_id, future))
+        self._wakeup.set()
+        start = time.perf_counter()
+        await future
+        wait = time.perf_counter() - start
+        self._total_wait += wait
+        BOT_API_WAIT_SECONDS.observe(wait, priority=PRIORITY_NAMES.get(priority, priority))
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Any]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Dict[str, Any] | None,
+    ) -> Any:
+        """
+        Make the call once the rate limits allow it, retry it after flood errors
+        Args:
+            callback (Callable): coroutine function that makes the call
+            args (Any): positional arguments of the callback
+            kwargs (Dict[str, Any]): keyword arguments of the callback
+            endpoint (str): Bot API method, e.g. "sendMessage"
+            data (Dict[str, Any]): parameters of the call
+            rate_limit_args (Dict[str, Any] | None): {"priority": "interactive" | "broadcast"}
+        Returns:
+            Any: result of the call
+        """
+        priority = (rate_limit_args or {}).get("priority", INTERACTIVE)
+        priority = PRIORITIES.get(priority, priority)
+        chat_id = data.get("chat_id")
+
+        for attempt in range(self._max_retries + 1):
+            await self._acquire(chat_id, priority)
+            try:
+                with BOT_API_SECONDS.time(method=endpoint):
+                    result = await callback(*args, **kwargs)
+                self._sent += 1
+                return result
+            except RetryAfter as error:
+                self._flood_errors += 1
+                BOT_API_FLOOD_ERRORS.inc(method=endpoint)
+                if attempt == self._max_retries:
+                    raise
+                retry_after = error.retry_after
+                if isinstance(retry_after, timedelta):
+                    retry_after = retry_after.total_seconds()
+                logger.warning(
+                    "Flood control on %s for chat %s, retrying in %ss",
+                    endpoint,
+                    chat_id,
+                    retry_after,
+                )
+                # a flood error for a chat only limits that chat
+                bucket = self._overall if chat_id is None else self._chat_bucket(chat_id)
+                bucket.pause(retry_after)
+                self._retries += 1
+                BOT_API_RETRIES.inc(method=endpoint)
+        return None
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Get queue metrics of the rate limiter
+        Returns:
+            Dict[str, Any]: queued calls by priority, sent calls, retries and waiting time
+        """
+        queued = {name: 0 for name in PRIORITIES}
+        for priority, *_ in self._queue:
+            name = PRIORITY_NAMES.get(priority, str(priority))
+            queued[name] = queued.get(name, 0) + 1
+        return {
+            "queued": queued,
+            "sent": self._sent,
+            "flood_errors": self._flood_errors,
+            "retries": self._retries,
+            "wait_seconds_total": self._total_wait,
+            "chats": len(self._chats),
+        }
@@ -0,0 +1,164 @@
+" Update processor that runs updates concurrently while keeping per-user ordering "
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Dict, Hashable
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+from app.utils.metrics import (
+    UPDATES_ACTIVE,
+    UPDATES_QUEUED,
+    USERS_QUEUED,
+    UPDATE_WAIT_SECONDS,
+    USER_BURST_UPDATES,
+    USER_BURST_MAX_WAIT_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class _UserQueue:
+    """
+    Lock and queue statistics of a single user
+    """
+
+    __slots__ = ("lock", "depth", "processed", "max_wait")
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.depth = 0
+        self.processed = 0
+        self.max_wait = 0.0
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Processes updates from different users concurrently and updates
+    from the same user strictly in the order they were received.
+
+    Updates waiting for an earlier update of the same user do not occupy
+    one of the processing slots, so a single busy user can't block the others.
+    The queues and the waiting times are published on /metrics.
+
+    Args:
+        max_processing_updates (int): Maximum number of updates processed at the same time
+        max_pending_updates (int): Maximum number of updates accepted (processed or waiting)
+            at the same time. Defaults to 16 * max_processing_updates
+    """
+
+    def __init__(
+        self, max_processing_updates: int, max_pending_updates: int | None = None
+    ) -> None:
+        if max_processing_updates < 1:
+            raise ValueError("max_processing_updates must be a positive integer")
+        # the base class semaphore limits the number of accepted updates,
+        # the number of updates processed at once is limited by `_workers`
+        super().__init__(max_pending_updates or 16 * max_processing_updates)
+        self._max_processing_updates = max_processing_updates
+        self._workers = asyncio.BoundedSemaphore(max_processing_updates)
+        self._active = 0
+        self._queued = 0
+        self._queues: Dict[Hashable, _UserQueue] = {}
+        UPDATES_ACTIVE.set_function(lambda: self._active)
+        UPDATES_QUEUED.set_function(lambda: self._queued)
+        USERS_QUEUED.set_function(lambda: len(self._queues))
+
+    @property
+    def max_processing_updates(self) -> int:
+        """
+        Maximum number of updates processed at the same time
+        """
+        return self._max_processing_updates
+
+    @staticmethod
+    def _user_key(update: object) -> Hashable | None:
+        """
+        Get the key updates are serialized by
+        Args:
+            update (object): incoming update
+        Returns:
+            Hashable | None: user id, chat id or None if the update has neither
+        """
+        if not isinstance(update, Update):
+            return None
+        if update.effective_user is not None:
+            return update.effective_user.id
+        if update.effective_chat is not None:
+            return ("chat", update.effective_chat.id)
+        return None
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """
+        Wait for the previous updates of the same user and process the update
+        Args:
+            update (object): update to process
+            coroutine (Awaitable[Any]): coroutine that processes the update
+        """
+        key = self._user_key(update)
+        self._queued += 1
+        try:
+            if key is None:
+                await self._run(coroutine, time.perf_counter(), None)
+            else:
+                await self._run_in_order(key, coroutine)
+        finally:
+            self._queued -= 1
+
+    async def _run_in_order(self, key: Hashable, coroutine: Awaitable[Any]) -> None:
+        """
+        Process the update after the previous updates of the same user
+        Args:
+            key (Hashable): user key of the update
+            coroutine (Awaitable[Any]): coroutine that processes the update
+        """
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = _UserQueue()
+        queue.depth += 1
+        received = time.perf_counter()
+        try:
+            async with queue.lock:
+                await self._run(coroutine, received, queue)
+        finally:
+            queue.depth -= 1
+            if queue.depth == 0:
+                # the statistics of the user are dropped with the queue
+                if queue.processed:
+                    USER_BURST_UPDATES.observe(queue.processed)
+                    USER_BURST_MAX_WAIT_SECONDS.observe(queue.max_wait)
+                del self._queues[key]
+
+    async def _run(
+        self, coroutine: Awaitable[Any], received: float, queue: _UserQueue | None
+    ) -> None:
+        """
+        Take a processing slot, record the waiting time and process the update
+        Args:
+            coroutine (Awaitable[Any]): coroutine that processes the update
+            received (float): time the update was received at
+            queue (_UserQueue | None): queue of the update's user
+        """
+        async with self._workers:
+            wait = time.perf_counter() - received
+            UPDATE_WAIT_SECONDS.observe(wait)
+            if queue is not None:
+                queue.processed += 1
+                queue.max_wait = max(queue.max_wait, wait)
+            if wait > 1:
+                logger.warning("Update waited %.2fs before processing", wait)
+
+            self._active += 1
+            try:
+                await coroutine
+            finally:
+                self._active -= 1
+
+    async def initialize(self) -> None:
+        """
+        Nothing to initialize
+        """
+
+    async def shutdown(self) -> None:
+        """
+        Nothing to free, running updates are awaited by the application
+        """
@@ -0,0 +1,79 @@
+" Warm-up of the caches a fresh bot process needs before handling updates "
+import time
+import asyncio
+import logging
+from telegram.ext import Application
+from app.config import WARMUP_PRERENDER
+from app.database.queries.utils import engine, warm_indexes
+from app.database.queries.catalog import exercise_catalog
+from app.database.queries.write_behind import user_writes
+from app.database.queries.queries import (
+    get_sections,
+    get_section_paragraphs,
+    count_all_exercises,
+    most_solved_exercise_ids,
+)
+from app.telegram_bot.handlers.keyboards import keyboards
+from app.utils.metrics import ready
+from app.utils.render_cache import rendered_images
+
+logger = logging.getLogger(__name__)
+
+
+def _prerender(count: int) -> int:
+    """
+    Render the most solved exercises into the image cache
+    Args:
+        count (int): number of exercises
+    Returns:
+        int: number of rendered exercises
+    """
+    rendered = 0
+    for exercise_id in most_solved_exercise_ids(count):
+        exercise = exercise_catalog.get().exercise(exercise_id)
+        if exercise is None:
+            continue
+        try:
+            rendered_images.render(exercise[1])
+            rendered += 1
+        except Exception:  # pylint: disable=broad-except
+            logger.warning("Could not prerender exercise %s", exercise_id)
+    return rendered
+
+
+def warm_up(prerender: int = WARMUP_PRERENDER) -> None:
+    """
+    Load the exercise catalog, fill the cached queries of the menus, load the
+    known users, read the hot indexes and optionally render the most solved
+    exercises
+    Args:
+        prerender (int): number of exercises to render, 0 to skip rendering
+    """
+    steps = [
+        ("catalog", exercise_catalog.get),
+        ("sections", lambda: [get_section_paragraphs(section_id) for section_id in get_sections()]),
+        ("keyboards", keyboards.load),
+        ("exercise counts", count_all_exercises),
+        ("known users", user_writes.load_known_users),
+        ("indexes", lambda: warm_indexes(engine)),
+    ]
+    if prerender:
+        steps.append(("images", lambda: _prerender(prerender)))
+
+    started = time.perf_counter()
+    for name, step in steps:
+        step_started = time.perf_counter()
+        step()
+        logger.info("Warmed up %s in %.3f s", name, time.perf_counter() - step_started)
+    logger.info("Warm-up finished in %.3f s", time.perf_counter() - started)
+
+
+async def warm_up_application(application: Application) -> None:  # pylint: disable=unused-argument
+    """
+    Warm up the caches before the first update is handled and report the
+    process as ready
+    Args:
+        application (Application): Telegram application
+    """
+    await asyncio.to_thread(warm_up)
+    ready.set()
@@ -0,0 +1,195 @@
+" In-process rendering of simple snippets with matplotlib's mathtext instead of pdflatex "
+import io
+import re
+import logging
+import threading
+import importlib.util
+from typing import List
+from app.config import RENDER_PROFILE
+from app.utils.image_converter import RENDER_PROFILES
+from app.utils.metrics import RENDER_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Characters of the text of a single line
+LINE_WIDTH = 80
+
+# Constructs mathtext can't typeset like LaTeX does: display math, environments,
+# line breaks, images and tables
+UNSUPPORTED = re.compile(r"\$\$|\\\[|\\begin|\\\\|!\[|^\s*\|", re.MULTILINE)
+INLINE_MATH = re.compile(r"\$[^$]*\$")
+# Outside of math LaTeX interprets commands, groups and special characters
+# that matplotlib would print as they are
+TEXT_SPECIALS = re.compile(r"[\\{}%&#~^_]")
+# Words that are never split across lines, a math segment counts as a word
+WORD = re.compile(r"(?:\$[^$]*\$|\S)+")
+
+# LaTeX commands mathtext knows under another name or doesn't need
+MATH_ALIASES = {
+    "ge": r"\geq",
+    "le": r"\leq",
+    "iff": r"\Leftrightarrow",
+    "tfrac": r"\frac",
+    "textrm": r"\mathrm",
+    "mbox": r"\text",
+    "hbox": r"\text",
+    "lvert": "|",
+    "rvert": "|",
+    "displaystyle": "",
+    "limits": "",
+    "big": "",
+    "Big": "",
+    "bigl": "",
+    "bigr": "",
+    "Bigl": "",
+    "Bigr": "",
+}
+MATH_COMMAND = re.compile(r"\\([a-zA-Z]+)")
+
+# matplotlib's mathtext parser and font cache are shared between threads
+_lock = threading.Lock()
+
+
+class Unsupported(Exception):
+    """
+    Raised when mathtext can't parse a snippet the classifier accepted
+    """
+
+
+def available() -> bool:
+    """
+    Check if matplotlib is installed, it is an optional dependency
+    Returns:
+        bool: True if the fast path can be used
+    """
+    return importlib.util.find_spec("matplotlib") is not None
+
+
+def classify(latex_snippet: str) -> str:
+    """
+    Choose the renderer of a snippet: prose with inline math goes to mathtext,
+    everything else to pdflatex
+    Args:
+        latex_snippet (str): LaTeX code
+    Returns:
+        str: "mathtext" or "latex"
+    """
+    if UNSUPPORTED.search(latex_snippet) or latex_snippet.count("$") % 2:
+        return "latex"
+    if TEXT_SPECIALS.search(INLINE_MATH.sub("", latex_snippet)):
+        return "latex"
+    return "mathtext"
+
+
+def translate(latex_snippet: str) -> str:
+    """
+    Replace the commands of the math that mathtext knows under another name
+    Args:
+        latex_snippet (str): LaTeX code
+    Returns:
+        str: LaTeX code for mathtext
+    """
+
+    def alias(match: re.Match) -> str:
+        return MATH_ALIASES.get(match.group(1), match.group(0))
+
+    return INLINE_MATH.sub(
+        lambda math: MATH_COMMAND.sub(alias, math.group(0)), latex_snippet
+    )
+
+
+def wrap(latex_snippet: str, width: int = LINE_WIDTH) -> str:
+    """
+    Break the paragraphs of a snippet into lines like TeX does, without
+    splitting math. Single newlines are spaces, blank lines separate paragraphs.
+    Args:
+        latex_snippet (str): LaTeX code
+        width (int): characters of a line
+    Returns:
+        str: text with a line per row of the image
+    """
+    paragraphs = []
+    for paragraph in re.split(r"\n\s*\n", latex_snippet.strip()):
+        lines: List[str] = []
+        line = ""
+        for word in WORD.findall(paragraph):
+            if line and len(line) + 1 + len(word) > width:
+                lines.append(line)
+                line = word
+            else:
+                line = f"{line} {word}" if line else word
+        lines.append(line)
+        paragraphs.append("\n".join(lines))
+    return "\n\n".join(paragraphs)
+
+
+def mathtext_to_bytes(latex_snippet: str, profile: str = RENDER_PROFILE) -> bytes:
+    """
+    Render a snippet accepted by classify into a cropped PNG in memory with matplotlib
+    Args:
+        latex_snippet (str): LaTeX code to render
+        profile (str): Name of the rendering profile from RENDER_PROFILES
+    Returns:
+        bytes: PNG image, WebP for the "phone-webp" profile
+    Raises:
+        Unsupported: if mathtext can't parse the math of the snippet
+    """
+    # pylint: disable=import-outside-toplevel
+    # matplotlib is imported on the first render, not when the bot starts
+    from matplotlib.figure import Figure
+    from PIL import Image
+
+    settings = RENDER_PROFILES[profile]
+    with _lock, RENDER_SECONDS.time(phase="mathtext"):
+        figure = Figure()
+        figure.text(
+            0,
+            1,
+            wrap(translate(latex_snippet)),
+            va="top",
+            fontsize=10,
+            family="cmr10",
+            math_fontfamily="cm",
+            linespacing=1.4,
+        )
+        buffer = io.BytesIO()
+        try:
+            figure.savefig(
+                buffer,
+                format="png",
+                dpi=settings["dpi"],
+                bbox_inches="tight",
+                pad_inches=0.12,
+                facecolor="white",
+            )
+        except ValueError as error:
+            raise Unsupported(str(error)) from error
+
+    # The same post-processing as pdftoppm, pngquant and cwebp do for pdflatex
+    image = Image.open(buffer)
+    image = image.convert("L" if settings["gray"] else "RGB")
+    if settings["quantize"]:
+        image = image.quantize(16)
+    output = io.BytesIO()
+    if settings["webp"]:
+        image.save(output, format="WEBP", lossless=True)
+    else:
+        image.save(output, format="PNG", optimize=True)
+    return output.getvalue()
+
+
+def mathtext_to_png(
+    latex_snippet: str, output_png: str = "output.png", profile: str = RENDER_PROFILE
+) -> None:
+    """
+    Render a snippet accepted by classify into a cropped PNG file with matplotlib
+    Args:
+        latex_snippet (str): LaTeX code to render
+        output_png (str): Output PNG file path
+        profile (str): Name of the rendering profile from RENDER_PROFILES
+    Raises:
+        Unsupported: if mathtext can't parse the math of the snippet
+    """
+    image = mathtext_to_bytes(latex_snippet, profile)
+    with open(output_png, "wb") as file:
+        file.write(image)
@@ -1,10 +1,14 @@
 import os
 import re
+import atexit
 import shutil
 import subprocess
 import tempfile
+import threading
 from string import Template
 import logging
+from app.config import RENDER_PROFILE, RENDER_WORK_DIR
+from app.utils.metrics import RENDER_SECONDS
 
 
 def substitute(match):
@@ -32,13 +36,116 @@ def replace_image_links(markdown_text) -> str:
     return pattern.sub(substitute, markdown_text)
 
 
-def latex_to_png(latex_snippet, output_png="output.png"):
+# Rendering profiles by name. Telegram shows photos at most 1280 px wide, so
+# "phone" rasterizes the text width to about 1000 px instead of about 1900 px
+# and keeps only the padding that prevents extreme aspect ratios of one-line
+# snippets, which sendPhoto rejects.
+#   dpi: resolution of pdftoppm
+#   border: margins of the standalone class
+#   padding: vertical space above and below the snippet
+#   gray: 8-bit grayscale instead of RGB
+#   quantize: reduce to a 16-color palette with pngquant, if installed
+#   webp: convert to lossless WebP with cwebp, if installed
+RENDER_PROFILES = {
+    "print": {
+        "dpi": 300,
+        "border": "0.5cm 2cm 0.5cm 2cm",
+        "padding": "1cm",
+        "gray": False,
+        "quantize": False,
+        "webp": False,
+    },
+    "phone": {
+        "dpi": 200,
+        "border": "0.3cm 0.5cm 0.3cm 0.5cm",
+        "padding": "0.3cm",
+        "gray": True,
+        "quantize": True,
+        "webp": False,
+    },
+    "phone-webp": {
+        "dpi": 200,
+        "border": "0.3cm 0.5cm 0.3cm 0.5cm",
+        "padding": "0.3cm",
+        "gray": True,
+        "quantize": False,
+        "webp": True,
+    },
+}
+
+
+# Working directories of the rendering threads, on tmpfs when available
+_work = threading.local()
+
+
+def _work_dir() -> str:
+    """
+    Get the working directory of the current thread, created on its first
+    render and reused by the next ones: the files of a render are overwritten
+    by the next render of the thread
+    Returns:
+        str: directory path
+    """
+    if getattr(_work, "dir", None) is None:
+        base = RENDER_WORK_DIR or ("/dev/shm" if os.path.isdir("/dev/shm") else None)
+        _work.dir = tempfile.mkdtemp(prefix="render-", dir=base)
+        atexit.register(shutil.rmtree, _work.dir, True)
+    return _work.dir
+
+
+def _optimize(image: bytes, profile: dict, work_dir: str) -> bytes:
     """
-    Convert a LaTeX snippet (string) into a cropped PNG
+    Post-process a rendered PNG with the optional tools of the profile
+    Args:
+        image (bytes): PNG image
+        profile (dict): rendering profile
+        work_dir (str): working directory of the render
+    Returns:
+        bytes: PNG or WebP image
+    """
+    if profile["quantize"] and shutil.which("pngquant"):
+        with RENDER_SECONDS.time(phase="pngquant"):
+            result = subprocess.run(
+                ["pngquant", "--skip-if-larger", "16", "-"],
+                # 98 and 99 mean the result would be larger or worse, the PNG is kept
+                check=False,
+                input=image,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+        if result.returncode == 0:
+            image = result.stdout
+    if profile["webp"] and shutil.which("cwebp"):
+        png_path = os.path.join(work_dir, "output.png")
+        webp_path = os.path.join(work_dir, "output.webp")
+        with open(png_path, "wb") as file:
+            file.write(image)
+        with RENDER_SECONDS.time(phase="cwebp"):
+            subprocess.run(
+                ["cwebp", "-quiet", "-lossless", png_path, "-o", webp_path],
+                check=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+        with open(webp_path, "rb") as file:
+            image = file.read()
+    return image
+
+
+def latex_to_bytes(latex_snippet, profile=RENDER_PROFILE) -> bytes:
+    """
+    Convert a LaTeX snippet (string) into a cropped PNG in memory. The
+    intermediate files are written to the working directory of the thread
+    and the ones of the previous render are removed first.
     Args:
         latex_snippet (str): LaTeX code to render
-        output_png (str): Output PNG file path
+        profile (str): Name of the rendering profile from RENDER_PROFILES, the
+            "phone-webp" profile returns WebP
+    Returns:
+        bytes: PNG image
     """
+    settings = RENDER_PROFILES[profile]
+
     # Replace Markdown image links with local paths
     latex_snippet = replace_image_links(latex_snippet)
 
@@ -46,53 +153,81 @@ def latex_to_png(latex_snippet, output_png="output.png"):
     # Using the 'standalone' or 'preview' class helps produce tightly cropped output.
     doc_template = Template(
         r"""
-    \documentclass[preview,border={0.5cm 2cm 0.5cm 2cm}]{standalone}
+    \documentclass[preview,border={$border}]{standalone}
     \usepackage{amsmath,amssymb}
     \usepackage{graphicx}
     \begin{document}
-    \vspace*{1cm}  % Add vertical space at the top
+    \vspace*{$padding}  % Add vertical space at the top
     $latex_snippet
-    \vspace*{1cm}  % Add vertical space at the top
+    \vspace*{$padding}  % Add vertical space at the bottom
     \end{document}
     """
     )
-    latex_document = doc_template.substitute(latex_snippet=latex_snippet)
+    latex_document = doc_template.substitute(
+        latex_snippet=latex_snippet,
+        border=settings["border"],
+        padding=settings["padding"],
+    )
+
+    work_dir = _work_dir()
+    tex_path = os.path.join(work_dir, "temp.tex")
+    pdf_name = "temp.pdf"
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        tex_path = os.path.join(tmpdir, "temp.tex")
-        pdf_name = "temp.pdf"
+    # Remove the output of the previous render of the thread, pdflatex may exit
+    # without writing a PDF and the old image must not be returned instead
+    for name in (pdf_name, "temp.aux"):
+        try:
+            os.remove(os.path.join(work_dir, name))
+        except FileNotFoundError:
+            pass
 
-        # Write the LaTeX source to a temporary file
-        with open(tex_path, "w") as f:
-            f.write(latex_document)
+    # Write the LaTeX source to a temporary file
+    with open(tex_path, "w") as f:
+        f.write(latex_document)
 
-        # Run pdflatex (or xelatex)
-        # "--interaction=nonstopmode" avoids user prompts on errors
+    # Run pdflatex (or xelatex)
+    # "--interaction=nonstopmode" avoids user prompts on errors
+    with RENDER_SECONDS.time(phase="pdflatex"):
         result = subprocess.run(
             ["pdflatex", "--interaction=nonstopmode", tex_path],
             check=True,
-            cwd=tmpdir,
+            cwd=work_dir,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             text=True,
         )
-        logging.debug("pdflatex stdout: %s", result.stdout)
-        logging.error("pdflatex stderr: %s", result.stderr)
+    logging.debug("pdflatex stdout: %s", result.stdout)
+    logging.error("pdflatex stderr: %s", result.stderr)
 
-        # Convert cropped PDF to PNG
-        # "-density" can be adjusted for higher/lower resolution (e.g., 150, 300, 600)
+    # Convert cropped PDF to PNG at the resolution of the profile, without an
+    # output root pdftoppm writes the single page to stdout
+    with RENDER_SECONDS.time(phase="pdftoppm"):
         result = subprocess.run(
-            ["pdftoppm", "-png", "-r", "300", pdf_name, "output"],
+            ["pdftoppm", "-png", "-r", str(settings["dpi"])]
+            + (["-gray"] if settings["gray"] else [])
+            + [pdf_name],
             check=True,
-            cwd=tmpdir,
+            cwd=work_dir,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            text=True,
         )
-        logging.debug("pdftoppm stdout: %s", result.stdout)
-        logging.error("pdftoppm stderr: %s", result.stderr)
+    logging.error("pdftoppm stderr: %s", result.stderr.decode(errors="replace"))
 
-        # Rename the output file to the desired name
-        shutil.move(os.path.join(tmpdir, "output-1.png"), output_png)
+    # Shrink the image
+    image = _optimize(result.stdout, settings, work_dir)
+    logging.info("Converted LaTeX to PNG of %d bytes", len(image))
+    return image
 
-    logging.info("Converted LaTeX to PNG: %s", output_png)
+
+def latex_to_png(latex_snippet, output_png="output.png", profile=RENDER_PROFILE):
+    """
+    Convert a LaTeX snippet (string) into a cropped PNG file
+    Args:
+        latex_snippet (str): LaTeX code to render
+        output_png (str): Output PNG file path
+        profile (str): Name of the rendering profile from RENDER_PROFILES, the
+            "phone-webp" profile writes WebP to the same path
+    """
+    image = latex_to_bytes(latex_snippet, profile)
+    with open(output_png, "wb") as file:
+        file.write(image)
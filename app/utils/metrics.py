@@ -0,0 +1,367 @@
+" Histograms and counters exposed in the Prometheus text format on /metrics "
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+# Upper bounds in seconds, from a cached query up to a slow LaTeX render
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Upper bounds for the number of SQL statements of an update
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+# Upper bounds for the number of updates a user sends in a row
+BURST_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    """
+    Monotonic counter with labels
+
+    Args:
+        name (str): metric name
+        documentation (str): help text
+        labelnames (Sequence[str]): label names
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """
+        Increase the counter
+        Args:
+            amount (float): value to add
+            labels (str): label values
+        """
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def expose(self) -> List[str]:
+        """
+        Get the counter in the Prometheus text format
+        Returns:
+            List[str]: exposition lines
+        """
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+        ]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Gauge:
+    """
+    Value that goes up and down with labels, set directly or read from a
+    function when the metrics are exposed
+
+    Args:
+        name (str): metric name
+        documentation (str): help text
+        labelnames (Sequence[str]): label names
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._functions: Dict[LabelValues, Callable[[], float]] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def set(self, value: float, **labels: str) -> None:
+        """
+        Set the gauge
+        Args:
+            value (float): new value
+            labels (str): label values
+        """
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """
+        Increase the gauge
+        Args:
+            amount (float): value to add
+            labels (str): label values
+        """
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        """
+        Decrease the gauge
+        Args:
+            amount (float): value to subtract
+            labels (str): label values
+        """
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float], **labels: str) -> None:
+        """
+        Read the gauge from a function every time the metrics are exposed
+        Args:
+            function (Callable[[], float]): function returning the value
+            labels (str): label values
+        """
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._functions[key] = function
+
+    def expose(self) -> List[str]:
+        """
+        Get the gauge in the Prometheus text format
+        Returns:
+            List[str]: exposition lines
+        """
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} gauge",
+        ]
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+        # the functions are called outside of the lock, they may take their own
+        values.update((key, function()) for key, function in functions.items())
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """
+    Histogram with cumulative buckets and labels
+
+    Args:
+        name (str): metric name
+        documentation (str): help text
+        labelnames (Sequence[str]): label names
+        buckets (Sequence[float]): upper bounds of the buckets
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # bucket counts, sum and count by label values
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, **labels: str) -> None:
+        """
+        Record a value
+        Args:
+            value (float): observed value
+            labels (str): label values
+        """
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(
+                key, ([0] * (len(self.buckets) + 1), [0.0])
+            )
+            counts[index] += 1
+            total[0] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """
+        Record the duration of the block in seconds, also when it raises
+        Args:
+            labels (str): label values
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def expose(self) -> List[str]:
+        """
+        Get the histogram in the Prometheus text format
+        Returns:
+            List[str]: exposition lines
+        """
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        names = self.labelnames + ("le",)
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(float(bound))
+                    labels = _format_labels(names, key + (le,))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {total[0]}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+REGISTRY: List[Counter | Gauge | Histogram] = []
+
+
+def expose() -> str:
+    """
+    Get all the metrics in the Prometheus text format
+    Returns:
+        str: metrics page
+    """
+    return "\n".join(line for metric in REGISTRY for line in metric.expose()) + "\n"
+
+
+# Handlers
+HANDLER_SECONDS = Histogram(
+    "bot_handler_seconds", "Time spent in a handler", ["handler"]
+)
+HANDLER_ERRORS = Counter(
+    "bot_handler_errors_total", "Errors raised while handling updates", ["handler"]
+)
+HANDLER_STATEMENTS = Histogram(
+    "bot_handler_sql_statements",
+    "SQL statements executed by a handler for one update",
+    ["handler"],
+    buckets=STATEMENT_BUCKETS,
+)
+HANDLER_SQL_SECONDS = Histogram(
+    "bot_handler_sql_seconds",
+    "Time spent in SQL statements by a handler for one update",
+    ["handler"],
+)
+
+# Update processing
+UPDATES_ACTIVE = Gauge("bot_updates_active", "Updates being processed")
+UPDATES_QUEUED = Gauge(
+    "bot_updates_queued", "Updates accepted and not finished, processed or waiting"
+)
+USERS_QUEUED = Gauge("bot_users_queued", "Users with accepted and not finished updates")
+UPDATE_WAIT_SECONDS = Histogram(
+    "bot_update_wait_seconds",
+    "Time an update waited for the earlier updates of its user and a processing slot",
+)
+USER_BURST_UPDATES = Histogram(
+    "bot_user_burst_updates",
+    "Updates of a user processed in a row, until the user had none queued",
+    buckets=BURST_BUCKETS,
+)
+USER_BURST_MAX_WAIT_SECONDS = Histogram(
+    "bot_user_burst_max_wait_seconds",
+    "Longest wait of an update of a user in a row of updates",
+)
+
+# Database, rendering and Bot API
+SQL_SECONDS = Histogram("db_statement_seconds", "Time of a single SQL statement")
+RENDER_SECONDS = Histogram(
+    "render_phase_seconds", "Time of a LaTeX rendering phase", ["phase"]
+)
+RENDER_REQUESTS = Counter(
+    "render_requests_total",
+    "Requested images by outcome: cached, coalesced, rendered, failed to compile"
+    " or failed_cached for a snippet that failed recently",
+    ["result"],
+)
+RENDER_ROUTES = Counter(
+    "render_route_total",
+    "Rendered images by renderer: mathtext, latex or fallback from mathtext to latex",
+    ["renderer"],
+)
+BOT_API_SECONDS = Histogram(
+    "bot_api_request_seconds", "Round trip of a Bot API call", ["method"]
+)
+BOT_API_QUEUED = Gauge(
+    "bot_api_queued_requests", "Bot API calls waiting for the rate limiter", ["priority"]
+)
+BOT_API_WAIT_SECONDS = Histogram(
+    "bot_api_rate_limit_wait_seconds",
+    "Time a Bot API call waited for the rate limiter",
+    ["priority"],
+)
+BOT_API_FLOOD_ERRORS = Counter(
+    "bot_api_flood_errors_total", "Bot API calls failed with a flood error (429)", ["method"]
+)
+BOT_API_RETRIES = Counter(
+    "bot_api_retries_total", "Bot API calls retried after a flood error", ["method"]
+)
+BOT_API_CHAT_BUCKETS = Gauge(
+    "bot_api_chat_buckets", "Chats with a token bucket in the rate limiter"
+)
+
+
+class QueryStats:
+    """
+    Number and time of the SQL statements executed while handling an update
+    """
+
+    __slots__ = ("statements", "seconds", "_lock")
+
+    def __init__(self) -> None:
+        self.statements = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        """
+        Record an executed statement
+        Args:
+            seconds (float): statement time
+        """
+        with self._lock:
+            self.statements += 1
+            self.seconds += seconds
+
+
+# Set once the process has warmed up its caches, reported on /ready
+ready = threading.Event()
+
+
+# Set while a handler runs, copied into the threads it starts with asyncio.to_thread
+query_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def record_statement(seconds: float) -> None:
+    """
+    Record an executed SQL statement for the metrics and the current update
+    Args:
+        seconds (float): statement time
+    """
+    SQL_SECONDS.observe(seconds)
+    stats = query_stats.get()
+    if stats is not None:
+        stats.add(seconds)
@@ -0,0 +1,48 @@
+" HTTP server exposing the metrics and the readiness, imported only by processes that serve them "
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app.utils.metrics import expose, ready
+
+logger = logging.getLogger(__name__)
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        path = self.path.split("?")[0]
+        if path == "/metrics":
+            status, body = 200, expose()
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/ready":
+            # 503 until the warm-up is done, so that no traffic is routed here
+            status, body = (200, "ready\n") if ready.is_set() else (503, "warming up\n")
+            content_type = "text/plain; charset=utf-8"
+        else:
+            self.send_error(404)
+            return
+        body = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:  # pylint: disable=redefined-builtin
+        logger.debug("Metrics request: " + format, *args)
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """
+    Serve the metrics on http://host:port/metrics and the readiness on
+    http://host:port/ready from a background thread
+    Args:
+        port (int): port to listen on
+        host (str): address to listen on
+    Returns:
+        ThreadingHTTPServer: running server
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsRequestHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics", daemon=True)
+    thread.start()
+    logger.info("Serving metrics on port %s", port)
+    return server
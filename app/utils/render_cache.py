@@ -0,0 +1,200 @@
+" In-memory cache and single-flight rendering of the images of LaTeX snippets "
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+import subprocess
+from collections import OrderedDict
+from typing import Dict
+from app import config
+from app.utils.image_converter import latex_to_bytes
+from app.utils.fast_renderer import Unsupported, available, classify, mathtext_to_bytes
+from app.utils.metrics import RENDER_REQUESTS, RENDER_ROUTES
+
+logger = logging.getLogger(__name__)
+
+
+def render_snippet(latex_snippet: str) -> bytes:
+    """
+    Render a snippet with mathtext if the classifier allows it, else with
+    pdflatex. Snippets mathtext fails to parse fall back to pdflatex.
+    Args:
+        latex_snippet (str): LaTeX code
+    Returns:
+        bytes: PNG image
+    """
+    if config.MATHTEXT_FAST_PATH and available() and classify(latex_snippet) == "mathtext":
+        try:
+            image = mathtext_to_bytes(latex_snippet)
+            RENDER_ROUTES.inc(renderer="mathtext")
+            return image
+        except Unsupported as error:
+            logger.debug("Falling back to pdflatex: %s", error)
+            RENDER_ROUTES.inc(renderer="fallback")
+    else:
+        RENDER_ROUTES.inc(renderer="latex")
+    return latex_to_bytes(latex_snippet)
+
+
+def snippet_key(latex_snippet: str) -> str:
+    """
+    Get the cache key of a LaTeX snippet
+    Args:
+        latex_snippet (str): LaTeX code
+    Returns:
+        str: SHA-256 of the snippet
+    """
+    return hashlib.sha256(latex_snippet.encode()).hexdigest()
+
+
+class RenderCache:
+    """
+    Least recently used PNG images by the hash of their LaTeX snippet. Filled
+    by the renders of the bot and by the warm-up with the most served exercises.
+
+    Args:
+        max_items (int): images kept at most
+    """
+
+    def __init__(self, max_items: int = 256) -> None:
+        self.max_items = max_items
+        self._images: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._images)
+
+    def get(self, latex_snippet: str) -> bytes | None:
+        """
+        Get the image of a snippet if it was rendered
+        Args:
+            latex_snippet (str): LaTeX code
+        Returns:
+            bytes | None: PNG image, None if it is not cached
+        """
+        key = snippet_key(latex_snippet)
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+            return image
+
+    def put(self, latex_snippet: str, image: bytes) -> None:
+        """
+        Cache the image of a snippet
+        Args:
+            latex_snippet (str): LaTeX code
+            image (bytes): PNG image
+        """
+        key = snippet_key(latex_snippet)
+        with self._lock:
+            self._images[key] = image
+            self._images.move_to_end(key)
+            while len(self._images) > self.max_items:
+                self._images.popitem(last=False)
+
+    def render(self, latex_snippet: str) -> bytes:
+        """
+        Get the image of a snippet, rendering and caching it if needed
+        Args:
+            latex_snippet (str): LaTeX code
+        Returns:
+            bytes: PNG image
+        """
+        image = self.get(latex_snippet)
+        if image is not None:
+            return image
+        image = render_snippet(latex_snippet)
+        self.put(latex_snippet, image)
+        return image
+
+
+class RenderFailed(Exception):
+    """
+    Raised for a snippet that failed to compile a short time ago
+    """
+
+
+class SingleFlightRenderer:
+    """
+    Renders every snippet at most once at a time: concurrent requests of the
+    same snippet wait for the render started by the first one. Snippets that
+    fail to compile are not rendered again for `failure_ttl` seconds.
+
+    Args:
+        cache (RenderCache): cache of the rendered images
+        failure_ttl (float): seconds a failed snippet is not rendered again
+    """
+
+    def __init__(self, cache: RenderCache, failure_ttl: float = 300) -> None:
+        self.cache = cache
+        self.failure_ttl = failure_ttl
+        self._flights: Dict[str, asyncio.Future] = {}
+        self._failures: Dict[str, float] = {}
+
+    async def render(self, latex_snippet: str) -> bytes:
+        """
+        Get the image of a snippet from the cache, the running render or a new render
+        Args:
+            latex_snippet (str): LaTeX code
+        Returns:
+            bytes: PNG image
+        Raises:
+            RenderFailed: if the snippet failed to compile less than failure_ttl seconds ago
+        """
+        image = self.cache.get(latex_snippet)
+        if image is not None:
+            RENDER_REQUESTS.inc(result="cached")
+            return image
+
+        key = snippet_key(latex_snippet)
+        failed_until = self._failures.get(key)
+        if failed_until is not None:
+            if failed_until > time.monotonic():
+                RENDER_REQUESTS.inc(result="failed_cached")
+                raise RenderFailed(f"Snippet {key[:12]} failed to compile recently")
+            del self._failures[key]
+
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = asyncio.ensure_future(self._render(key, latex_snippet))
+            # the failure is retrieved even if every waiter was cancelled
+            flight.add_done_callback(lambda done: done.cancelled() or done.exception())
+            self._flights[key] = flight
+        else:
+            RENDER_REQUESTS.inc(result="coalesced")
+        # a cancelled waiter must not cancel the render the others wait for
+        return await asyncio.shield(flight)
+
+    async def _render(self, key: str, latex_snippet: str) -> bytes:
+        """
+        Render a snippet in a thread and remember if it fails to compile
+        Args:
+            key (str): hash of the snippet
+            latex_snippet (str): LaTeX code
+        Returns:
+            bytes: PNG image
+        """
+        try:
+            image = await asyncio.to_thread(self.cache.render, latex_snippet)
+        except subprocess.CalledProcessError:
+            logger.warning("Snippet %s failed to compile", key[:12])
+            RENDER_REQUESTS.inc(result="failed")
+            now = time.monotonic()
+            # snippets failing once and never asked again would stay forever
+            for expired in [failed for failed, until in self._failures.items() if until <= now]:
+                del self._failures[expired]
+            self._failures[key] = now + self.failure_ttl
+            raise
+        except Exception:
+            RENDER_REQUESTS.inc(result="failed")
+            raise
+        finally:
+            del self._flights[key]
+        RENDER_REQUESTS.inc(result="rendered")
+        return image
+
+
+rendered_images = RenderCache(config.RENDER_CACHE_SIZE)
+renderer = SingleFlightRenderer(rendered_images, config.RENDER_FAILURE_TTL)
@@ -0,0 +1,104 @@
+"""
+Check with EXPLAIN QUERY PLAN that the hot lookups use their indexes.
+
+Upgrades the SQLite database from DB_URL to the latest schema, then asserts
+that the plan of each lookup done while handling updates searches an index
+instead of scanning the table. Exits with status 1 if one of them does not:
+
+    DB_URL=sqlite:///load.db python -m benchmarks.check_indexes
+"""
+import sys
+from typing import List
+from sqlalchemy import text
+from app.database.migrations import upgrade
+from app.database.queries.utils import engine
+
+# Lookup, query and the index its plan has to use
+CHECKS = [
+    (
+        "user by telegram id",
+        "SELECT * FROM users WHERE telegram_id = '1'",
+        "ix_users_telegram_id",
+    ),
+    (
+        "solved exercises of a user",
+        "SELECT exercise_id FROM solved_exercises WHERE user_id = 1",
+        "ix_solved_exercises_user_id_exercise_id",
+    ),
+    (
+        "unsolved exercises of a user",
+        "SELECT id FROM exercises WHERE id NOT IN "
+        "(SELECT exercise_id FROM solved_exercises WHERE user_id = 1)",
+        "ix_solved_exercises_user_id_exercise_id",
+    ),
+    (
+        "selected paragraph of a user",
+        "SELECT * FROM selected_paragraphs WHERE user_id = 1 AND paragraph_id = 1",
+        "ix_selected_paragraphs_user_id_paragraph_id",
+    ),
+    (
+        "exercises of a paragraph",
+        "SELECT * FROM exercises WHERE paragraph_id = 1",
+        "ix_exercises_paragraph_id",
+    ),
+    (
+        "top users by score",
+        "SELECT * FROM users ORDER BY score DESC LIMIT 5",
+        "ix_users_score",
+    ),
+    (
+        "due reviews of a user",
+        "SELECT exercise_id FROM reviews WHERE user_id = 1 AND due_at <= '2026-01-01' "
+        "ORDER BY due_at LIMIT 1",
+        "ix_reviews_user_id_due_at",
+    ),
+    (
+        "elements of a subsection by type",
+        "SELECT * FROM elements WHERE subsection_id = 1 AND type_id = 1",
+        # index of the _element_subsection_type_number_uc unique constraint
+        "sqlite_autoindex_elements_",
+    ),
+]
+
+
+def check() -> List[str]:
+    """
+    Print the plan of every lookup and find the lookups not using their index
+    Returns:
+        List[str]: failed lookups
+    """
+    failed = []
+    with engine.connect() as connection:
+        tables = set(
+            connection.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'table'")
+            ).scalars()
+        )
+        for name, query, index in CHECKS:
+            table = query.split(" FROM ")[1].split()[0]
+            if table not in tables:
+                print(f"SKIP {name}: no table {table}")
+                continue
+            plan = " | ".join(
+                row[-1]
+                for row in connection.execute(text(f"EXPLAIN QUERY PLAN {query}"))
+            )
+            ok = index in plan
+            if not ok:
+                failed.append(name)
+            print(f"{'OK  ' if ok else 'FAIL'} {name}: {plan}")
+    return failed
+
+
+def main() -> None:
+    if engine.dialect.name != "sqlite":
+        sys.exit("The index check reads SQLite query plans, DB_URL is not SQLite")
+    upgrade(engine)
+    failed = check()
+    if failed:
+        print(f"Lookups not using their index: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
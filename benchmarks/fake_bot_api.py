@@ -0,0 +1,229 @@
+" A local fake of the Telegram Bot API and helpers to build synthetic updates "
+import json
+import time
+import asyncio
+import datetime
+import itertools
+from collections import Counter, defaultdict, deque
+from typing import Any, Dict, List, Tuple
+from telegram import Update
+from telegram.request import BaseRequest, RequestData
+
+BOT_ID = 1
+BOT_TOKEN = f"{BOT_ID}:FAKE-TOKEN"
+
+
+class FakeBotAPI(BaseRequest):
+    """
+    In-process replacement of the Bot API server. Answers every call with a
+    plausible result after `latency` seconds and records the calls made.
+    With flood limits set, calls above the limits within a second are answered
+    with 429 errors like the real Bot API does.
+
+    Args:
+        latency (float): simulated round trip time of a single call in seconds
+        overall_limit (int | None): calls per second allowed for the bot
+        chat_limit (int | None): calls per second allowed for a chat
+        retry_after (int): `retry_after` returned with the 429 errors
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        overall_limit: int | None = None,
+        chat_limit: int | None = None,
+        retry_after: int = 1,
+    ) -> None:
+        self.latency = latency
+        self.overall_limit = overall_limit
+        self.chat_limit = chat_limit
+        self.retry_after = retry_after
+        self.calls: List[Tuple[float, str, Dict[str, Any]]] = []
+        self.flood_errors = 0
+        self._message_ids = itertools.count(1)
+        self._windows: Dict[Any, deque] = defaultdict(deque)
+
+    @property
+    def read_timeout(self) -> float | None:
+        return 5.0
+
+    async def initialize(self) -> None:
+        """Nothing to initialize"""
+
+    async def shutdown(self) -> None:
+        """Nothing to shut down"""
+
+    def reset(self) -> None:
+        """
+        Forget recorded calls
+        """
+        self.calls = []
+        self.flood_errors = 0
+
+    def count(self) -> Counter:
+        """
+        Count recorded calls by Bot API method
+        Returns:
+            Counter: number of calls of each method
+        """
+        return Counter(method for _, method, _ in self.calls)
+
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        request_data: RequestData | None = None,
+        read_timeout: Any = None,
+        write_timeout: Any = None,
+        connect_timeout: Any = None,
+        pool_timeout: Any = None,
+    ) -> Tuple[int, bytes]:
+        api_method = url.rsplit("/", 1)[-1]
+        parameters = request_data.parameters if request_data else {}
+        self.calls.append((time.perf_counter(), api_method, parameters))
+        await asyncio.sleep(self.latency)
+        if self._flooded(parameters.get("chat_id")):
+            self.flood_errors += 1
+            status, body = 429, {
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {self.retry_after}",
+                "parameters": {"retry_after": self.retry_after},
+            }
+        else:
+            status, body = self.respond(api_method, parameters)
+        return status, json.dumps(body).encode()
+
+    def _flooded(self, chat_id: Any) -> bool:
+        """
+        Check the call against the flood limits over the last second
+        Args:
+            chat_id (Any): chat the call is made to
+        Returns:
+            bool: True if the call exceeds a limit
+        """
+        now = time.monotonic()
+        limits = [(None, self.overall_limit)]
+        if chat_id is not None:
+            limits.append((chat_id, self.chat_limit))
+        flooded = False
+        for key, limit in limits:
+            window = self._windows[key]
+            while window and window[0] <= now - 1:
+                window.popleft()
+            flooded = flooded or (limit is not None and len(window) >= limit)
+        if not flooded:
+            for key, _ in limits:
+                self._windows[key].append(now)
+        return flooded
+
+    def respond(self, method: str, parameters: Dict[str, Any]) -> Tuple[int, Dict]:
+        """
+        Build the response to a Bot API call
+        Args:
+            method (str): Bot API method
+            parameters (Dict[str, Any]): call parameters
+        Returns:
+            Tuple[int, Dict]: HTTP status and response body
+        """
+        if method == "getMe":
+            result = {
+                "id": BOT_ID,
+                "is_bot": True,
+                "first_name": "Probability bot",
+                "username": "probability_bot",
+            }
+        elif method in ("sendMessage", "sendPhoto", "editMessageText"):
+            result = self._message(method, parameters)
+        else:
+            result = True
+        return 200, {"ok": True, "result": result}
+
+    def _message(self, method: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build a message sent by the bot
+        Args:
+            method (str): Bot API method
+            parameters (Dict[str, Any]): call parameters
+        Returns:
+            Dict[str, Any]: message dictionary
+        """
+        message = {
+            "message_id": parameters.get("message_id") or next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": parameters.get("chat_id", 0), "type": "private"},
+            "from": {"id": BOT_ID, "is_bot": True, "first_name": "Probability bot"},
+        }
+        if method == "sendPhoto":
+            message["photo"] = [
+                {"file_id": "photo", "file_unique_id": "photo", "width": 1, "height": 1}
+            ]
+            message["caption"] = parameters.get("caption", "")
+        else:
+            message["text"] = parameters.get("text", "")
+        return message
+
+
+_update_ids = itertools.count(1)
+
+
+def _user(user_id: int) -> Dict[str, Any]:
+    return {
+        "id": user_id,
+        "is_bot": False,
+        "first_name": f"User{user_id}",
+        "username": f"user{user_id}",
+    }
+
+
+def message_update(bot, user_id: int, text: str) -> Update:
+    """
+    Build an update with a private text message from the user
+    Args:
+        bot (Bot): bot the update is delivered to
+        user_id (int): Telegram's user id
+        text (str): message text, commands start with "/"
+    Returns:
+        Update: Telegram update
+    """
+    message = {
+        "message_id": next(_update_ids),
+        "date": int(datetime.datetime.now().timestamp()),
+        "chat": {"id": user_id, "type": "private"},
+        "from": _user(user_id),
+        "text": text,
+    }
+    if text.startswith("/"):
+        message["entities"] = [
+            {"type": "bot_command", "offset": 0, "length": len(text.split()[0])}
+        ]
+    return Update.de_json({"update_id": next(_update_ids), "message": message}, bot)
+
+
+def callback_update(bot, user_id: int, data: str, message_id: int = 1) -> Update:
+    """
+    Build an update with an inline keyboard button press
+    Args:
+        bot (Bot): bot the update is delivered to
+        user_id (int): Telegram's user id
+        data (str): callback data of the pressed button
+        message_id (int): id of the message with the keyboard
+    Returns:
+        Update: Telegram update
+    """
+    callback_query = {
+        "id": str(next(_update_ids)),
+        "from": _user(user_id),
+        "chat_instance": str(user_id),
+        "data": data,
+        "message": {
+            "message_id": message_id,
+            "date": int(datetime.datetime.now().timestamp()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": BOT_ID, "is_bot": True, "first_name": "Probability bot"},
+            "text": "Here is a list of sections. Choose carefully.",
+        },
+    }
+    return Update.de_json(
+        {"update_id": next(_update_ids), "callback_query": callback_query}, bot
+    )
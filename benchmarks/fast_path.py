@@ -0,0 +1,101 @@
+"""
+Report how much of the catalog the mathtext fast path renders and the time it saves.
+
+Classifies every exercise and solution of the database from DB_URL, then
+renders a random --sample of the snippets routed to mathtext with both
+renderers. Snippets mathtext fails to parse are counted as fallbacks. The
+pdflatex timings are skipped if pdflatex is not installed:
+
+    python -m benchmarks.fast_path --sample 100
+"""
+import time
+import random
+import shutil
+import argparse
+import statistics
+from typing import Dict, List
+from sqlalchemy import text
+from app.database.queries.utils import engine
+from app.utils.fast_renderer import Unsupported, classify, mathtext_to_bytes
+from app.utils.image_converter import latex_to_bytes
+
+TABLES = ["exercises", "solutions"]
+
+
+def load_snippets() -> Dict[str, List[str]]:
+    """
+    Get the LaTeX of the exercises and the solutions
+    Returns:
+        Dict[str, List[str]]: contents by table
+    """
+    with engine.connect() as connection:
+        return {
+            table: list(connection.execute(text(f"SELECT contents FROM {table}")).scalars())
+            for table in TABLES
+        }
+
+
+def timed(render, latex_snippet: str) -> float:
+    """
+    Render a snippet
+    Args:
+        render (Callable): latex_to_bytes or mathtext_to_bytes
+        latex_snippet (str): LaTeX code
+    Returns:
+        float: seconds of the render
+    """
+    started = time.perf_counter()
+    render(latex_snippet)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sample", type=int, default=100)
+    args = parser.parse_args()
+
+    snippets = load_snippets()
+    print(f"{'table':<12}{'snippets':>10}{'mathtext':>10}{'share':>8}")
+    fast = []
+    total = 0
+    for table, contents in snippets.items():
+        routed = [snippet for snippet in contents if classify(snippet) == "mathtext"]
+        fast.extend(routed)
+        total += len(contents)
+        share = len(routed) / len(contents) if contents else 0
+        print(f"{table:<12}{len(contents):>10}{len(routed):>10}{share:>8.1%}")
+    share = len(fast) / total if total else 0
+    print(f"{'total':<12}{total:>10}{len(fast):>10}{share:>8.1%}\n")
+
+    sample = random.Random(0).sample(fast, min(args.sample, len(fast)))
+    with_latex = shutil.which("pdflatex") is not None
+    mathtext_seconds, latex_seconds, fallbacks = [], [], 0
+    for snippet in sample:
+        try:
+            mathtext_seconds.append(timed(mathtext_to_bytes, snippet))
+        except Unsupported:
+            fallbacks += 1
+            continue
+        if with_latex:
+            latex_seconds.append(timed(latex_to_bytes, snippet))
+
+    if not mathtext_seconds:
+        print("No snippet was rendered with mathtext")
+        return
+    mathtext_ms = 1000 * statistics.median(mathtext_seconds)
+    print(f"Rendered {len(sample)} snippets, {fallbacks} fell back to pdflatex")
+    print(f"mathtext median: {mathtext_ms:.1f} ms")
+    if latex_seconds:
+        latex_ms = 1000 * statistics.median(latex_seconds)
+        saved_ms = latex_ms - mathtext_ms
+        # the share of the catalog that really stays on the fast path
+        fast_share = share * (1 - fallbacks / len(sample))
+        print(f"pdflatex median: {latex_ms:.1f} ms")
+        print(f"Saved per fast-path render: {saved_ms:.1f} ms")
+        print(f"Saved per render over the catalog: {fast_share * saved_ms:.1f} ms")
+    else:
+        print("pdflatex is not installed, the saved time is not measured")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Burst many users' replies against the fake Bot API with flood limits.
+
+Every user gets the replies of /challenge (a chat action and a photo) at the
+same moment, while a broadcast message goes out to a share of the users. The
+fake API answers calls above its limits with 429 errors. Compare runs with and
+without the rate limiter:
+
+    python -m benchmarks.flood_control --users 200
+    python -m benchmarks.flood_control --users 200 --no-limiter
+"""
+import time
+import asyncio
+import argparse
+import statistics
+from typing import Dict, List
+from telegram.error import RetryAfter
+from telegram.ext import ExtBot
+from app.telegram_bot.rate_limiter import TokenBucketRateLimiter
+from benchmarks.fake_bot_api import FakeBotAPI, BOT_TOKEN
+
+PHOTO = b"\x89PNG\r\n\x1a\n"
+
+
+async def reply(bot: ExtBot, chat_id: int, results: Dict[str, List]) -> None:
+    """
+    Send the replies of /challenge to the chat
+    """
+    start = time.perf_counter()
+    try:
+        await bot.send_chat_action(chat_id, "upload_photo")
+        await bot.send_photo(chat_id, PHOTO, caption="#trial1")
+        results["interactive"].append(time.perf_counter() - start)
+    except RetryAfter:
+        results["failed"].append(chat_id)
+
+
+async def broadcast(bot: ExtBot, chat_id: int, results: Dict[str, List]) -> None:
+    """
+    Send a broadcast message to the chat
+    """
+    start = time.perf_counter()
+    kwargs = {"rate_limit_args": {"priority": "broadcast"}} if bot.rate_limiter else {}
+    try:
+        await bot.send_message(chat_id, "A new trial has arrived", **kwargs)
+        results["broadcast"].append(time.perf_counter() - start)
+    except RetryAfter:
+        results["failed"].append(chat_id)
+
+
+def _report(name: str, seconds: List[float]) -> str:
+    if not seconds:
+        return f"{name:<12} no calls succeeded"
+    seconds = sorted(seconds)
+    p95 = seconds[int(0.95 * (len(seconds) - 1))]
+    return (
+        f"{name:<12} n={len(seconds):<6} median={statistics.median(seconds):.2f}s "
+        f"p95={p95:.2f}s max={seconds[-1]:.2f}s"
+    )
+
+
+async def run(users: int, broadcast_share: float, limiter: bool) -> None:
+    """
+    Send the burst and print the results
+    Args:
+        users (int): number of users replied to at once
+        broadcast_share (float): share of the users that also get a broadcast
+        limiter (bool): use the token bucket rate limiter
+    """
+    api = FakeBotAPI(latency=0.05, overall_limit=30, chat_limit=3, retry_after=1)
+    rate_limiter = TokenBucketRateLimiter() if limiter else None
+    bot = ExtBot(BOT_TOKEN, request=api, rate_limiter=rate_limiter)
+    results = {"interactive": [], "broadcast": [], "failed": []}
+    async with bot:
+        api.reset()
+        start = time.perf_counter()
+        await asyncio.gather(
+            *[broadcast(bot, chat_id, results) for chat_id in range(1, int(users * broadcast_share) + 1)],
+            *[reply(bot, chat_id, results) for chat_id in range(1, users + 1)],
+        )
+        elapsed = time.perf_counter() - start
+
+    print(f"rate limiter: {'on' if limiter else 'off'}, total {elapsed:.2f}s")
+    print(_report("interactive", results["interactive"]))
+    print(_report("broadcast", results["broadcast"]))
+    print(f"failed calls: {len(results['failed'])}, 429 responses: {api.flood_errors}")
+    if rate_limiter:
+        print(f"limiter metrics: {rate_limiter.metrics()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--broadcast-share", type=float, default=0.5)
+    parser.add_argument("--no-limiter", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(run(args.users, args.broadcast_share, not args.no_limiter))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+"""
+Fill the database with a synthetic catalog and synthetic users for scale testing.
+
+Creates sections, paragraphs, exercises with solutions, users, solved
+exercises and selected paragraphs in the database from DB_URL, together with
+the book elements the search and related theory are built from. Activity is
+skewed like in a real bot: the number of solved exercises per user follows a
+power law, so a few heavy users solve most of the catalog while most users
+solve a handful, and earlier exercises are solved more often than later ones.
+Rows are bulk inserted with the driver's executemany in large chunks:
+
+    DB_URL=sqlite:///load.db python -m benchmarks.generate_data --reset \\
+        --users 20000 --solved 1000000
+"""
+import time
+import random
+import logging
+import argparse
+import itertools
+from collections import Counter
+from bisect import bisect_left
+from typing import Iterable, Iterator, List, Sequence, Tuple
+from sqlalchemy import Table
+from sqlalchemy.engine import Connection
+from app import config
+from app.database.models import (
+    Base,
+    Section,
+    Paragraph,
+    Exercise,
+    Solution,
+    User,
+    SolvedExercise,
+    SelectedParagraph,
+    Subsection,
+    ElementTypes,
+    Element,
+    ElementLinks,
+)
+from app.database.queries.utils import engine
+from app.database.queries.catalog import bump_catalog_version
+from app.database.queries.search import create_search_index, rebuild_search_index
+from app.database.queries.related import compute_related_elements
+
+logger = logging.getLogger(__name__)
+
+# Telegram ids of the synthetic users start here, the load test uses the same ids
+TELEGRAM_ID_START = 1_000_000
+
+CHUNK_SIZE = 50_000
+
+EXERCISE_TEMPLATE = (
+    r"Let $X_1, \dots, X_{%d}$ be i.i.d. random variables with $P(X_i = 1) = p$."
+    r" Find the distribution of $S = \sum_{i=1}^{%d} X_i$."
+)
+SOLUTION_TEMPLATE = r"$S \sim \mathrm{Bin}(%d, p)$, so $P(S = k) = \binom{%d}{k} p^k (1-p)^{%d-k}$."
+
+# Subsection titles cycle through the topics so that searches match a share of the book
+TOPICS = [
+    "Conditional probability",
+    "Independent events",
+    "Random variables",
+    "Expectation",
+    "Variance",
+    "Binomial distribution",
+    "Poisson distribution",
+    "Normal distribution",
+    "Generating functions",
+    "Markov chains",
+    "Law of large numbers",
+    "Central limit theorem",
+]
+
+ELEMENT_TYPES = ["definition", "theorem", "example", "exercise", "solution"]
+
+# Theory elements of every subsection, they refer to each other like the book does
+THEORY_TEMPLATES = [
+    ("definition", r"The {topic} of a random variable $X$ is defined on $\Omega$."),
+    ("theorem", "By Definition {label}.1 the {topic} of independent variables is additive."),
+    ("theorem", "Theorem {label}.1 gives the {topic} of the sum $S$ of i.i.d. variables."),
+    ("example", "Theorem {label}.2 gives the {topic} of the number of heads in $n$ tosses."),
+]
+
+
+def _chunks(rows: Iterable[Tuple], size: int = CHUNK_SIZE) -> Iterator[List[Tuple]]:
+    iterator = iter(rows)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def bulk_insert(
+    connection: Connection, table: Table, columns: Sequence[str], rows: Iterable[Tuple]
+) -> int:
+    """
+    Insert rows with the driver's executemany, bypassing the ORM
+    Args:
+        connection (Connection): database connection inside a transaction
+        table (Table): table to insert into
+        columns (Sequence[str]): column names in the order of the row values
+        rows (Iterable[Tuple]): row values
+    Returns:
+        int: number of inserted rows
+    """
+    placeholder = "?" if connection.dialect.paramstyle == "qmark" else "%s"
+    statement = (
+        f"INSERT INTO {table.name} ({', '.join(columns)}) "
+        f"VALUES ({', '.join([placeholder] * len(columns))})"
+    )
+    count = 0
+    for chunk in _chunks(rows):
+        connection.exec_driver_sql(statement, chunk)
+        count += len(chunk)
+    return count
+
+
+def power_law(count: int, alpha: float) -> List[float]:
+    """
+    Get cumulative weights that fall off like rank ** -alpha
+    Args:
+        count (int): number of items
+        alpha (float): exponent, larger values make the distribution more skewed
+    Returns:
+        List[float]: cumulative weights
+    """
+    return list(itertools.accumulate(rank**-alpha for rank in range(1, count + 1)))
+
+
+def solves_per_user(
+    users: int, solved: int, exercises: int, alpha: float, rng: random.Random
+) -> List[int]:
+    """
+    Split the solved exercises between the users, a few users get most of them
+    Args:
+        users (int): number of users
+        solved (int): total number of solved exercises
+        exercises (int): number of exercises, no user solves more
+        alpha (float): power law exponent
+        rng (random.Random): random generator
+    Returns:
+        List[int]: number of solved exercises of each user
+    """
+    solved = min(solved, users * exercises)
+    weights = [rank**-alpha for rank in range(1, users + 1)]
+    rng.shuffle(weights)
+    total = sum(weights)
+    counts = [min(exercises, int(solved * weight / total)) for weight in weights]
+
+    # hand out what is left after rounding and capping to the users with room
+    missing = solved - sum(counts)
+    while missing > 0:
+        for user in rng.sample(range(users), users):
+            if missing == 0:
+                break
+            if counts[user] < exercises:
+                counts[user] += 1
+                missing -= 1
+    return counts
+
+
+def solved_exercise_ids(
+    count: int, exercises: int, popularity: List[float], rng: random.Random
+) -> List[int]:
+    """
+    Pick distinct exercises solved by a user, popular exercises more often
+    Args:
+        count (int): number of solved exercises
+        exercises (int): number of exercises
+        popularity (List[float]): cumulative weights of the exercises
+        rng (random.Random): random generator
+    Returns:
+        List[int]: exercise ids
+    """
+    if count > exercises // 2:
+        return [index + 1 for index in rng.sample(range(exercises), count)]
+    chosen = set()
+    total = popularity[-1]
+    while len(chosen) < count:
+        chosen.add(bisect_left(popularity, rng.random() * total) + 1)
+    return list(chosen)
+
+
+def book_elements(
+    paragraph_rows: List[Tuple], exercises: int
+) -> Tuple[List[Tuple], List[Tuple[int, int]]]:
+    """
+    Build the theory, exercise and solution elements of every subsection and their links
+    Args:
+        paragraph_rows (List[Tuple]): id, section id, number and title of the paragraphs
+        exercises (int): exercises per paragraph
+    Returns:
+        Tuple[List[Tuple], List[Tuple[int, int]]]: element rows and links between element ids
+    """
+    type_ids = {name: type_id for type_id, name in enumerate(ELEMENT_TYPES, start=1)}
+    element_rows = []
+    link_rows = []
+    for subsection_id, section, number, title, _ in paragraph_rows:
+        topic = title.rsplit(" ", 1)[0].lower()
+        label = f"{section}.{number}"
+        numbers = Counter()
+        for name, template in THEORY_TEMPLATES:
+            numbers[name] += 1
+            content = template.format(topic=topic, label=label)
+            element_rows.append(
+                (len(element_rows) + 1, subsection_id, type_ids[name], numbers[name], content)
+            )
+        definition_id = len(element_rows) - len(THEORY_TEMPLATES) + 1
+        # exercise i of the catalog is exercise element number i of its subsection
+        for exercise in range(1, exercises + 1):
+            i = (subsection_id - 1) * exercises + exercise
+            content = EXERCISE_TEMPLATE % (i, i) + f" Use Theorem {label}.{1 + i % 2}."
+            element_rows.append(
+                (len(element_rows) + 1, subsection_id, type_ids["exercise"], exercise, content)
+            )
+            link_rows.append((len(element_rows), definition_id))
+            element_rows.append(
+                (
+                    len(element_rows) + 1,
+                    subsection_id,
+                    type_ids["solution"],
+                    exercise,
+                    SOLUTION_TEMPLATE % (i, i, i),
+                )
+            )
+    return element_rows, link_rows
+
+
+def generate(
+    sections: int,
+    paragraphs: int,
+    exercises: int,
+    users: int,
+    solved: int,
+    selecting_share: float,
+    alpha: float,
+    seed: int,
+) -> None:
+    """
+    Insert the synthetic catalog and users in a single transaction
+    Args:
+        sections (int): number of sections
+        paragraphs (int): paragraphs per section
+        exercises (int): exercises per paragraph
+        users (int): number of users
+        solved (int): total number of solved exercises
+        selecting_share (float): share of users that select paragraphs
+        alpha (float): power law exponent of user activity and exercise popularity
+        seed (int): random seed
+    """
+    rng = random.Random(seed)
+    paragraph_count = sections * paragraphs
+    exercise_count = paragraph_count * exercises
+    counts = solves_per_user(users, solved, exercise_count, alpha, rng)
+    popularity = power_law(exercise_count, alpha / 2)
+
+    solved_rows: List[Tuple[int, int]] = []
+    scores = []
+    for user, count in enumerate(counts, start=1):
+        exercise_ids = solved_exercise_ids(count, exercise_count, popularity, rng)
+        solved_rows.extend((user, exercise_id) for exercise_id in exercise_ids)
+        scores.append(sum(1 + exercise_id % 3 for exercise_id in exercise_ids))
+
+    selecting = set(rng.sample(range(1, users + 1), int(users * selecting_share)))
+    selected_rows = []
+    for user in sorted(selecting):
+        # users select a few paragraphs of a single section
+        section = rng.randrange(sections)
+        for number in rng.sample(range(1, paragraphs + 1), rng.randint(1, paragraphs)):
+            selected_rows.append((user, section * paragraphs + number))
+
+    user_rows = (
+        (
+            user,
+            str(TELEGRAM_ID_START + user - 1),
+            f"User{user}",
+            f"user{user}" if user % 4 else None,
+            scores[user - 1],
+            rng.randint(1, exercise_count),
+            user in selecting,
+        )
+        for user in range(1, users + 1)
+    )
+
+    section_rows = [(i, i, f"Section {i}") for i in range(1, sections + 1)]
+    # paragraph i and subsection i have the same section, number and title
+    paragraph_rows = []
+    for section in range(1, sections + 1):
+        for number in range(1, paragraphs + 1):
+            i = (section - 1) * paragraphs + number
+            title = f"{TOPICS[(i - 1) % len(TOPICS)]} {section}.{number}"
+            paragraph_rows.append((i, section, number, title, ""))
+    subsection_rows = [row[:4] for row in paragraph_rows]
+    # exercise i is in paragraph (i - 1) // exercises + 1 and has solution i
+    solution_rows = (
+        (i, (i - 1) // exercises + 1, (i - 1) % exercises + 1, SOLUTION_TEMPLATE % (i, i, i))
+        for i in range(1, exercise_count + 1)
+    )
+    exercise_rows = (
+        (
+            i,
+            (i - 1) // exercises + 1,
+            (i - 1) % exercises + 1,
+            EXERCISE_TEMPLATE % (i, i),
+            i,
+            1 + i % 3,
+        )
+        for i in range(1, exercise_count + 1)
+    )
+
+    element_rows, link_rows = book_elements(paragraph_rows, exercises)
+
+    inserts = [
+        (Section, ("id", "number", "title"), section_rows),
+        (Paragraph, ("id", "section_id", "number", "title", "contents"), paragraph_rows),
+        (Subsection, ("id", "section_id", "number", "title"), subsection_rows),
+        (ElementTypes, ("id", "name"), list(enumerate(ELEMENT_TYPES, start=1))),
+        (Element, ("id", "subsection_id", "type_id", "number", "content"), element_rows),
+        (ElementLinks, ("source_element_id", "target_element_id"), link_rows),
+        (Solution, ("id", "paragraph_id", "number", "contents"), solution_rows),
+        (
+            Exercise,
+            ("id", "paragraph_id", "number", "contents", "solution_id", "score"),
+            exercise_rows,
+        ),
+        (
+            User,
+            (
+                "id",
+                "telegram_id",
+                "first_name",
+                "username",
+                "score",
+                "last_trial_id",
+                "select_paragraphs",
+            ),
+            user_rows,
+        ),
+        (SolvedExercise, ("user_id", "exercise_id"), solved_rows),
+        (SelectedParagraph, ("user_id", "paragraph_id"), selected_rows),
+    ]
+    with engine.begin() as connection:
+        if connection.dialect.name == "sqlite":
+            # the data is thrown away on a crash, so skip the fsyncs
+            connection.exec_driver_sql("PRAGMA synchronous = OFF")
+        for model, columns, rows in inserts:
+            start = time.perf_counter()
+            count = bulk_insert(connection, model.__table__, columns, rows)
+            logger.info(
+                "Inserted %d rows into %s in %.2fs",
+                count,
+                model.__tablename__,
+                time.perf_counter() - start,
+            )
+        if connection.dialect.name == "sqlite":
+            create_search_index(connection)
+            rebuild_search_index(connection)
+    compute_related_elements(engine, config.RELATED_TOP_K)
+    bump_catalog_version(engine)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sections", type=int, default=12)
+    parser.add_argument("--paragraphs", type=int, default=10, help="per section")
+    parser.add_argument("--exercises", type=int, default=30, help="per paragraph")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--solved", type=int, default=100_000)
+    parser.add_argument("--selecting-share", type=float, default=0.2)
+    parser.add_argument("--alpha", type=float, default=1.2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reset", action="store_true", help="drop all tables first")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.reset:
+        Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    start = time.perf_counter()
+    generate(
+        args.sections,
+        args.paragraphs,
+        args.exercises,
+        args.users,
+        args.solved,
+        args.selecting_share,
+        args.alpha,
+        args.seed,
+    )
+    logger.info("Generated the database in %.2fs", time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Replay synthetic users through the bot flows and report latency percentiles.
+
+Builds the application with all the handlers, the per-user update processor
+and the database persistence against the fake Bot API, then drives many
+synthetic users concurrently through /start, /challenge, "Next trial",
+"Give me the answer!", "Solved it!", /select toggles, /score and
+/leaderboard. DB_URL has to point to a populated database, which is
+modified by the run. The synthetic users are the users created by
+benchmarks.generate_data. Without pdflatex the exercise images are not
+rendered:
+
+    DB_URL=sqlite:///load.db python -m benchmarks.generate_data --reset
+    DB_URL=sqlite:///load.db python -m benchmarks.load_test --users 2000
+
+Exits with status 1 if a flow's p95 latency exceeds --max-p95, so the run
+can be used as a gate before deploying.
+"""
+import sys
+import time
+import random
+import shutil
+import asyncio
+import argparse
+from collections import defaultdict
+from typing import Dict, List
+from telegram import Update
+from telegram.ext import Application, CallbackContext
+from app.database.queries.queries import get_sections, get_section_paragraphs
+from app.telegram_bot.application import add_handlers
+from app.telegram_bot.persistence import DatabasePersistence
+from app.telegram_bot.update_processor import PerUserUpdateProcessor
+from benchmarks.generate_data import TELEGRAM_ID_START
+from benchmarks.fake_bot_api import (
+    FakeBotAPI,
+    BOT_TOKEN,
+    message_update,
+    callback_update,
+)
+
+PNG = b"\x89PNG\r\n\x1a\n"
+
+# Flows and how often a user picks them after /start and /challenge
+FLOW_WEIGHTS = {
+    "next": 30,
+    "answer": 20,
+    "solve": 20,
+    "select": 10,
+    "score": 10,
+    "leaderboard": 10,
+}
+
+
+def _percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class LoadTest:
+    """
+    Synthetic users driving the application
+
+    Args:
+        application (Application): initialized application with all the handlers
+        sections (Dict[int, List[int]]): paragraph ids by section id
+    """
+
+    def __init__(self, application: Application, sections: Dict[int, List[int]]) -> None:
+        self.application = application
+        self.sections = sections
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.updates = 0
+        self.failed = 0
+        self.elapsed = 0.0
+
+    async def _send(self, update: Update) -> None:
+        """
+        Process the update through the update processor, like updates received by polling
+        Args:
+            update (Update): Telegram update
+        """
+        self.updates += 1
+        await self.application.update_processor.process_update(
+            update, self.application.process_update(update)
+        )
+
+    async def count_error(self, update: object, context: CallbackContext) -> None:
+        """
+        Error handler counting the updates that failed
+        """
+        self.failed += 1
+
+    async def _flow(self, name: str, user_id: int, rng: random.Random) -> None:
+        """
+        Run a flow for the user and record its latency
+        Args:
+            name (str): flow name
+            user_id (int): Telegram's user id
+            rng (random.Random): random generator of the user
+        """
+        bot = self.application.bot
+        start = time.perf_counter()
+        match name:
+            case "start":
+                await self._send(message_update(bot, user_id, "/start"))
+            case "challenge":
+                await self._send(message_update(bot, user_id, "/challenge"))
+            case "next":
+                await self._send(message_update(bot, user_id, "Next trial"))
+            case "answer":
+                await self._send(message_update(bot, user_id, "Give me the answer!"))
+            case "solve":
+                await self._send(message_update(bot, user_id, "Give me the answer!"))
+                await self._send(message_update(bot, user_id, "Solved it!"))
+                await self._send(message_update(bot, user_id, "Next trial"))
+            case "select":
+                section_id = rng.choice(list(self.sections))
+                await self._send(message_update(bot, user_id, "/select"))
+                # toggle a whole section, then a paragraph of it
+                await self._send(callback_update(bot, user_id, str(section_id)))
+                await self._send(callback_update(bot, user_id, str(-section_id)))
+                paragraphs = self.sections[section_id]
+                if paragraphs:
+                    await self._send(
+                        callback_update(bot, user_id, str(rng.choice(paragraphs)))
+                    )
+                await self._send(callback_update(bot, user_id, "DONE"))
+                await self._send(message_update(bot, user_id, "/challenge"))
+            case "score":
+                await self._send(message_update(bot, user_id, "/score"))
+            case "leaderboard":
+                await self._send(message_update(bot, user_id, "/leaderboard"))
+        self.latencies[name].append(time.perf_counter() - start)
+
+    async def user(self, user_id: int, flows: int, seed: int) -> None:
+        """
+        Run a session of a synthetic user
+        Args:
+            user_id (int): Telegram's user id
+            flows (int): number of flows after /start and /challenge
+            seed (int): random seed
+        """
+        rng = random.Random(seed + user_id)
+        await self._flow("start", user_id, rng)
+        await self._flow("challenge", user_id, rng)
+        names = rng.choices(list(FLOW_WEIGHTS), list(FLOW_WEIGHTS.values()), k=flows)
+        for name in names:
+            await self._flow(name, user_id, rng)
+
+
+def _fake_render_snippet(latex_snippet: str) -> bytes:
+    return PNG
+
+
+def _disable_rendering() -> None:
+    """
+    Return a placeholder image instead of running pdflatex
+    """
+    # pylint: disable=import-outside-toplevel
+    from app.utils import render_cache
+
+    render_cache.render_snippet = _fake_render_snippet
+
+
+async def run(
+    users: int, concurrency: int, flows: int, latency: float, seed: int
+) -> LoadTest:
+    """
+    Run the load test
+    Args:
+        users (int): number of synthetic users
+        concurrency (int): users active at the same time
+        flows (int): flows per user after /start and /challenge
+        latency (float): simulated Bot API round trip in seconds
+        seed (int): random seed
+    Returns:
+        LoadTest: finished load test
+    """
+    application = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .request(FakeBotAPI(latency=latency))
+        .concurrent_updates(PerUserUpdateProcessor(concurrency))
+        .persistence(DatabasePersistence())
+        .build()
+    )
+    add_handlers(application)
+    sections = {
+        section_id: list(get_section_paragraphs(section_id))
+        for section_id in get_sections()
+    }
+
+    load_test = LoadTest(application, sections)
+    application.add_error_handler(load_test.count_error)
+    active = asyncio.Semaphore(concurrency)
+
+    async def session(user_id: int) -> None:
+        async with active:
+            await load_test.user(user_id, flows, seed)
+
+    async with application:
+        start = time.perf_counter()
+        await asyncio.gather(*[session(TELEGRAM_ID_START + i) for i in range(users)])
+        load_test.elapsed = time.perf_counter() - start
+    return load_test
+
+
+def report(load_test: LoadTest) -> Dict[str, float]:
+    """
+    Print latency percentiles per flow and throughput
+    Args:
+        load_test (LoadTest): finished load test
+    Returns:
+        Dict[str, float]: p95 latency of each flow in milliseconds
+    """
+    print(f"{'flow':<14}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    p95 = {}
+    for name, seconds in load_test.latencies.items():
+        p95[name] = 1000 * _percentile(seconds, 0.95)
+        print(
+            f"{name:<14}{len(seconds):>8}{1000 * _percentile(seconds, 0.5):>10.1f}"
+            f"{p95[name]:>10.1f}{1000 * _percentile(seconds, 0.99):>10.1f}"
+        )
+    print(
+        f"{load_test.updates} updates in {load_test.elapsed:.1f}s: "
+        f"{load_test.updates / load_test.elapsed:.1f} updates/s, "
+        f"{load_test.failed} failed"
+    )
+    return p95
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--flows", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-p95", type=float, help="p95 budget of a flow in ms")
+    parser.add_argument(
+        "--render",
+        action=argparse.BooleanOptionalAction,
+        default=shutil.which("pdflatex") is not None,
+        help="render exercise images with pdflatex",
+    )
+    args = parser.parse_args()
+
+    if not args.render:
+        _disable_rendering()
+    load_test = asyncio.run(
+        run(args.users, args.concurrency, args.flows, args.latency, args.seed)
+    )
+    p95 = report(load_test)
+    if args.max_p95 is not None:
+        slow = [name for name, ms in p95.items() if ms > args.max_p95]
+        if slow:
+            print(f"Over the p95 budget of {args.max_p95:.0f} ms: {', '.join(slow)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+Benchmark every public query of app/database/queries/queries.py on several database sizes.
+
+For each size a fresh SQLite database is generated with
+benchmarks.generate_data in a child process, then every query is run
+repeatedly for a light user, the heaviest user and a user that selected
+paragraphs. The SQL statement count and the median time of each query are
+compared with the baseline in benchmarks/baselines/queries.json; more
+statements or a median slower than --tolerance times the baseline plus
+--slack milliseconds is reported as a regression and makes the run exit
+with status 1. The committed baseline was recorded on a developer machine,
+so the statement counts hold everywhere but the times only roughly; on
+other hardware save a local baseline on the main branch first:
+
+    python -m benchmarks.query_bench --save
+    python -m benchmarks.query_bench
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+from typing import Any, Callable, Dict, List, Tuple
+from sqlalchemy import func
+
+# The app modules create the engine from DB_URL on import, so they are only
+# imported in the child processes that get the generated database
+
+SIZES = {
+    "small": {"users": 1_000, "solved": 10_000, "exercises": 10},
+    "medium": {"users": 10_000, "solved": 100_000, "exercises": 30},
+    "large": {"users": 50_000, "solved": 1_000_000, "exercises": 60},
+}
+BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "queries.json")
+
+Result = Dict[str, Dict[str, float]]
+
+
+def _measure(query: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """
+    Run the query and record its statements and time
+    Args:
+        query (Callable[[], Any]): query to run
+        repeat (int): number of runs
+    Returns:
+        Dict[str, float]: statements of a run and median time in milliseconds
+    """
+    # pylint: disable=import-outside-toplevel
+    from app.utils.metrics import QueryStats, query_stats
+
+    seconds = []
+    statements = 0
+    for _ in range(repeat):
+        stats = QueryStats()
+        token = query_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            query()
+        finally:
+            seconds.append(time.perf_counter() - start)
+            query_stats.reset(token)
+        statements = max(statements, stats.statements)
+    return {"statements": statements, "ms": 1000 * statistics.median(seconds)}
+
+
+def _users() -> Dict[str, Tuple[int, str]]:
+    """
+    Pick the users the queries run for
+    Returns:
+        Dict[str, Tuple[int, str]]: id and telegram id of a light user,
+            the heaviest user and a user that selects paragraphs
+    """
+    # pylint: disable=import-outside-toplevel
+    from app.database.models import User, Exercise, SolvedExercise
+    from app.database.queries.utils import session_scope
+
+    with session_scope() as session:
+        # the heaviest user still needs an unsolved exercise to get a random one
+        exercises = session.query(func.count(Exercise.id)).scalar()
+        solved = (
+            session.query(SolvedExercise.user_id, func.count(SolvedExercise.id).label("n"))
+            .group_by(SolvedExercise.user_id)
+            .having(func.count(SolvedExercise.id) < exercises)
+            .order_by(func.count(SolvedExercise.id))
+            .all()
+        )
+        ids = {
+            "light": solved[len(solved) // 2].user_id,
+            "heavy": solved[-1].user_id,
+            "selecting": session.query(User.id).filter(User.select_paragraphs).first().id,
+        }
+        return {
+            name: (user_id, session.get(User, user_id).telegram_id)
+            for name, user_id in ids.items()
+        }
+
+
+def run_queries(repeat: int) -> Result:
+    """
+    Benchmark the queries against the database from DB_URL
+    Args:
+        repeat (int): runs of each query
+    Returns:
+        Result: statements and median time by query name
+    """
+    # pylint: disable=import-outside-toplevel
+    from app.database.models import User
+    from app.database.queries import queries
+    from app.database.queries.utils import session_scope
+
+    users = _users()
+    light_id, light = users["light"]
+    heavy_id, heavy = users["heavy"]
+    _, selecting = users["selecting"]
+    section_id = next(iter(queries.get_sections()))
+
+    def uncached(function: Callable, *args: Any) -> Callable[[], Any]:
+        def query():
+            function.invalidate(*args)
+            return function(*args)
+
+        return query
+
+    def count_selected_paragraphs():
+        with session_scope() as session:
+            return queries.count_selected_paragraphs(light_id, section_id, session)
+
+    def update_user_score():
+        with session_scope() as session:
+            user = User.user_by_telegram_id(heavy, session)
+            queries.update_user_score(user, session)
+
+    selected = [False]
+
+    def select_all_section_paragraphs():
+        selected[0] = not selected[0]
+        queries.select_all_section_paragraphs(light, section_id, selected[0])
+
+    benchmarks = {
+        "get_random_exercise": lambda: queries.get_random_exercise("", light, ""),
+        "get_random_exercise[heavy]": lambda: queries.get_random_exercise("", heavy, ""),
+        "get_random_exercise[selected]": lambda: queries.get_random_exercise("", selecting, ""),
+        "get_current_exercise": lambda: queries.get_current_exercise(light),
+        "update_users_exercise": lambda: queries.update_users_exercise(light, 1),
+        # the /leaderboard handler passes the integer id from Telegram
+        "get_user_leaderboard": lambda: queries.get_user_leaderboard(int(light)),
+        "update_user_score[heavy]": update_user_score,
+        "get_user_score": lambda: queries.get_user_score(light),
+        "get_user_score[heavy]": lambda: queries.get_user_score(heavy),
+        "user_exercise_soluiton": lambda: queries.user_exercise_soluiton(light),
+        "get_sections[uncached]": uncached(queries.get_sections),
+        "get_sections": queries.get_sections,
+        "get_selected_sections": lambda: queries.get_selected_sections(light),
+        "count_selected_paragraphs": count_selected_paragraphs,
+        "get_section_paragraphs[uncached]": uncached(
+            queries.get_section_paragraphs, section_id
+        ),
+        "select_all_section_paragraphs": select_all_section_paragraphs,
+        "get_selected_section_paragraphs": lambda: queries.get_selected_section_paragraphs(
+            selecting, section_id
+        ),
+        "count_all_exercises[uncached]": uncached(queries.count_all_exercises),
+        "count_solved_exercises": lambda: queries.count_solved_exercises(light),
+        "count_solved_exercises[heavy]": lambda: queries.count_solved_exercises(heavy),
+        # last, it deletes solved exercises of the heaviest user
+        "remove_last_solved_exercise[heavy]": lambda: queries.remove_last_solved_exercise(
+            heavy
+        ),
+    }
+    return {name: _measure(query, repeat) for name, query in benchmarks.items()}
+
+
+def _run_size(size: str, repeat: int) -> Result:
+    """
+    Generate a database of the size and benchmark it in a child process
+    Args:
+        size (str): name of the size
+        repeat (int): runs of each query
+    Returns:
+        Result: statements and median time by query name
+    """
+    with tempfile.TemporaryDirectory() as tmpdir:
+        env = {**os.environ, "DB_URL": f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"}
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.query_bench", "--child", size, "--repeat", str(repeat)],
+            check=True,
+            env=env,
+            stdout=subprocess.PIPE,
+            text=True,
+        ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def _child(size: str, repeat: int) -> None:
+    """
+    Generate the database from DB_URL and print the results as JSON
+    """
+    # pylint: disable=import-outside-toplevel
+    from app.database.models import Base
+    from app.database.queries.utils import engine
+    from benchmarks.generate_data import generate
+
+    Base.metadata.create_all(engine)
+    parameters = SIZES[size]
+    generate(
+        sections=12,
+        paragraphs=10,
+        exercises=parameters["exercises"],
+        users=parameters["users"],
+        solved=parameters["solved"],
+        selecting_share=0.2,
+        alpha=1.2,
+        seed=0,
+    )
+    print(json.dumps(run_queries(repeat)))
+
+
+def compare(
+    results: Dict[str, Result], baseline: Dict[str, Result], tolerance: float, slack: float
+) -> List[str]:
+    """
+    Print the results next to the baseline and find the regressions
+    Args:
+        results (Dict[str, Result]): results by size
+        baseline (Dict[str, Result]): baseline results by size
+        tolerance (float): allowed ratio of the median time to the baseline
+        slack (float): milliseconds allowed on top, queries this fast are mostly noise
+    Returns:
+        List[str]: regressed queries
+    """
+    regressions = []
+    for size, result in results.items():
+        print(f"\n{size}")
+        print(f"{'query':<38}{'stmts':>6}{'base':>6}{'ms':>10}{'base ms':>10}")
+        for name, current in result.items():
+            base = baseline.get(size, {}).get(name)
+            base_statements = f"{base['statements']:.0f}" if base else "-"
+            base_ms = f"{base['ms']:.2f}" if base else "-"
+            mark = ""
+            if base and (
+                current["statements"] > base["statements"]
+                or current["ms"] > tolerance * base["ms"] + slack
+            ):
+                regressions.append(f"{size}/{name}")
+                mark = "  <- regression"
+            print(
+                f"{name:<38}{current['statements']:>6.0f}{base_statements:>6}"
+                f"{current['ms']:>10.2f}{base_ms:>10}{mark}"
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default=",".join(SIZES), help="comma separated sizes")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--tolerance", type=float, default=1.5)
+    parser.add_argument("--slack", type=float, default=2.0, help="milliseconds")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save", action="store_true", help="store the results as the baseline")
+    parser.add_argument("--child", choices=SIZES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.child, args.repeat)
+        return
+
+    results = {size: _run_size(size, args.repeat) for size in args.sizes.split(",")}
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+    regressions = compare(results, baseline, args.tolerance, args.slack)
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump({**baseline, **results}, file, indent=2)
+        print(f"\nSaved the baseline to {args.baseline}")
+    elif regressions:
+        print(f"\nRegressions: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
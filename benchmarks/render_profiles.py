@@ -0,0 +1,120 @@
+"""
+Compare the rendering profiles of latex_to_bytes on the exercises of the catalog.
+
+Renders every exercise of the database from DB_URL (or a random --sample of
+them) with each profile and reports the image sizes, the render time and the
+end-to-end send time. The upload is estimated from --uplink-mbit and
+--latency, or measured with real sendPhoto calls when --chat-id is given, in
+which case BOT_TOKEN must be a real token. pdflatex and pdftoppm must be
+installed, pngquant and cwebp are used if installed:
+
+    python -m benchmarks.render_profiles --sample 200 --uplink-mbit 20
+"""
+import time
+import random
+import asyncio
+import argparse
+import statistics
+from typing import Dict, List
+from sqlalchemy import text
+from telegram import Bot
+from app.config import BOT_TOKEN
+from app.database.queries.utils import engine
+from app.utils.image_converter import RENDER_PROFILES, latex_to_bytes
+
+
+def load_exercises(sample: int | None) -> List[str]:
+    """
+    Get the LaTeX of the exercises
+    Args:
+        sample (int | None): number of random exercises, all if None
+    Returns:
+        List[str]: exercise contents
+    """
+    with engine.connect() as connection:
+        exercises = list(connection.execute(text("SELECT contents FROM exercises")).scalars())
+    if sample is not None and sample < len(exercises):
+        exercises = random.Random(0).sample(exercises, sample)
+    return exercises
+
+
+async def send(bot: Bot, chat_id: int, image: bytes) -> float:
+    """
+    Send an image with sendPhoto
+    Args:
+        bot (Bot): initialized bot
+        chat_id (int): chat to send the image to
+        image (bytes): image
+    Returns:
+        float: seconds until the Bot API answered
+    """
+    started = time.perf_counter()
+    await bot.send_photo(chat_id, photo=image)
+    return time.perf_counter() - started
+
+
+async def run(
+    exercises: List[str], uplink_mbit: float, latency: float, chat_id: int | None
+) -> Dict[str, Dict[str, List[float]]]:
+    """
+    Render and send every exercise with every profile
+    Args:
+        exercises (List[str]): exercise contents
+        uplink_mbit (float): estimated upload bandwidth in Mbit/s
+        latency (float): estimated Bot API round trip in seconds
+        chat_id (int | None): chat to really send the images to
+    Returns:
+        Dict[str, Dict[str, List[float]]]: sizes, render and send times by profile
+    """
+    results = {
+        profile: {"bytes": [], "render": [], "send": []} for profile in RENDER_PROFILES
+    }
+    bot = Bot(BOT_TOKEN) if chat_id is not None else None
+    if bot is not None:
+        await bot.initialize()
+    for exercise in exercises:
+        for profile, result in results.items():
+            started = time.perf_counter()
+            image = await asyncio.to_thread(latex_to_bytes, exercise, profile)
+            result["render"].append(time.perf_counter() - started)
+            result["bytes"].append(len(image))
+            if bot is not None:
+                result["send"].append(await send(bot, chat_id, image))
+            else:
+                result["send"].append(latency + len(image) * 8 / (uplink_mbit * 1e6))
+    if bot is not None:
+        await bot.shutdown()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sample", type=int, default=None)
+    parser.add_argument("--uplink-mbit", type=float, default=20)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--chat-id", type=int, default=None)
+    args = parser.parse_args()
+
+    exercises = load_exercises(args.sample)
+    results = asyncio.run(run(exercises, args.uplink_mbit, args.latency, args.chat_id))
+
+    send_kind = "measured" if args.chat_id is not None else "estimated"
+    print(f"{len(exercises)} exercises, send time {send_kind}")
+    print(
+        f"{'profile':<14}{'mean KB':>10}{'p95 KB':>10}"
+        f"{'render ms':>12}{'send ms':>10}{'total ms':>10}"
+    )
+    for profile, result in results.items():
+        sizes = sorted(result["bytes"])
+        p95 = sizes[int(0.95 * (len(sizes) - 1))]
+        render = statistics.mean(result["render"])
+        send_seconds = statistics.mean(result["send"])
+        print(
+            f"{profile:<14}{statistics.mean(sizes) / 1024:>10.1f}{p95 / 1024:>10.1f}"
+            f"{1000 * render:>12.1f}{1000 * send_seconds:>10.1f}"
+            f"{1000 * (render + send_seconds):>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
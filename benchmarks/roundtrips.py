@@ -0,0 +1,82 @@
+"""
+Measure Bot API calls and wall time per interaction against the fake Bot API.
+
+Runs the real handlers against the database from DB_URL, so the database has
+to be populated and pdflatex/pdftoppm have to be installed. Run it on two
+revisions to compare them:
+
+    python -m benchmarks.roundtrips --users 20 --latency 0.05
+"""
+import time
+import asyncio
+import argparse
+import statistics
+from collections import defaultdict
+from typing import Dict, List
+from telegram.ext import Application
+from app.telegram_bot.application import add_handlers
+from app.telegram_bot.persistence import DatabasePersistence
+from benchmarks.fake_bot_api import FakeBotAPI, BOT_TOKEN, message_update
+
+INTERACTIONS = [
+    "/start",
+    "/challenge",
+    "Give me the answer!",
+    "Solved it!",
+    "/score",
+    "/leaderboard",
+]
+
+
+async def run(users: int, latency: float) -> Dict[str, Dict[str, List[float]]]:
+    """
+    Drive every user through the interactions one after another
+    Args:
+        users (int): number of users
+        latency (float): simulated Bot API round trip in seconds
+    Returns:
+        Dict[str, Dict[str, List[float]]]: API calls and wall times of each interaction
+    """
+    api = FakeBotAPI(latency=latency)
+    application = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .request(api)
+        .persistence(DatabasePersistence())
+        .build()
+    )
+    add_handlers(application)
+
+    results = defaultdict(lambda: {"calls": [], "seconds": []})
+    async with application:
+        for user_id in range(1, users + 1):
+            for text in INTERACTIONS:
+                api.reset()
+                start = time.perf_counter()
+                await application.process_update(
+                    message_update(application.bot, 10_000 + user_id, text)
+                )
+                results[text]["seconds"].append(time.perf_counter() - start)
+                results[text]["calls"].append(len(api.calls))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.users, args.latency))
+    print(f"{'interaction':<22}{'API calls':>10}{'mean ms':>10}{'p95 ms':>10}")
+    for text, result in results.items():
+        seconds = sorted(result["seconds"])
+        p95 = seconds[int(0.95 * (len(seconds) - 1))]
+        print(
+            f"{text:<22}{statistics.mean(result['calls']):>10.1f}"
+            f"{1000 * statistics.mean(seconds):>10.1f}{1000 * p95:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Compare SQLite engine profiles under concurrent solve and read traffic.
+
+Copies the populated SQLite database from DB_URL (see benchmarks.generate_data)
+once per profile, then runs writer threads that record solved exercises and
+reader threads that look up users and count their solved exercises, like the
+/challenge, /score and "Solved it!" handlers do. Prints throughput, latency
+percentiles and "database is locked" errors of each profile:
+
+    DB_URL=sqlite:///load.db python -m benchmarks.sqlite_profile --seconds 10
+"""
+import os
+import time
+import random
+import shutil
+import sqlite3
+import argparse
+import tempfile
+import threading
+from collections import defaultdict
+from typing import Dict, List
+from sqlalchemy import text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import OperationalError
+from app import config
+from app.database.queries.utils import create_app_engine
+
+SOLVE = [
+    "INSERT INTO solved_exercises (user_id, exercise_id) VALUES (:user_id, :exercise_id)",
+    "UPDATE users SET score = score + 1, last_trial_id = :exercise_id WHERE id = :user_id",
+]
+READ = [
+    "SELECT * FROM users WHERE telegram_id = :telegram_id",
+    "SELECT exercises.paragraph_id, count(*) FROM solved_exercises "
+    "JOIN exercises ON exercises.id = solved_exercises.exercise_id "
+    "WHERE solved_exercises.user_id = :user_id GROUP BY exercises.paragraph_id",
+]
+
+
+class Traffic:
+    """
+    Writer and reader threads sharing an engine
+
+    Args:
+        engine (Engine): engine of the profile
+        users (List[Tuple[int, str]]): ids and telegram ids of the users
+        exercises (int): number of exercises
+    """
+
+    def __init__(self, engine: Engine, users: List, exercises: int) -> None:
+        self.engine = engine
+        self.users = users
+        self.exercises = exercises
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _operation(self, kind: str, statements: List[str], rng: random.Random) -> None:
+        user_id, telegram_id = rng.choice(self.users)
+        parameters = {
+            "user_id": user_id,
+            "telegram_id": telegram_id,
+            "exercise_id": rng.randint(1, self.exercises),
+        }
+        start = time.perf_counter()
+        try:
+            with self.engine.begin() as connection:
+                for statement in statements:
+                    result = connection.execute(text(statement), parameters)
+                    if result.returns_rows:
+                        result.all()
+        except OperationalError:
+            with self._lock:
+                self.errors[kind] += 1
+            return
+        with self._lock:
+            self.latencies[kind].append(time.perf_counter() - start)
+
+    def _worker(self, kind: str, seed: int) -> None:
+        rng = random.Random(seed)
+        statements = SOLVE if kind == "solve" else READ
+        while not self._stop.is_set():
+            self._operation(kind, statements, rng)
+
+    def run(self, writers: int, readers: int, seconds: float) -> None:
+        """
+        Run the traffic for some time
+        Args:
+            writers (int): number of threads recording solves
+            readers (int): number of threads reading
+            seconds (float): duration
+        """
+        threads = [
+            threading.Thread(target=self._worker, args=(kind, seed))
+            for seed, kind in enumerate(["solve"] * writers + ["read"] * readers)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        self._stop.set()
+        for thread in threads:
+            thread.join()
+
+
+def _percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float("nan")
+
+
+def _copy_database(source: str, target: str) -> None:
+    """
+    Copy the database file in rollback journal mode
+    """
+    with sqlite3.connect(source) as connection:
+        connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    shutil.copy(source, target)
+    with sqlite3.connect(target) as connection:
+        connection.execute("PRAGMA journal_mode = DELETE")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--profiles", default="default,wal")
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    source = make_url(config.DATABASE_URL).database
+    with sqlite3.connect(source) as connection:
+        users = connection.execute("SELECT id, telegram_id FROM users").fetchall()
+        exercises = connection.execute("SELECT max(id) FROM exercises").fetchone()[0]
+
+    print(
+        f"{'profile':<10}{'kind':<7}{'ops/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+        f"{'p99 ms':>9}{'locked':>8}"
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for profile in args.profiles.split(","):
+            path = os.path.join(tmpdir, f"{profile}.db")
+            _copy_database(source, path)
+            engine = create_app_engine(f"sqlite:///{path}", profile)
+            traffic = Traffic(engine, users, exercises)
+            traffic.run(args.writers, args.readers, args.seconds)
+            engine.dispose()
+            for kind in ("solve", "read"):
+                seconds = traffic.latencies[kind]
+                print(
+                    f"{profile:<10}{kind:<7}{len(seconds) / args.seconds:>9.0f}"
+                    f"{1000 * _percentile(seconds, 0.5):>9.1f}"
+                    f"{1000 * _percentile(seconds, 0.95):>9.1f}"
+                    f"{1000 * _percentile(seconds, 0.99):>9.1f}"
+                    f"{traffic.errors[kind]:>8}"
+                )
+
+
+if __name__ == "__main__":
+    main()
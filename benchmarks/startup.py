@@ -0,0 +1,129 @@
+"""
+Measure the import time of the bot entry point with python -X importtime.
+
+Imports the application module the way app.py does, in fresh interpreters,
+and prints the slowest top-level imports of the median run. Exits with
+status 1 if the entry point fails to import, if the total import time is
+over --budget-ms or if a module the bot must not load at startup was
+imported, e.g. the book parsers or pandas:
+
+    python -m benchmarks.startup --budget-ms 1000
+"""
+import os
+import sys
+import argparse
+import subprocess
+import tempfile
+from typing import Dict, List, Tuple
+
+# Modules used only by the ingestion, the scripts or optional features
+FORBIDDEN = [
+    "app.parsers",
+    "app.database.queries.db_populate",
+    "app.telegram_bot.cluster",
+    "app.utils.metrics_server",
+    "matplotlib",
+    "tqdm",
+    "pandas",
+    "google.genai",
+]
+
+ENTRY_POINT = "import app.telegram_bot.application"
+
+
+class EntryPointError(Exception):
+    """
+    The entry point failed to import, the message is its traceback
+    """
+
+
+def import_times(database: str) -> Tuple[float, Dict[str, float]]:
+    """
+    Import the entry point in a fresh interpreter
+    Args:
+        database (str): path of the SQLite database the engine is created for
+    Returns:
+        Tuple[float, Dict[str, float]]: total milliseconds and cumulative
+            milliseconds of every imported module
+    Raises:
+        EntryPointError: if the import fails
+    """
+    env = {
+        **os.environ,
+        "DB_URL": f"sqlite:///{database}",
+        "BOT_TOKEN": os.environ.get("BOT_TOKEN", "123456:startup-benchmark"),
+    }
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", ENTRY_POINT],
+        env=env,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    stderr = process.stderr
+    if process.returncode != 0:
+        raise EntryPointError(
+            "\n".join(line for line in stderr.splitlines() if not line.startswith("import time:"))
+        )
+
+    total = 0.0
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        milliseconds = int(cumulative) / 1000
+        modules[name.strip()] = milliseconds
+        # nested imports are indented and already counted by their parent
+        if not name.startswith("  "):
+            total += milliseconds
+    return total, modules
+
+
+def slowest(modules: Dict[str, float], count: int) -> List[Tuple[str, float]]:
+    """
+    Get the slowest modules
+    Args:
+        modules (Dict[str, float]): cumulative milliseconds by module
+        count (int): number of modules
+    Returns:
+        List[Tuple[str, float]]: module names and milliseconds, slowest first
+    """
+    return sorted(modules.items(), key=lambda item: -item[1])[:count]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--budget-ms", type=float, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        try:
+            runs = [import_times(os.path.join(tmpdir, "startup.db")) for _ in range(args.repeat)]
+        except EntryPointError as error:
+            print(f"{error}\n\nFailed to import the entry point: {ENTRY_POINT}")
+            print("Over the startup budget")
+            sys.exit(1)
+    runs.sort(key=lambda run: run[0])
+    total, modules = runs[len(runs) // 2]
+
+    print(f"{'module':<50}{'ms':>10}")
+    for name, milliseconds in slowest(modules, args.top):
+        print(f"{name:<50}{milliseconds:>10.1f}")
+    print(f"\nTotal import time: {total:.0f} ms (median of {args.repeat}), budget {args.budget_ms:.0f} ms")
+
+    failed = False
+    imported = [name for name in FORBIDDEN if name in modules]
+    if imported:
+        print(f"Imported at startup: {', '.join(imported)}")
+        failed = True
+    if total > args.budget_ms:
+        print("Over the startup budget")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Check the number of SQL statements the hot queries issue per call.
+
+Runs the queries used while handling updates for a user of the populated
+database from DB_URL (see benchmarks.generate_data) and counts the statements
+of each call with the engine events behind the metrics. Exits with status 1
+if a query issues more statements than its budget, e.g. after a lazy
+relationship load sneaks back in:
+
+    DB_URL=sqlite:///load.db python -m benchmarks.statement_counts
+"""
+import sys
+from typing import Any, Callable, Dict
+from app.database.models import User
+from app.database.queries import queries
+from app.database.queries.catalog import exercise_catalog
+from app.database.queries.utils import session_scope
+from app.utils.metrics import QueryStats, query_stats
+
+# Query and the statements a call may issue at most
+BUDGETS = {
+    "get_current_exercise": 1,
+    # the solution, then the review that lapses if it is due
+    "user_exercise_soluiton": 2,
+    "get_random_exercise": 3,
+}
+
+
+def count_statements(query: Callable[[], Any]) -> int:
+    """
+    Run the query and count its statements
+    Args:
+        query (Callable[[], Any]): query to run
+    Returns:
+        int: number of statements issued
+    """
+    stats = QueryStats()
+    token = query_stats.set(stats)
+    try:
+        query()
+    finally:
+        query_stats.reset(token)
+    return stats.statements
+
+
+def check(telegram_id: str) -> Dict[str, int]:
+    """
+    Count the statements of every query in the budgets
+    Args:
+        telegram_id (str): Telegram's id of a user who tried an exercise
+    Returns:
+        Dict[str, int]: statements by query name
+    """
+    # the catalog is loaded at startup, not while handling updates
+    exercise_catalog.get()
+    calls = {
+        "get_current_exercise": lambda: queries.get_current_exercise(telegram_id),
+        "user_exercise_soluiton": lambda: queries.user_exercise_soluiton(telegram_id),
+        "get_random_exercise": lambda: queries.get_random_exercise("", telegram_id, ""),
+    }
+    return {name: count_statements(call) for name, call in calls.items()}
+
+
+def main() -> None:
+    with session_scope() as session:
+        telegram_id = (
+            session.query(User.telegram_id)
+            .filter(User.last_trial_id.is_not(None))
+            .limit(1)
+            .scalar()
+        )
+    if telegram_id is None:
+        sys.exit("No user tried an exercise, populate the database first")
+
+    failed = []
+    for name, statements in check(telegram_id).items():
+        ok = statements <= BUDGETS[name]
+        if not ok:
+            failed.append(name)
+        print(f"{'OK  ' if ok else 'FAIL'} {name}: {statements} statements, budget {BUDGETS[name]}")
+    if failed:
+        print(f"Queries over their statement budget: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
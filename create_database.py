@@ -17,13 +17,18 @@ from app.database.models import (
 )
 from app.parsers import match_title, match_elements, match_subsections, match_exercises, get_subsection_data
 from app.database.queries.utils import engine, session_scope
+from app.database.migrations import stamp, upgrade
+from app.database.queries.catalog import bump_catalog_version
+from app.database.queries.search import create_search_index, optimize_search_index
+from app.database.queries.related import compute_related_elements
 
 logging.basicConfig(level=logging.INFO)
 
 
 def init_database(engine: Engine) -> None:
     """
-    Initialize the database by creating all tables defined in the ORM models.
+    Initialize the database by creating all tables defined in the ORM models,
+    or bring an existing database to the latest schema with the migrations.
     Args:
         engine (Engine): SQLAlchemy Engine instance to connect to the database.
     """
@@ -35,9 +40,15 @@ def init_database(engine: Engine) -> None:
     if not existing_tables:
         logging.info("Creating database tables...")
         Base.metadata.create_all(engine)
+        if engine.dialect.name == "sqlite":
+            # the index is filled by triggers while the book is ingested
+            with engine.begin() as connection:
+                create_search_index(connection)
+        stamp(engine)
         logging.info("Database tables created successfully.")
     else:
-        logging.info("Database tables already exist. No action taken.")
+        version = upgrade(engine)
+        logging.info("Database tables already exist. Schema is at version %s.", version)
 
 
 def populate_from_json(json_file: str, cls: Base) -> None:
@@ -250,6 +261,17 @@ def main() -> None:
     populate_subsections_and_elements(config.SUBSECTION_FILES_DIR)
     populate_solutions(config.SOLUTION_MANNUAL_FILE)
 
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as connection:
+            optimize_search_index(connection)
+
+    # precompute the related theory of the exercises
+    compute_related_elements(engine, config.RELATED_TOP_K)
+
+    # make running bots reload the exercise catalog
+    version = bump_catalog_version(engine)
+    logging.info("Catalog version is now %d.", version)
+
 
 if __name__ == "__main__":
     main()
@@ -4,6 +4,9 @@
 if [[ ! -s "${DB_URL#sqlite:///}" ]]
 then
     python app/database/quieries/db_populate.py
+else
+    # Bring an existing database to the latest schema
+    python -m app.database.migrations
 fi
 
 # Run the application